@@ -0,0 +1,90 @@
+"""
+This script benchmarks the throughput of the scraper against a local
+stand-in of JIRA serving synthetic issues.
+
+Copyright (C) 2019  Noam Rabbani
+This program is free software: you can redistribute it and/or modify
+it under the terms of the GNU General Public License as published by
+the Free Software Foundation, either version 3 of the License, or
+(at your option) any later version.
+This program is distributed in the hope that it will be useful,
+but WITHOUT ANY WARRANTY; without even the implied warranty of
+MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+GNU General Public License for more details.
+You should have received a copy of the GNU General Public License
+along with this program.  If not, see <https://www.gnu.org/licenses/>.
+Email: hello@noamrabbani.com
+"""
+
+import asyncio
+import os
+import sys
+import tempfile
+import time
+from jira_stand_in import JiraStandIn, generate_issues
+from scrape_jira_issues import IssueScraper
+from scrape_journal import ScrapeJournal
+from issue_store import IssueStore
+
+
+def main():
+
+    count = int(sys.argv[1]) if len(sys.argv) > 1 else 5000
+    latency = float(sys.argv[2]) if len(sys.argv) > 2 else 0.2
+    years = list(range(2003, 2020))
+    issues = generate_issues("SYNTH", count, years)
+
+    print("concurrency, bulk_comments, seconds, issues/s, requests")
+    for bulk_comments in (False, True):
+        for concurrency in (1, 4, 8):
+            seconds, requests = benchmark(
+                issues, years, latency, concurrency, bulk_comments)
+            print("{}, {}, {:.2f}, {:.0f}, {}".format(
+                concurrency, bulk_comments, seconds, count / seconds,
+                requests))
+
+
+def benchmark(issues, years, latency, concurrency, bulk_comments,
+              page_size=100):
+    """ Scrapes the issues and their comments from a new stand-in.
+
+    The rate of the scraper is not limited, so the throughput only depends
+    on the latency of the stand-in, the concurrency and the number of
+    requests.
+
+    Args:
+        issues: List of the issues served by the stand-in.
+        years: List of the years of the issues.
+        latency: Number of seconds each response is delayed by.
+        concurrency: Maximum number of requests in flight.
+        bulk_comments: Boolean indicating if the comments should be
+                       requested with the search pages.
+        page_size: Number of issues requested per search page.
+    Returns:
+        seconds: Number of seconds of the scraping.
+        requests: Number of requests sent.
+    """
+    server = JiraStandIn(issues, latency=latency)
+    server.start()
+    scraper = IssueScraper(server.base_url, concurrency=concurrency,
+                           rate=1000, page_size=page_size,
+                           bulk_comments=bulk_comments)
+    try:
+        with tempfile.TemporaryDirectory() as tmp_dir:
+            with IssueStore(os.path.join(tmp_dir, "issues")) as store, \
+                    ScrapeJournal(os.path.join(tmp_dir, "journal.jsonl")) \
+                    as journal:
+                start = time.monotonic()
+                asyncio.run(scraper.run_with_client(
+                    scraper.scrape_years, "SYNTH", years, store, journal))
+                asyncio.run(scraper.run_with_client(
+                    scraper.scrape_comments, store, journal))
+                seconds = time.monotonic() - start
+    finally:
+        server.shutdown()
+        server.server_close()
+    return seconds, sum(server.requests.values())
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,421 @@
+"""
+This module contains the client used to send concurrent requests to the REST
+API of a JIRA server without exceeding its rate limits.
+
+Copyright (C) 2019  Noam Rabbani
+This program is free software: you can redistribute it and/or modify
+it under the terms of the GNU General Public License as published by
+the Free Software Foundation, either version 3 of the License, or
+(at your option) any later version.
+This program is distributed in the hope that it will be useful,
+but WITHOUT ANY WARRANTY; without even the implied warranty of
+MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+GNU General Public License for more details.
+You should have received a copy of the GNU General Public License
+along with this program.  If not, see <https://www.gnu.org/licenses/>.
+Email: hello@noamrabbani.com
+"""
+
+from concurrent.futures import ThreadPoolExecutor
+import asyncio
+import codecs
+import json
+import logging
+import re
+import threading
+import time
+import requests
+
+
+class TokenBucket:
+    """ Limits the rate of requests with a token bucket.
+
+    The bucket holds up to capacity tokens and gains rate tokens per second.
+    Each request takes a token, so bursts of up to capacity requests are
+    sent at once and the rate is kept on average.
+    """
+
+    def __init__(self, rate, capacity=1):
+        """
+        Args:
+            rate: Number of tokens added per second.
+            capacity: Maximum number of tokens in the bucket.
+        """
+        self.rate = rate
+        self.capacity = capacity
+        self.tokens = capacity
+        self.updated_at = time.monotonic()
+        self.lock = None
+
+    async def acquire(self):
+        """ Waits until a token is available and takes it.
+        """
+        if self.lock is None:
+            self.lock = asyncio.Lock()
+        async with self.lock:
+            while True:
+                now = time.monotonic()
+                self.tokens = min(self.capacity, self.tokens +
+                                  (now - self.updated_at) * self.rate)
+                self.updated_at = now
+                if self.tokens >= 1:
+                    self.tokens -= 1
+                    return
+                await asyncio.sleep((1 - self.tokens) / self.rate)
+
+    def pause(self, seconds):
+        """ Empties the bucket so that no request is sent for a while.
+
+        Args:
+            seconds: Number of seconds without requests.
+        """
+        self.tokens = min(self.tokens, 0) - seconds * self.rate
+
+
+class JsonArrayDecoder:
+    """ Decodes a JSON object incrementally, returning the elements of one of
+    its arrays as soon as they are complete.
+
+    The text is fed in chunks. Only the element being received is kept in
+    the buffer, so the memory does not grow with the size of the array. The
+    other members of the object are kept in fields.
+    """
+
+    whitespace = re.compile(r"[ \t\n\r]*")
+
+    def __init__(self, array_key):
+        """
+        Args:
+            array_key: Key of the array whose elements are returned.
+        """
+        self.array_key = array_key
+        self.fields = {}
+        self.decoder = json.JSONDecoder()
+        self.buffer = ""
+        self.pos = 0
+        self.state = "object"
+        self.key = None
+        # Number of characters to wait for before decoding an incomplete
+        # value again, so that large elements are not decoded once per
+        # chunk.
+        self.retry_size = 0
+        self.is_closed = False
+
+    def feed(self, text):
+        """ Adds text to the buffer and decodes what it completes.
+
+        Args:
+            text: String of the next chunk of the JSON object.
+        Returns:
+            elements: List of the elements of the array completed by the
+                      text.
+        """
+        self.buffer += text
+        elements = []
+        if len(self.buffer) - self.pos >= self.retry_size:
+            while self.step(elements):
+                pass
+            self.buffer = self.buffer[self.pos:]
+            self.pos = 0
+        return elements
+
+    def close(self):
+        """ Decodes the rest of the buffer once all the text is fed.
+
+        Returns:
+            elements: List of the last elements of the array.
+        Raises:
+            ValueError: If the JSON object is incomplete.
+        """
+        self.is_closed = True
+        self.retry_size = 0
+        elements = self.feed("")
+        if self.state != "end":
+            raise ValueError("Incomplete JSON object")
+        return elements
+
+    def step(self, elements):
+        """ Decodes the next token of the object.
+
+        Args:
+            elements: List to which a decoded element of the array is added.
+        Returns:
+            progress: Boolean indicating if a token was decoded, False if
+                      more text is needed.
+        """
+        pos = self.whitespace.match(self.buffer, self.pos).end()
+        if pos == len(self.buffer):
+            return False
+        char = self.buffer[pos]
+        end = pos + 1
+        if self.state == "object":
+            self.expect(char, "{")
+            self.state = "key"
+        elif self.state == "key" and char in ",}":
+            if char == "}":
+                self.state = "end"
+        elif self.state == "element" and char in ",]":
+            if char == "]":
+                self.state = "key"
+        elif self.state in ("key", "value", "element"):
+            value, end = self.decode(pos)
+            if end is None:
+                return False
+            if self.state == "key":
+                self.key = value
+                self.state = "colon"
+            elif self.state == "value":
+                self.fields[self.key] = value
+                self.state = "key"
+            else:
+                elements.append(value)
+        elif self.state == "colon":
+            self.expect(char, ":")
+            self.state = "array" if self.key == self.array_key else "value"
+        elif self.state == "array":
+            self.expect(char, "[")
+            self.state = "element"
+        else:
+            raise ValueError("Extra data after the JSON object")
+        self.pos = end
+        return True
+
+    def decode(self, pos):
+        """ Decodes the JSON value starting at a position of the buffer.
+
+        A value that ends with the buffer may be cut short, such as a number,
+        so it is only decoded once more text follows or the text is over.
+
+        Args:
+            pos: Position of the value in the buffer.
+        Returns:
+            value: Decoded value, or None if more text is needed.
+            end: Position after the value, or None if more text is needed.
+        """
+        try:
+            value, end = self.decoder.raw_decode(self.buffer, pos)
+        except json.JSONDecodeError:
+            if self.is_closed:
+                raise
+            end = None
+        if end is None or (end == len(self.buffer) and not self.is_closed):
+            self.retry_size = 2 * (len(self.buffer) - pos)
+            return None, None
+        self.retry_size = 0
+        return value, end
+
+    def expect(self, char, expected):
+        if char != expected:
+            raise ValueError("Expected {} but found {}".format(expected,
+                                                               char))
+
+
+class JiraClient:
+    """ Sends GET requests to the REST API of a JIRA server from asyncio.
+
+    The requests share one HTTP session, so connections are reused, and are
+    sent from a pool of threads. At most concurrency requests are in flight
+    at once and requests are started at no more than rate per second.
+    Responses asking to slow down are retried after the delay given by the
+    server, and requests that time out are retried with an exponential
+    backoff.
+    """
+
+    # Statuses of the responses that are retried.
+    retry_statuses = (429, 502, 503, 504)
+    # Number of bytes read at once from a streamed response, and number of
+    # chunks received ahead of the decoding.
+    chunk_size = 64 * 1024
+    stream_buffer = 16
+    # Number of seconds between the checks of a waiting thread for a stop.
+    stop_poll_interval = 0.1
+
+    def __init__(self, base_url, concurrency=8, rate=2.5, burst=1,
+                 max_retries=5, timeout=(10, 60)):
+        """
+        Args:
+            base_url: URL of the JIRA server, such as
+                      "https://issues.apache.org/jira".
+            concurrency: Maximum number of requests in flight.
+            rate: Maximum number of requests started per second.
+            burst: Number of requests that can be started at once after a
+                   pause.
+            max_retries: Number of times a request is retried.
+            timeout: Tuple of the number of seconds to wait for a connection
+                     and for each read of a response.
+        """
+        self.base_url = base_url.rstrip("/")
+        self.concurrency = concurrency
+        self.bucket = TokenBucket(rate, burst)
+        self.max_retries = max_retries
+        self.timeout = timeout
+        self.session = requests.Session()
+        adapter = requests.adapters.HTTPAdapter(pool_connections=1,
+                                                pool_maxsize=concurrency)
+        self.session.mount("http://", adapter)
+        self.session.mount("https://", adapter)
+        self.session.headers["Content-Type"] = "application/json"
+        self.executor = ThreadPoolExecutor(concurrency)
+        self.semaphore = None
+        self.is_closed = threading.Event()
+
+    async def get_json(self, path, params=None):
+        """ Sends a GET request to the REST API.
+
+        Args:
+            path: Path of the resource, such as "rest/api/2/search".
+            params: Dict of the query parameters.
+        Returns:
+            json_data: Data returned by the request in JSON format.
+        """
+        async with self.get_semaphore():
+            response = await self.send(path, params)
+        response.raise_for_status()
+        return response.json()
+
+    async def stream_json(self, path, params, decoder):
+        """ Sends a GET request to the REST API and decodes the response as
+        it is received.
+
+        The body is read by a thread of the pool, which hands its chunks
+        over to the event loop, so the elements are processed while the rest
+        of the body is received. The thread waits once stream_buffer chunks
+        are waiting to be decoded, so the memory of a stream is bounded.
+
+        Args:
+            path: Path of the resource, such as "rest/api/2/search".
+            params: Dict of the query parameters.
+            decoder: JsonArrayDecoder of the response, which keeps its
+                     other members once the response is decoded.
+        Yields:
+            element: Element of the array of the decoder.
+        """
+        async with self.get_semaphore():
+            response = await self.send(path, params, stream=True)
+            try:
+                response.raise_for_status()
+                loop = asyncio.get_running_loop()
+                queue = asyncio.Queue()
+                slots = threading.Semaphore(self.stream_buffer)
+                stop = threading.Event()
+                receiving = loop.run_in_executor(
+                    self.executor, self.receive, response, loop, queue,
+                    slots, stop)
+                try:
+                    text_decoder = codecs.getincrementaldecoder("utf-8")()
+                    while True:
+                        chunk = await queue.get()
+                        if chunk is None:
+                            break
+                        slots.release()
+                        for element in decoder.feed(
+                                text_decoder.decode(chunk)):
+                            yield element
+                    await receiving
+                    text = text_decoder.decode(b"", final=True)
+                    for element in decoder.feed(text) + decoder.close():
+                        yield element
+                finally:
+                    stop.set()
+            finally:
+                response.close()
+
+    def receive(self, response, loop, queue, slots, stop):
+        """ Reads the body of a response into a queue of the event loop,
+        followed by None.
+
+        The thread never waits for the event loop itself, so a loop that
+        stops while a stream is read does not block the thread.
+
+        Args:
+            response: Streamed response.
+            loop: Event loop of the queue.
+            queue: asyncio.Queue of the chunks of the body.
+            slots: Semaphore of the number of chunks the queue can hold.
+            stop: Event set once the reading should stop.
+        """
+        try:
+            for chunk in response.iter_content(self.chunk_size):
+                while not slots.acquire(timeout=self.stop_poll_interval):
+                    if stop.is_set() or self.is_closed.is_set():
+                        return
+                if stop.is_set() or self.is_closed.is_set():
+                    return
+                loop.call_soon_threadsafe(queue.put_nowait, chunk)
+        finally:
+            try:
+                loop.call_soon_threadsafe(queue.put_nowait, None)
+            except RuntimeError:
+                # The event loop is closed, so nothing reads the queue.
+                pass
+
+    async def send(self, path, params=None, stream=False):
+        """ Sends a GET request, retrying it while the server asks to slow
+        down or does not answer in time.
+
+        Args:
+            path: Path of the resource, such as "rest/api/2/search".
+            params: Dict of the query parameters.
+            stream: Boolean indicating if the body should be left unread.
+        Returns:
+            response: Response of the last attempt.
+        """
+        url = "{}/{}".format(self.base_url, path.lstrip("/"))
+        loop = asyncio.get_running_loop()
+        for attempt in range(self.max_retries + 1):
+            await self.bucket.acquire()
+            try:
+                response = await loop.run_in_executor(
+                    self.executor,
+                    lambda: self.session.get(url, params=params,
+                                             stream=stream,
+                                             timeout=self.timeout))
+            except requests.Timeout:
+                if attempt == self.max_retries:
+                    raise
+                delay = 2 ** attempt
+                logging.info("{}, retrying in {}s after a timeout".format(
+                    url, delay))
+                await asyncio.sleep(delay)
+                continue
+            if (response.status_code not in self.retry_statuses or
+                    attempt == self.max_retries):
+                return response
+            delay = self.get_retry_delay(response, attempt)
+            logging.info("{}, retrying in {}s after {}".format(
+                url, delay, response.status_code))
+            response.close()
+            self.bucket.pause(delay)
+            await asyncio.sleep(delay)
+
+    def get_semaphore(self):
+        """ Gets the semaphore that limits the number of requests in flight,
+        created in the running event loop.
+        """
+        if self.semaphore is None:
+            self.semaphore = asyncio.Semaphore(self.concurrency)
+        return self.semaphore
+
+    def get_retry_delay(self, response, attempt):
+        """ Gets the delay before retrying a request.
+
+        Args:
+            response: Response asking to slow down.
+            attempt: Number of the attempt, starting at 0.
+        Returns:
+            delay: Number of seconds to wait.
+        """
+        retry_after = response.headers.get("Retry-After")
+        if retry_after is not None and retry_after.isdigit():
+            return int(retry_after)
+        return 2 ** attempt
+
+    def close(self):
+        """ Closes the connections and the threads of the client.
+
+        The threads reading streams stop at their next chunk, so closing the
+        client does not wait for the streams that are left unread.
+        """
+        self.is_closed.set()
+        self.executor.shutdown()
+        self.session.close()
@@ -0,0 +1,412 @@
+"""
+This script serves a local stand-in of the REST API of Apache's JIRA, from
+recorded or synthetic issues, so that the scraper can be benchmarked and its
+retries and resumption tested offline.
+
+Copyright (C) 2019  Noam Rabbani
+This program is free software: you can redistribute it and/or modify
+it under the terms of the GNU General Public License as published by
+the Free Software Foundation, either version 3 of the License, or
+(at your option) any later version.
+This program is distributed in the hope that it will be useful,
+but WITHOUT ANY WARRANTY; without even the implied warranty of
+MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+GNU General Public License for more details.
+You should have received a copy of the GNU General Public License
+along with this program.  If not, see <https://www.gnu.org/licenses/>.
+Email: hello@noamrabbani.com
+"""
+
+from collections import Counter
+from datetime import datetime, timedelta, timezone
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, urlparse
+import json
+import math
+import os
+import random
+import re
+import sys
+import threading
+import time
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.realpath(__file__)),
+                                "..", "generation"))
+from jira_timestamp import parse_timestamp  # noqa
+from issue_store import open_issues  # noqa
+
+
+def main():
+
+    if len(sys.argv) < 2:
+        print("Must specify the issues to serve, or a number of synthetic "
+              "issues, as argument")
+        exit()
+
+    if sys.argv[1].isdigit():
+        issues = generate_issues("SYNTH", int(sys.argv[1]))
+    else:
+        issues = load_issues(sys.argv[1])
+    port = int(sys.argv[2]) if len(sys.argv) > 2 else 8080
+
+    server = JiraStandIn(issues, ("127.0.0.1", port))
+    print("Serving {} issues on {}".format(len(issues), server.base_url))
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
+
+
+def load_issues(path):
+    """ Loads recorded issues, as saved by the scraper.
+
+    Args:
+        path: Path of the directory of JSON files or of the IssueStore.
+    Returns:
+        issues: List of the issues, with their comments.
+    """
+    with open_issues(path) as issues:
+        return list(issues.iter_issues())
+
+
+def generate_issues(project, count, years=range(2003, 2020), seed=0):
+    """ Generates synthetic issues shaped like the ones of Apache's JIRA.
+
+    Args:
+        project: Name of the project of the issues.
+        count: Number of issues.
+        years: Years in which the issues are created.
+        seed: Seed of the random generator.
+    Returns:
+        issues: List of the issues, with their comments, in order of
+                creation.
+    """
+    rng = random.Random(seed)
+    start = datetime(min(years), 1, 1, tzinfo=timezone.utc)
+    span = (datetime(max(years) + 1, 1, 1, tzinfo=timezone.utc) -
+            start).total_seconds()
+    users = ["user{}".format(i) for i in range(max(1, count // 20))]
+
+    def format_timestamp(date):
+        return date.strftime("%Y-%m-%dT%H:%M:%S.000+0000")
+
+    created_dates = sorted(start + timedelta(seconds=rng.uniform(0, span))
+                           for _ in range(count))
+    issues = []
+    for number, created in enumerate(created_dates, 1):
+        dates = sorted(created + timedelta(hours=rng.expovariate(1 / 200))
+                       for _ in range(rng.randint(0, 12)))
+        histories = [{"id": str(number * 100 + idx),
+                      "author": {"key": rng.choice(users)},
+                      "created": format_timestamp(date),
+                      "items": [{"field": rng.choice(
+                          ["assignee", "priority", "status", "Link",
+                           "Fix Version", "labels"]),
+                          "fieldtype": "jira",
+                          "from": None, "fromString": None,
+                          "to": str(rng.randint(1, 5)),
+                          "toString": "value"}]}
+                     for idx, date in enumerate(dates)]
+        resolved = dates[-1] if dates and rng.random() < 0.8 else None
+        comments = [{"id": str(number * 100 + idx),
+                     "author": {"key": rng.choice(users)},
+                     "body": "Comment " * rng.randint(1, 60),
+                     "created": format_timestamp(
+                         created + timedelta(hours=rng.expovariate(1 / 100)))}
+                    for idx in range(rng.randint(0, 8))]
+        issues.append({
+            "id": str(number),
+            "key": "{}-{}".format(project, number),
+            "fields": {
+                "summary": "Issue {}".format(number),
+                "description": "Description " * rng.randint(0, 200),
+                "priority": {"id": str(rng.randint(1, 5))},
+                "issuetype": {"id": str(rng.randint(1, 7))},
+                "assignee": ({"key": rng.choice(users)}
+                             if rng.random() < 0.7 else None),
+                "creator": {"key": rng.choice(users)},
+                "issuelinks": [{"id": str(i)}
+                               for i in range(rng.randint(0, 3))],
+                "versions": [{"id": str(i)} for i in range(rng.randint(0, 2))],
+                "fixVersions": [{"id": str(i)}
+                                for i in range(rng.randint(0, 2))],
+                "created": format_timestamp(created),
+                "updated": format_timestamp(max([created] + dates)),
+                "resolutiondate": (format_timestamp(resolved)
+                                   if resolved else None)},
+            "changelog": {"startAt": 0, "maxResults": len(histories),
+                          "total": len(histories), "histories": histories},
+            "comments": comments})
+    return issues
+
+
+class JiraStandIn(ThreadingHTTPServer):
+    """ Local stand-in of the search and comment endpoints of the REST API.
+
+    The issues are served as JIRA serves them: the search filters them with
+    the JQL of the scraper, pages them, caps maxResults and only returns the
+    changelog and the first comments when asked to. Dates in the JQL are
+    midnight UTC, as in JIRA with a server in UTC. Each request can be
+    delayed, requests above the rate limit get a 429 with a Retry-After
+    header, and a share of the requests can be answered with an error.
+    """
+
+    daemon_threads = True
+    # Clauses of the JQL queries sent by the scraper.
+    project_clause = re.compile(r"project\s*=\s*(\w+)")
+    date_clause = re.compile(r'(created|updated)\s*(>=|<=|>|<)\s*"([^"]+)"')
+
+    def __init__(self, issues, address=("127.0.0.1", 0), latency=0,
+                 jitter=0, rate=None, burst=1, retry_after=None,
+                 error_rate=0, error_statuses=(503,), max_results=1000,
+                 search_comments=5, max_comment_results=100, seed=0):
+        """
+        Args:
+            issues: List of the issues, with their comments, as saved by
+                    the scraper.
+            address: Tuple of the host and port, 0 for any free port.
+            latency: Number of seconds each response is delayed by.
+            jitter: Maximum number of seconds added to the latency at
+                    random.
+            rate: Maximum number of requests answered per second, or None
+                  for no limit.
+            burst: Number of requests that can be answered at once.
+            retry_after: Number of seconds sent in the Retry-After header,
+                         or None for the time until a request is allowed.
+            error_rate: Probability that a request is answered with an
+                        error.
+            error_statuses: Statuses of the errors, picked at random.
+            max_results: Maximum number of issues per search page.
+            search_comments: Maximum number of comments of an issue returned
+                             by the search.
+            max_comment_results: Maximum number of comments per page of the
+                                 comment endpoint.
+            seed: Seed of the random generator of the latency and errors.
+        """
+        super().__init__(address, StandInHandler)
+        self.issues = sorted(
+            issues, key=lambda issue: parse_timestamp(
+                issue["fields"]["created"]))
+        self.issues_by_key = {issue["key"]: issue for issue in issues}
+        self.latency = latency
+        self.jitter = jitter
+        self.rate = rate
+        self.burst = burst
+        self.retry_after = retry_after
+        self.error_rate = error_rate
+        self.error_statuses = error_statuses
+        self.max_results = max_results
+        self.search_comments = search_comments
+        self.max_comment_results = max_comment_results
+        self.random = random.Random(seed)
+        self.lock = threading.Lock()
+        self.tokens = burst
+        self.updated_at = time.monotonic()
+        self.requests = Counter()
+        self.statuses = Counter()
+        self.in_flight = 0
+        self.max_in_flight = 0
+
+    @property
+    def base_url(self):
+        return "http://{}:{}".format(*self.server_address[:2])
+
+    def start(self):
+        """ Serves the requests from a daemon thread.
+
+        Returns:
+            thread: Thread of the server, stopped by shutdown.
+        """
+        thread = threading.Thread(target=self.serve_forever, daemon=True)
+        thread.start()
+        return thread
+
+    def admit(self):
+        """ Takes a token of the rate limit and draws the fate of a request.
+
+        Returns:
+            admission: Tuple of the delay before answering, the error
+                       status or None, and the Retry-After header or None.
+        """
+        with self.lock:
+            delay = self.latency + self.random.uniform(0, self.jitter)
+            if self.rate is not None:
+                now = time.monotonic()
+                self.tokens = min(self.burst, self.tokens +
+                                  (now - self.updated_at) * self.rate)
+                self.updated_at = now
+                if self.tokens < 1:
+                    wait = (1 - self.tokens) / self.rate
+                    return delay, 429, self.get_retry_after(wait)
+                self.tokens -= 1
+            if self.random.random() < self.error_rate:
+                return (delay, self.random.choice(self.error_statuses),
+                        self.get_retry_after(0))
+            return delay, None, None
+
+    def get_retry_after(self, wait):
+        if self.retry_after is not None:
+            return str(self.retry_after)
+        return str(math.ceil(wait))
+
+    def search(self, query):
+        """ Answers a search request.
+
+        Args:
+            query: Dict of the query parameters, as parsed by parse_qs.
+        Returns:
+            response: Tuple of the status and the body.
+        """
+        jql = query.get("jql", [""])[0]
+        try:
+            matches = self.match_issues(jql)
+        except ValueError as error:
+            return 400, {"errorMessages": [str(error)]}
+        start_at = int(query.get("startAt", ["0"])[0])
+        max_results = int(query.get("maxResults", [str(self.max_results)])[0])
+        if max_results < 0 or max_results > self.max_results:
+            max_results = self.max_results
+        expand = query.get("expand", [""])[0].split(",")
+        fields = query.get("fields", [""])[0].split(",")
+        issues = [self.render_issue(issue, "changelog" in expand,
+                                    "comment" in fields)
+                  for issue in matches[start_at:start_at + max_results]]
+        return 200, {"expand": "names,schema", "startAt": start_at,
+                     "maxResults": max_results, "total": len(matches),
+                     "issues": issues}
+
+    def match_issues(self, jql):
+        """ Gets the issues matching the JQL of the scraper, in order of
+        creation.
+
+        Args:
+            jql: String of the JQL query.
+        Returns:
+            issues: List of the matching issues.
+        """
+        project = self.project_clause.search(jql)
+        if project is None:
+            raise ValueError("The query must name a project")
+        conditions = []
+        for field, operator, value in self.date_clause.findall(jql):
+            bound = datetime.strptime(value, "%Y/%m/%d").replace(
+                tzinfo=timezone.utc)
+            conditions.append((field, operator, bound))
+
+        def is_match(issue):
+            if not issue["key"].startswith(project.group(1) + "-"):
+                return False
+            for field, operator, bound in conditions:
+                timestamp = (issue["fields"].get(field) or
+                             issue["fields"]["created"])
+                date = parse_timestamp(timestamp)
+                if not {">=": date >= bound, "<=": date <= bound,
+                        ">": date > bound, "<": date < bound}[operator]:
+                    return False
+            return True
+
+        return [issue for issue in self.issues if is_match(issue)]
+
+    def render_issue(self, issue, with_changelog, with_comments):
+        """ Renders an issue as the search returns it.
+
+        Args:
+            issue: Dict that contains the issue's data, with its comments.
+            with_changelog: Boolean indicating if the changelog is expanded.
+            with_comments: Boolean indicating if the comment field is
+                           requested.
+        Returns:
+            issue: Dict of the issue in the search results.
+        """
+        comments = issue.get("comments", [])
+        rendered = {key: value for key, value in issue.items()
+                    if key not in ("comments", "changelog")}
+        rendered["fields"] = dict(issue["fields"])
+        if with_changelog:
+            rendered["changelog"] = issue.get("changelog", {"histories": []})
+        if with_comments:
+            rendered["fields"]["comment"] = {
+                "comments": comments[:self.search_comments],
+                "maxResults": self.search_comments,
+                "total": len(comments), "startAt": 0}
+        return rendered
+
+    def get_comments(self, issuekey, query):
+        """ Answers a request for the comments of an issue.
+
+        Args:
+            issuekey: Key of the issue.
+            query: Dict of the query parameters, as parsed by parse_qs.
+        Returns:
+            response: Tuple of the status and the body.
+        """
+        issue = self.issues_by_key.get(issuekey)
+        if issue is None:
+            return 404, {"errorMessages": ["Issue Does Not Exist"]}
+        comments = issue.get("comments", [])
+        start_at = int(query.get("startAt", ["0"])[0])
+        max_results = int(query.get("maxResults",
+                                    [str(self.max_comment_results)])[0])
+        max_results = min(max_results, self.max_comment_results)
+        return 200, {"startAt": start_at, "maxResults": max_results,
+                     "total": len(comments),
+                     "comments": comments[start_at:start_at + max_results]}
+
+
+class StandInHandler(BaseHTTPRequestHandler):
+    """ Handles the requests to a JiraStandIn.
+    """
+
+    comment_path = re.compile(r"/rest/api/2/issue/([^/]+)/comment$")
+
+    def do_GET(self):
+        server = self.server
+        url = urlparse(self.path)
+        query = parse_qs(url.query)
+        comment_match = self.comment_path.match(url.path)
+        endpoint = ("search" if url.path == "/rest/api/2/search" else
+                    "comment" if comment_match else "other")
+
+        with server.lock:
+            server.requests[endpoint] += 1
+            server.in_flight += 1
+            server.max_in_flight = max(server.max_in_flight,
+                                       server.in_flight)
+        retry_after = None
+        try:
+            delay, error_status, retry_after = server.admit()
+            time.sleep(delay)
+            if error_status is not None:
+                status, body = error_status, {"errorMessages": ["Injected"]}
+            elif endpoint == "search":
+                status, body = server.search(query)
+            elif endpoint == "comment":
+                status, body = server.get_comments(comment_match.group(1),
+                                                   query)
+            else:
+                status, body = 404, {"errorMessages": ["Not Found"]}
+        except Exception as error:
+            # Failures such as a malformed startAt are answered like the
+            # server errors of JIRA, rather than closing the connection.
+            status, body = 500, {"errorMessages": [str(error)]}
+        finally:
+            with server.lock:
+                server.in_flight -= 1
+                server.statuses[status] += 1
+
+        data = json.dumps(body).encode("utf-8")
+        self.send_response(status)
+        if retry_after is not None:
+            self.send_header("Retry-After", retry_after)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(data)))
+        self.end_headers()
+        self.wfile.write(data)
+
+    def log_message(self, *args):
+        pass
+
+
+if __name__ == "__main__":
+    main()
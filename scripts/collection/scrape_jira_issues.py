@@ -15,13 +15,19 @@ along with this program.  If not, see <https://www.gnu.org/licenses/>.
 Email: hello@noamrabbani.com
 """
 
-import requests
+from datetime import datetime, timedelta, timezone
+import asyncio
 import json
 import os
 import pandas
-import time
 import sys
 import logging
+from jira_client import JiraClient, JsonArrayDecoder
+from scrape_journal import ScrapeJournal
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.realpath(__file__)),
+                                "..", "generation"))
+from issue_store import IssueStore, open_issues  # noqa
+from issue_decoder import project_issue  # noqa
 
 
 def main():
@@ -31,6 +37,15 @@ def main():
         exit()
 
     project = sys.argv[1]
+    # Apache's JIRA was scraped with one request every 0.4s. The requests
+    # are now sent concurrently, at the same average rate.
+    concurrency = 8
+    rate = 2.5
+    # Get the comments with the search pages instead of one request per
+    # issue. The comments pass then only handles issues scraped before.
+    bulk_comments = True
+    # Only save the parts of the issues that the datasets use.
+    project_fields = True
 
     module_path = os.path.dirname(os.path.realpath(__file__))
     path = os.path.join(module_path, "..", "..", "logs",
@@ -39,14 +54,72 @@ def main():
                         filemode='w')
     logging.info("issuekey, reason")
 
-    sc = IssueScraper()
+    sc = IssueScraper(concurrency=concurrency, rate=rate,
+                      bulk_comments=bulk_comments,
+                      project_fields=project_fields)
 
-    years = list(range(2003, 2020))
-    sc.scrape_issues(project, years)
-    sc.scrape_issue_comments(project)
+    if sc.get_last_sync(project) is None:
+        synced_on = datetime.now(timezone.utc).date()
+        years = list(range(2003, 2020))
+        sc.scrape_issues(project, years)
+        # A sync is only recorded once every issue has its comments, so
+        # that the next run does not refresh a partial scraping.
+        if not sc.scrape_issue_comments(project):
+            sc.record_sync(project, synced_on)
+    else:
+        # Only refresh the issues updated since the last scraping. Their
+        # keys can be given to extract_cross_issue_data to update it.
+        updated_issuekeys = sc.scrape_updated_issues(project)
+        path = os.path.join(module_path, "..", "..", "logs", project,
+                            "updated_issues.txt")
+        with open(path, "w") as f:
+            f.writelines(issuekey + "\n" for issuekey in updated_issuekeys)
 
 
 class IssueScraper:
+    """ Scrapes the issues of a project from JIRA into JSON files or an
+    IssueStore.
+
+    The search pages and comments are requested concurrently with asyncio,
+    through a JiraClient that limits the number of requests in flight and
+    the rate at which they are sent. The pages and comments that are saved
+    are recorded in the ScrapeJournal of the project, so that scraping again
+    skips them.
+
+    The search pages are decoded as they are received, and their issues are
+    saved one at a time. With bulk_comments, the search pages include the
+    comment field of the issues, and the issues are saved with their
+    comments at once. Only the issues with more comments than the search
+    returned need more requests.
+    """
+
+    # Number of comments requested per page of the comment endpoint.
+    comment_page_size = 1000
+
+    def __init__(self, base_url="https://issues.apache.org/jira",
+                 concurrency=8, rate=2.5, page_size=1000,
+                 bulk_comments=False, issue_store=False,
+                 project_fields=False):
+        """
+        Args:
+            base_url: URL of the JIRA server.
+            concurrency: Maximum number of requests in flight.
+            rate: Maximum number of requests sent per second.
+            page_size: Number of issues requested per search page.
+            bulk_comments: Boolean indicating if the comments should be
+                           requested with the search pages.
+            issue_store: Boolean indicating if the issues should be saved in
+                         an IssueStore instead of one JSON file each.
+            project_fields: Boolean indicating if only the parts of the
+                            issues in ISSUE_PROJECTION should be saved.
+        """
+        self.base_url = base_url
+        self.concurrency = concurrency
+        self.rate = rate
+        self.page_size = page_size
+        self.bulk_comments = bulk_comments
+        self.issue_store = issue_store
+        self.project_fields = project_fields
 
     def scrape_issues(self, project, years):
         """ Scrapes issues given a project and year range
@@ -57,102 +130,464 @@ class IssueScraper:
             project: Name of project to scrape
             years: List of years in which the issues were opened in
         """
-        module_path = os.path.dirname(os.path.realpath(__file__))
-        output_dir = os.path.join(module_path, "..", "..", "issues", project)
-
-        if not os.path.exists(output_dir):
-            os.mkdir(output_dir)
-
-        for y in years:
-            print("Collecting year {}".format(y))
-            start_at = 0
-            while True:
-                print("Scraping issues {}-{}"
-                      .format(start_at, start_at+1000))
-                url = (
-                    'https://issues.apache.org/jira/rest/api/2/search?jql=' +  # noqa
-                    'project={} and created >= "{}/01/01" and created <= "{}/12/31"&maxResults=-1&startAt={}&expand=changelog'  # noqa
-                    .format(project, y, y, start_at)
-                )
-                json_data = self.http_get_request(url, delay=30)
-
-                if len(json_data['issues']) == 0:
-                    break
-
-                for issue in json_data['issues']:
-                    file_path = os.path.join(output_dir, issue['key'])
-                    if not os.path.exists(file_path):
-                        if not issue["fields"]["creator"]:
-                            logging.info(
-                                "{}, Issue creator is None".format(issue['key']))
-                        else:
-                            with open(file_path, 'w') as f:
-                                json.dump(issue, f)
-                    else:
-                        print(file_path + ' already exists')
-                start_at += 1000
+        with self.open_store(project) as store, \
+                ScrapeJournal(self.get_journal_path(project)) as journal:
+            asyncio.run(self.run_with_client(
+                self.scrape_years, project, years, store, journal))
 
-    def scrape_issue_comments(self, project):
-        """ Scrapes and appends comments for each issue in issues_dir
+    def get_last_sync(self, project):
+        """ Gets the date of the last sync of a project.
 
-        JIRA does not support scraping the comments of an issue along all its
-        other fields. Rather, each comment log has to  be scraped individually
-        with a GET request. The comments are then appended to each issue's JSON
-        file.
+        Args:
+            project: Name of project to scrape
+        Returns:
+            last_sync: String of the date in ISO format, or None if the
+                       project was never synced.
+        """
+        with ScrapeJournal(self.get_journal_path(project)) as journal:
+            return journal.last_sync
+
+    def record_sync(self, project, synced_on):
+        """ Records that every issue updated before a date was scraped.
+
+        Args:
+            project: Name of project to scrape
+            synced_on: Date on which the scraping started.
+        """
+        with ScrapeJournal(self.get_journal_path(project)) as journal:
+            journal.add_sync(synced_on.isoformat())
+
+    def scrape_updated_issues(self, project):
+        """ Scrapes the issues updated since the last sync of a project.
+
+        The updated issues are scraped again with their comments and their
+        files are rewritten. The sync is then recorded, unless some of the
+        comments could not be scraped.
+
+        Args:
+            project: Name of project to scrape
+        Returns:
+            issuekeys: Sorted list of the keys of the issues rewritten.
+        """
+        with self.open_store(project) as store, \
+                ScrapeJournal(self.get_journal_path(project)) as journal:
+            return asyncio.run(self.run_with_client(
+                self.scrape_updates, project, store, journal))
+
+    def open_store(self, project):
+        """ Opens the issues of a project for scraping.
+
+        Args:
+            project: Name of project to scrape
+        Returns:
+            store: IssueStore if issue_store is set or the project is already
+                   stored in one, otherwise an IssueDirectory.
+        """
+        module_path = os.path.dirname(os.path.realpath(__file__))
+        path = os.path.join(module_path, "..", "..", "issues", project)
+        if self.issue_store:
+            return IssueStore(path)
+        if not os.path.exists(path):
+            os.mkdir(path)
+        return open_issues(path)
+
+    def get_journal_path(self, project):
+        """ Gets the path of the scraping journal of a project.
 
         Args:
             project: Name of project to scrape
+        Returns:
+            path: Path of the journal.
         """
         module_path = os.path.dirname(os.path.realpath(__file__))
-        issues_dir = os.path.join(module_path, "..", "..", "issues", project)
+        return os.path.join(module_path, "..", "..", "logs", project,
+                            "scrape_journal.jsonl")
+
+    async def run_with_client(self, scrape, *args):
+        """ Runs a scraping coroutine with a new client.
 
-        issues_with_broken_comments = []
-        for filename in os.listdir(issues_dir):
-            path = os.path.join(issues_dir, filename)
+        Args:
+            scrape: Coroutine function taking the client and the args.
+            args: Arguments of the coroutine function.
+        Returns:
+            result: Result of the coroutine.
+        """
+        client = JiraClient(self.base_url, self.concurrency, self.rate)
+        try:
+            return await scrape(client, *args)
+        finally:
+            client.close()
 
-            with open(path, "r") as f:
-                issue_json_data = json.load(f)
+    async def scrape_years(self, client, project, years, store, journal):
+        """ Scrapes the issues opened in each year concurrently.
 
-            if issue_json_data.get('comments'):
-                print("Already scraped {}".format(filename))
-                continue
+        Args:
+            client: JiraClient used to send the requests.
+            project: Name of project to scrape
+            years: List of years in which the issues were opened in
+            store: IssueDirectory or IssueStore of the issues.
+            journal: ScrapeJournal of the project.
+        """
+        await asyncio.gather(*[
+            self.scrape_year(client, project, year, store, journal)
+            for year in years])
 
-            url = (
-                'https://issues.apache.org/jira/rest/api/2/issue/' +
-                filename +
-                '/comment'
-            )
-            print("Scraping {}".format(filename))
-            comment_json_data = self.http_get_request(url, delay=0.4)
+    async def scrape_year(self, client, project, year, store, journal):
+        """ Scrapes the issues opened in a year.
 
-            try:
-                issue_json_data['comments'] = comment_json_data['comments']
-            except:
-                issues_with_broken_comments.append(filename)
-                print("Could not scrape comments for {}".format(filename))
+        The first search page gives the number of issues, after which the
+        other pages are requested concurrently. Pages in the journal are
+        skipped.
 
-            with open(path, 'w') as f:
-                json.dump(issue_json_data, f)
+        Args:
+            client: JiraClient used to send the requests.
+            project: Name of project to scrape
+            year: Year in which the issues were opened in
+            store: IssueDirectory or IssueStore of the issues.
+            journal: ScrapeJournal of the project.
+        """
+        print("Collecting year {}".format(year))
+        first_page = journal.get_first_page(year)
+        if first_page is None:
+            first_page = await self.scrape_and_save_page(
+                client, project, year, 0, store, journal)
+        total, page_size = first_page
+        if not page_size:
+            return
+        await asyncio.gather(*[
+            self.scrape_and_save_page(client, project, year, start_at, store,
+                                      journal)
+            for start_at in range(page_size, total, page_size)
+            if not journal.has_page(year, start_at)])
+
+    async def scrape_and_save_page(self, client, project, year, start_at,
+                                   store, journal):
+        """ Scrapes a search page, saves its issues and records it.
+
+        The page is decoded as it is received and each issue is saved as
+        soon as it is complete, so a page is never held in memory at once.
+        The page is recorded once all its issues are saved.
+
+        Args:
+            client: JiraClient used to send the requests.
+            project: Name of project to scrape
+            year: Year in which the issues were opened in
+            start_at: Index of the first issue of the page.
+            store: IssueDirectory or IssueStore of the issues.
+            journal: ScrapeJournal of the project.
+        Returns:
+            page: Tuple of the number of issues opened in the year and the
+                  number of issues of the page.
+        """
+        print("Scraping issues {}-{} of {}".format(
+            start_at, start_at + self.page_size, year))
+        # JQL dates are at midnight, so the end of the year is excluded.
+        jql = ('project={} and created >= "{}/01/01" and '
+               'created < "{}/01/01"').format(project, year, year + 1)
+        decoder = JsonArrayDecoder("issues")
+        count = 0
+        saving = []
+        try:
+            async for issue in client.stream_json(
+                    "rest/api/2/search", self.get_search_params(jql, start_at),
+                    decoder):
+                count += 1
+                if self.bulk_comments:
+                    saving.append(asyncio.ensure_future(
+                        self.save_issue(client, issue, store, journal)))
+                else:
+                    self.save_issues([issue], store)
+        finally:
+            await asyncio.gather(*saving)
+        total = decoder.fields["total"]
+        journal.add_page(year, start_at, total, count)
+        return total, count
+
+    async def search(self, client, jql, start_at):
+        """ Scrapes a page of the issues matching a JQL query.
+
+        Args:
+            client: JiraClient used to send the requests.
+            jql: String of the JQL query.
+            start_at: Index of the first issue of the page.
+        Returns:
+            json_data: Search results in JSON format.
+        """
+        return await client.get_json("rest/api/2/search",
+                                     self.get_search_params(jql, start_at))
+
+    def get_search_params(self, jql, start_at):
+        """ Gets the query parameters of a page of search results.
+
+        Args:
+            jql: String of the JQL query.
+            start_at: Index of the first issue of the page.
+        Returns:
+            params: Dict of the query parameters.
+        """
+        params = {"jql": jql, "startAt": start_at,
+                  "maxResults": self.page_size, "expand": "changelog"}
+        if self.bulk_comments:
+            params["fields"] = "*navigable,comment"
+        return params
+
+    async def scrape_updates(self, client, project, store, journal):
+        """ Rewrites the issues updated since the last sync.
+
+        JQL dates are in the timezone of the server, so the issues updated
+        on the day before the last sync are scraped again as well.
+
+        Args:
+            client: JiraClient used to send the requests.
+            project: Name of project to scrape
+            store: IssueDirectory or IssueStore of the issues.
+            journal: ScrapeJournal of the project.
+        Returns:
+            issuekeys: Sorted list of the keys of the issues rewritten.
+        """
+        synced_on = datetime.now(timezone.utc).date()
+        since = (datetime.strptime(journal.last_sync, "%Y-%m-%d").date() -
+                 timedelta(days=1))
+        # Ordered by creation, so that the pages do not shift when issues
+        # are updated during the scraping.
+        jql = 'project={} and updated >= "{}" order by created'.format(
+            project, since.strftime("%Y/%m/%d"))
+        print("Scraping issues updated since {}".format(since))
+
+        json_data = await self.search(client, jql, 0)
+        pages = [json_data]
+        page_size = len(json_data["issues"])
+        if page_size:
+            pages.extend(await asyncio.gather(*[
+                self.search(client, jql, start_at)
+                for start_at in range(page_size, json_data["total"],
+                                      page_size)]))
+        issues = [issue for json_data in pages
+                  for issue in json_data["issues"]]
+        rewritten = await asyncio.gather(*[
+            self.rewrite_issue(client, issue, store, journal)
+            for issue in issues])
+
+        if False not in rewritten:
+            journal.add_sync(synced_on.isoformat())
+        return sorted(issue["key"] for issue, is_rewritten
+                      in zip(issues, rewritten) if is_rewritten)
+
+    async def rewrite_issue(self, client, issue, store, journal):
+        """ Scrapes the comments of an updated issue and rewrites its file.
+
+        Args:
+            client: JiraClient used to send the requests.
+            issue: Dict that contains the issue's data.
+            store: IssueDirectory or IssueStore of the issues.
+            journal: ScrapeJournal of the project.
+        Returns:
+            rewritten: Boolean indicating if the file of the issue was
+                       rewritten, or None for issues without a creator,
+                       which are not saved.
+        """
+        if not issue["fields"]["creator"]:
+            logging.info("{}, Issue creator is None".format(issue['key']))
+            return None
+        try:
+            if self.bulk_comments:
+                await self.complete_comments(client, issue)
+            else:
+                comment_json_data = await client.get_json(
+                    "rest/api/2/issue/{}/comment".format(issue["key"]))
+                issue['comments'] = comment_json_data['comments']
+        except Exception:
+            print("Could not scrape comments for {}".format(issue["key"]))
+            return False
+
+        self.put_issue(store, issue)
+        if not journal.has_comments(issue["key"]):
+            journal.add_comments(issue["key"])
+        return True
+
+    async def save_issue(self, client, issue, store, journal):
+        """ Completes the comments of an issue of a search page and saves it.
+
+        The issues saved with their comments are recorded in the journal.
+        Issues whose comments could not be completed are saved without them,
+        for scrape_issue_comments to scrape.
+
+        Args:
+            client: JiraClient used to send the requests.
+            issue: Dict that contains the issue's data, with the comment
+                   field.
+            store: IssueDirectory or IssueStore of the issues.
+            journal: ScrapeJournal of the project.
+        """
+        try:
+            await self.complete_comments(client, issue)
+        except Exception:
+            print("Could not scrape comments for {}".format(issue["key"]))
+            issue.pop("comments", None)
+            self.save_issues([issue], store)
+            return
+        if self.save_issues([issue], store):
+            journal.add_comments(issue["key"])
+
+    async def complete_comments(self, client, issue):
+        """ Moves the comments returned by the search to the comments of an
+        issue, requesting the ones that the search left out.
+
+        Args:
+            client: JiraClient used to send the requests.
+            issue: Dict that contains the issue's data, with the comment
+                   field.
+        """
+        comment_field = issue["fields"].pop("comment", None) or {}
+        comments = comment_field.get("comments", [])
+        total = comment_field.get("total", len(comments))
+        while len(comments) < total:
+            comment_json_data = await client.get_json(
+                "rest/api/2/issue/{}/comment".format(issue["key"]),
+                {"startAt": len(comments),
+                 "maxResults": self.comment_page_size})
+            if not comment_json_data["comments"]:
+                break
+            comments.extend(comment_json_data["comments"])
+        issue["comments"] = comments
+
+    def save_issues(self, issues, store):
+        """ Saves issues that were not scraped before.
+
+        Args:
+            issues: List of the issues in JSON format.
+            store: IssueDirectory or IssueStore of the issues.
+        Returns:
+            issuekeys: List of the keys of the issues saved.
+        """
+        issuekeys = []
+        for issue in issues:
+            if issue['key'] not in store:
+                if not issue["fields"]["creator"]:
+                    logging.info(
+                        "{}, Issue creator is None".format(issue['key']))
+                else:
+                    self.put_issue(store, issue)
+                    issuekeys.append(issue['key'])
+            else:
+                print(issue['key'] + ' already exists')
+        return issuekeys
+
+    def put_issue(self, store, issue):
+        """ Writes an issue to the store, projected if project_fields is set.
+
+        Args:
+            store: IssueDirectory or IssueStore of the issues.
+            issue: Dict that contains the issue's data.
+        """
+        if self.project_fields:
+            issue = project_issue(issue)
+        store.put(issue["key"], issue)
+
+    def scrape_issue_comments(self, project):
+        """ Scrapes and appends comments for each issue of a project
+
+        JIRA does not support scraping the comments of an issue along all its
+        other fields. Rather, each comment log has to  be scraped individually
+        with a GET request. The comments are then appended to each issue.
+
+        Args:
+            project: Name of project to scrape
+        Returns:
+            issues_with_broken_comments: List of the issues whose comments
+                                         could not be scraped.
+        """
+        module_path = os.path.dirname(os.path.realpath(__file__))
+
+        with self.open_store(project) as store, \
+                ScrapeJournal(self.get_journal_path(project)) as journal:
+            issues_with_broken_comments = asyncio.run(self.run_with_client(
+                self.scrape_comments, store, journal))
 
         comment_log_path = os.path.join(
             module_path, "..", "..", "logs", project,
             "issues_with_broken_comments.csv")
-        with open(path, 'w') as f:
+        with open(comment_log_path, 'w') as f:
             json.dump(issues_with_broken_comments, f)
+        return issues_with_broken_comments
+
+    async def scrape_comments(self, client, store, journal):
+        """ Scrapes the comments of the issues concurrently.
+
+        The issues whose comments are in the journal are skipped without
+        reading their files. A fixed number of workers take the other issues
+        from a queue, so only the issues whose comments are being scraped are
+        loaded in memory.
 
-    def http_get_request(self, url, delay):
-        """ Makes and htttp GET request
         Args:
-            url: url to send the get request to
-            delay: time to sleep after performing an http request
+            client: JiraClient used to send the requests.
+            store: IssueDirectory or IssueStore of the issues.
+            journal: ScrapeJournal of the project.
         Returns:
-            json_data: data returned from the GET request in JSON format
+            issues_with_broken_comments: List of the issues whose comments
+                                         could not be scraped.
+        """
+        filenames = [filename for filename in store.keys()
+                     if not journal.has_comments(filename)]
+        queue = asyncio.Queue()
+        for filename in filenames:
+            queue.put_nowait(filename)
+        broken_filenames = set()
+        await asyncio.gather(*[
+            self.scrape_queued_comments(client, store, queue, journal,
+                                        broken_filenames)
+            for _ in range(client.concurrency)])
+        return [filename for filename in filenames
+                if filename in broken_filenames]
+
+    async def scrape_queued_comments(self, client, store, queue, journal,
+                                     broken_filenames):
+        """ Scrapes the comments of the issues of a queue until it is empty.
+
+        Args:
+            client: JiraClient used to send the requests.
+            store: IssueDirectory or IssueStore of the issues.
+            queue: asyncio.Queue of the names of the issues' files.
+            journal: ScrapeJournal of the project.
+            broken_filenames: Set to which the issues whose comments could
+                              not be scraped are added.
         """
-        json_data = requests.get(
-            url, headers={'Content-Type': 'application/json'}
-        ).json()
-        time.sleep(delay)
-        return json_data
+        while not queue.empty():
+            filename = queue.get_nowait()
+            if not await self.scrape_issue_comment(client, store, filename,
+                                                   journal):
+                broken_filenames.add(filename)
+
+    async def scrape_issue_comment(self, client, store, filename, journal):
+        """ Scrapes the comments of an issue and appends them to its file.
+
+        Args:
+            client: JiraClient used to send the requests.
+            store: IssueDirectory or IssueStore of the issues.
+            filename: Name of the JSON file of the issue, its key.
+            journal: ScrapeJournal of the project.
+        Returns:
+            scraped: Boolean indicating if the issue has its comments.
+        """
+        issue_json_data = store.get(filename)
+
+        if issue_json_data.get('comments'):
+            print("Already scraped {}".format(filename))
+            journal.add_comments(filename)
+            return True
+
+        print("Scraping {}".format(filename))
+        try:
+            comment_json_data = await client.get_json(
+                "rest/api/2/issue/{}/comment".format(filename))
+            issue_json_data['comments'] = comment_json_data['comments']
+        except Exception:
+            print("Could not scrape comments for {}".format(filename))
+            return False
+
+        self.put_issue(store, issue_json_data)
+        journal.add_comments(filename)
+        return True
 
 
 if __name__ == '__main__':
@@ -0,0 +1,174 @@
+"""
+This module contains the journal that records the progress of the scraping of
+a project, so that an interrupted scraping resumes where it stopped.
+
+Copyright (C) 2019  Noam Rabbani
+This program is free software: you can redistribute it and/or modify
+it under the terms of the GNU General Public License as published by
+the Free Software Foundation, either version 3 of the License, or
+(at your option) any later version.
+This program is distributed in the hope that it will be useful,
+but WITHOUT ANY WARRANTY; without even the implied warranty of
+MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+GNU General Public License for more details.
+You should have received a copy of the GNU General Public License
+along with this program.  If not, see <https://www.gnu.org/licenses/>.
+Email: hello@noamrabbani.com
+"""
+
+import json
+import os
+
+
+class ScrapeJournal:
+    """ Append-only journal of the search pages and comments scraped, and of
+    the dates on which the project was synced.
+
+    Each completed unit of work is appended as a JSON line. The search pages
+    and syncs are synced to disk as they are recorded, while the comments
+    are synced in batches of sync_interval records and when the journal is
+    closed, so the journal survives a crash. A crash can lose the comments
+    recorded since the last sync, and a line cut short by a crash is
+    ignored. Their issues already hold their comments, so they are found
+    again without requests. The journal is loaded into sets, so checking if
+    work is done is O(1).
+    """
+
+    # Number of records written between two syncs of the journal.
+    sync_interval = 256
+
+    def __init__(self, path):
+        """
+        Args:
+            path: Path of the journal, created if it does not exist.
+        """
+        self.path = path
+        self.pages = {}
+        self.first_pages = {}
+        self.comments = set()
+        self.last_sync = None
+        is_terminated = True
+        if os.path.exists(path):
+            with open(path, "r") as f:
+                for line in f:
+                    is_terminated = line.endswith("\n")
+                    try:
+                        record = json.loads(line)
+                    except ValueError:
+                        continue
+                    self.apply(record)
+        self.file = open(path, "a")
+        self.unsynced_count = 0
+        if not is_terminated:
+            self.file.write("\n")
+
+    def apply(self, record):
+        """ Adds a record of the journal to the sets of completed work.
+
+        Args:
+            record: Dict of the record.
+        """
+        if "comments" in record:
+            self.comments.add(record["comments"])
+        elif "synced_on" in record:
+            self.last_sync = record["synced_on"]
+        else:
+            year = record["year"]
+            self.pages.setdefault(year, set()).add(record["start_at"])
+            if record["start_at"] == 0:
+                self.first_pages[year] = (record["total"], record["count"])
+
+    def append(self, record, sync=False):
+        """ Applies a record and writes it to the journal.
+
+        Args:
+            record: Dict of the record.
+            sync: Boolean indicating if the journal should be synced to disk
+                  now, rather than after sync_interval records.
+        """
+        self.apply(record)
+        self.file.write(json.dumps(record) + "\n")
+        self.file.flush()
+        self.unsynced_count += 1
+        if sync or self.unsynced_count >= self.sync_interval:
+            self.sync()
+
+    def sync(self):
+        """ Durably writes the records appended to the journal.
+        """
+        if self.unsynced_count:
+            os.fsync(self.file.fileno())
+            self.unsynced_count = 0
+
+    def has_page(self, year, start_at):
+        """ Checks if a search page was scraped.
+
+        Args:
+            year: Year of the issues of the page.
+            start_at: Index of the first issue of the page.
+        Returns:
+            has_page: Boolean indicating if the issues of the page are saved.
+        """
+        return start_at in self.pages.get(year, ())
+
+    def get_first_page(self, year):
+        """ Gets what the first search page of a year found.
+
+        Args:
+            year: Year of the issues.
+        Returns:
+            first_page: Tuple of the number of issues of the year and the
+                        number of issues of the first page, which is the
+                        size of the pages, or None if it was not scraped.
+        """
+        return self.first_pages.get(year)
+
+    def add_page(self, year, start_at, total, count):
+        """ Records that a search page was scraped.
+
+        Args:
+            year: Year of the issues of the page.
+            start_at: Index of the first issue of the page.
+            total: Number of issues of the year.
+            count: Number of issues of the page.
+        """
+        self.append({"year": year, "start_at": start_at, "total": total,
+                     "count": count}, sync=True)
+
+    def has_comments(self, issuekey):
+        """ Checks if the comments of an issue were scraped.
+
+        Args:
+            issuekey: Key of the issue.
+        Returns:
+            has_comments: Boolean indicating if the comments are saved.
+        """
+        return issuekey in self.comments
+
+    def add_comments(self, issuekey):
+        """ Records that the comments of an issue were scraped.
+
+        Args:
+            issuekey: Key of the issue.
+        """
+        self.append({"comments": issuekey})
+
+    def add_sync(self, synced_on):
+        """ Records that every issue updated before a date was scraped.
+
+        Args:
+            synced_on: String of the date in ISO format.
+        """
+        self.append({"synced_on": synced_on}, sync=True)
+
+    def close(self):
+        """ Syncs and closes the journal.
+        """
+        self.sync()
+        self.file.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.close()
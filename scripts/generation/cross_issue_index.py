@@ -0,0 +1,305 @@
+"""
+This module contains the index used to look up the cross issue timelines of
+users, such as the reporter reputations and assignee workloads, as of given
+dates.
+
+Copyright (C) 2019  Noam Rabbani
+This program is free software: you can redistribute it and/or modify
+it under the terms of the GNU General Public License as published by
+the Free Software Foundation, either version 3 of the License, or
+(at your option) any later version.
+This program is distributed in the hope that it will be useful,
+but WITHOUT ANY WARRANTY; without even the implied warranty of
+MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+GNU General Public License for more details.
+You should have received a copy of the GNU General Public License
+along with this program.  If not, see <https://www.gnu.org/licenses/>.
+Email: hello@noamrabbani.com
+"""
+
+import json
+import os
+import numpy as np
+
+
+# Scope of the timelines computed over the issues of all the projects. The
+# other scopes of a global index are the names of the projects.
+ALL_PROJECTS = "*"
+SCOPE_SEPARATOR = "\x1f"
+
+
+def scope_user(scope, user):
+    """ Gets the key of a user in a scope of a global index.
+
+    Args:
+        scope: Name of a project, or ALL_PROJECTS.
+        user: Key of the user in JIRA.
+    Returns:
+        key: Key of the user in the global index.
+    """
+    return scope + SCOPE_SEPARATOR + user
+
+
+def window_path(path, window):
+    """ Gets the path of the index of a windowed variant of the timelines.
+
+    Args:
+        path: Path of the index of the lifetime timelines, such as
+              "reputation_timelines.bin".
+        window: Number of days of the window.
+    Returns:
+        path: Path of the index of the windowed timelines, such as
+              "reputation_90d_timelines.bin".
+    """
+    dir_path, filename = os.path.split(path)
+    feature, suffix = filename.split("_", 1)
+    return os.path.join(dir_path, "{}_{}d_{}".format(feature, window, suffix))
+
+
+class CrossIssueIndex:
+    """ Sorted timelines of many users stored in shared NumPy arrays.
+
+    The dates and values of all users are concatenated, one user after the
+    other, and offsets[slot]:offsets[slot + 1] is the segment of the user in
+    the given slot. Each date is also encoded with the slot of its user into
+    a key, so that the keys are sorted over the whole index and a batch of
+    (user, date) queries is answered with a single searchsorted.
+    """
+
+    # Dates are stored as days since the epoch, which fit in the low bits of
+    # a key.
+    slot_shift = 32
+
+    # Binary format: the magic, the length of a JSON header holding the users
+    # and the number of dates, then the offsets, keys, dates and values
+    # arrays, each starting on an aligned position.
+    magic = b"CIDX0001"
+    alignment = 64
+
+    def __init__(self, users, offsets, dates, values, keys=None, slots=None):
+        """
+        Args:
+            users: List of the users, in the order of their segments.
+            offsets: Array of len(users) + 1 offsets of the user segments.
+            dates: Array of datetime64[D] of the dates of every user, sorted
+                   within each segment.
+            values: Array of float64 of the values on those dates.
+            keys: Array of the keys of the dates, computed if None.
+            slots: Dict mapping the users to their segment, for views that
+                   only hold some of the segments of the arrays.
+        """
+        self.users = users
+        if slots is None:
+            slots = {user: slot for slot, user in enumerate(users)}
+        self.slots = slots
+        self.offsets = offsets
+        self.dates = dates
+        self.values = values
+        if keys is None:
+            slots = np.repeat(np.arange(len(users), dtype=np.int64),
+                              np.diff(offsets))
+            keys = self.get_keys(slots, dates)
+        self.keys = keys
+
+    @classmethod
+    def from_timelines(cls, timelines, dates_key, timeline_key):
+        """ Builds an index from the timelines of extract_cross_issue_data.
+
+        Args:
+            timelines: Dict mapping users to their timeline entry.
+            dates_key: Key of the sorted list of dates in an entry, such as
+                       "reputation_dates".
+            timeline_key: Key of the dict mapping dates to values in an entry,
+                          such as "reputation_timeline".
+        Returns:
+            index: CrossIssueIndex of the timelines.
+        """
+        users = list(timelines)
+        offsets = np.zeros(len(users) + 1, dtype=np.int64)
+        dates = []
+        values = []
+        for slot, user in enumerate(users):
+            user_dates = timelines[user][dates_key]
+            user_timeline = timelines[user][timeline_key]
+            dates.extend(user_dates)
+            values.extend(user_timeline[date] for date in user_dates)
+            offsets[slot + 1] = offsets[slot] + len(user_dates)
+        return cls(users, offsets, np.array(dates, dtype="datetime64[D]"),
+                   np.array(values, dtype=np.float64))
+
+    @classmethod
+    def load(cls, path):
+        """ Opens an index saved with save.
+
+        The arrays are memory-mapped rather than read, so that opening an
+        index is fast and processes share its pages.
+
+        Args:
+            path: Path of the index.
+        Returns:
+            index: CrossIssueIndex backed by the file.
+        """
+        with open(path, "rb") as f:
+            if f.read(len(cls.magic)) != cls.magic:
+                raise ValueError("{} is not a cross issue index".format(path))
+            header_size = int.from_bytes(f.read(8), "little")
+            header = json.loads(f.read(header_size).decode("utf-8"))
+
+        users = header["users"]
+        date_count = header["date_count"]
+        position = cls.align(len(cls.magic) + 8 + header_size)
+        arrays = []
+        for dtype, count in [(np.int64, len(users) + 1),
+                             (np.int64, date_count),
+                             ("datetime64[D]", date_count),
+                             (np.float64, date_count)]:
+            if count:
+                arrays.append(np.memmap(path, dtype=dtype, mode="r",
+                                        offset=position, shape=(count,)))
+            else:
+                arrays.append(np.zeros(0, dtype=dtype))
+            position = cls.align(position + 8 * count)
+        offsets, keys, dates, values = arrays
+        return cls(users, offsets, dates, values, keys)
+
+    def save(self, path):
+        """ Saves the index in its binary format.
+
+        The file is written next to its destination and then moved, so that
+        processes that mapped the previous index are not affected.
+
+        Args:
+            path: Path of the index.
+        """
+        if len(self.offsets) != len(self.users) + 1:
+            raise ValueError("Only whole indexes can be saved, not views")
+        header = json.dumps({"users": self.users,
+                             "date_count": len(self.dates)}).encode("utf-8")
+        tmp_path = path + ".tmp"
+        with open(tmp_path, "wb") as f:
+            f.write(self.magic)
+            f.write(len(header).to_bytes(8, "little"))
+            f.write(header)
+            for array, dtype in [(self.offsets, np.int64),
+                                 (self.keys, np.int64),
+                                 (self.dates, "datetime64[D]"),
+                                 (self.values, np.float64)]:
+                f.write(b"\0" * (self.align(f.tell()) - f.tell()))
+                f.write(np.ascontiguousarray(array, dtype=dtype).tobytes())
+        os.replace(tmp_path, path)
+
+    def view(self, scope):
+        """ Gets the timelines of a scope of a global index.
+
+        The view shares the arrays of the index, so it is cheap to create
+        and still backed by the file of a loaded index.
+
+        Args:
+            scope: Name of a project, or ALL_PROJECTS.
+        Returns:
+            index: CrossIssueIndex of the users of the scope, keyed by their
+                   JIRA keys.
+        """
+        prefix = scope_user(scope, "")
+        slots = {user[len(prefix):]: slot for user, slot in self.slots.items()
+                 if user.startswith(prefix)}
+        return CrossIssueIndex(list(slots), self.offsets, self.dates,
+                               self.values, self.keys, slots)
+
+    @classmethod
+    def align(cls, position):
+        """ Rounds a position in the binary format up to the alignment.
+        """
+        return -(-position // cls.alignment) * cls.alignment
+
+    def get_keys(self, slots, dates):
+        """ Encodes (slot, date) pairs into sortable keys.
+
+        Args:
+            slots: Array of the slots of the users.
+            dates: Array of datetime64[D] of the dates.
+        Returns:
+            keys: Array of int64 keys.
+        """
+        days = dates.astype("datetime64[D]").astype(np.int64)
+        return (slots << self.slot_shift) + days
+
+    def get_timeline(self, user):
+        """ Gets the segment of a user.
+
+        Args:
+            user: Key of the user.
+        Returns:
+            dates: Array of datetime64[D] of the user's dates.
+            values: Array of the values on those dates.
+        """
+        slot = self.slots[user]
+        start, stop = self.offsets[slot], self.offsets[slot + 1]
+        return self.dates[start:stop], self.values[start:stop]
+
+    def iter_timeline(self, user, start=0, chunk_size=64):
+        """ Iterates over the timeline of a user from a position.
+
+        The dates and values are converted to Python objects a chunk at a
+        time, so stopping early does not convert the whole timeline.
+
+        Args:
+            user: Key of the user.
+            start: Position in the user's timeline of the first item.
+            chunk_size: Number of items converted at a time.
+        Yields:
+            item: Tuple of the date and the value on that date.
+        """
+        dates, values = self.get_timeline(user)
+        for chunk_start in range(start, len(dates), chunk_size):
+            chunk_stop = chunk_start + chunk_size
+            yield from zip(dates[chunk_start:chunk_stop].tolist(),
+                           values[chunk_start:chunk_stop].tolist())
+
+    def searchsorted(self, users, dates, side="right"):
+        """ Finds the position of many dates in the timelines of their users.
+
+        Args:
+            users: Sequence of the users of the queries.
+            dates: Sequence of the dates of the queries.
+            side: "right" to count the dates of the user that are on or
+                  before the queried date, "left" to count the ones before.
+        Returns:
+            positions: Array of the positions of the dates, relative to the
+                       start of each user's timeline.
+        """
+        slots = np.array([self.slots[user] for user in users],
+                         dtype=np.int64)
+        keys = self.get_keys(slots, np.array(dates, dtype="datetime64[D]"))
+        return (np.searchsorted(self.keys, keys, side=side) -
+                self.offsets[slots])
+
+    def lookup(self, users, dates):
+        """ Gets the values of many users as of the given dates.
+
+        Args:
+            users: Sequence of the users of the queries.
+            dates: Sequence of the dates of the queries.
+        Returns:
+            values: Array of the value of each user on the last date of their
+                    timeline that is on or before the queried date, or NaN if
+                    there is none.
+        """
+        slots = np.array([self.slots[user] for user in users],
+                         dtype=np.int64)
+        positions = self.searchsorted(users, dates) - 1
+        found = positions >= 0
+        values = np.full(len(slots), np.nan)
+        values[found] = self.values[self.offsets[slots[found]] +
+                                    positions[found]]
+        return values
+
+    def __contains__(self, user):
+        return user in self.slots
+
+    def __len__(self):
+        return len(self.users)
+
+    def __repr__(self):
+        return "CrossIssueIndex({} users, {} dates)".format(
+            len(self.users), len(self.dates))
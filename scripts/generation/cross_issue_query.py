@@ -0,0 +1,163 @@
+"""
+This module contains the query API used to get the reputation of reporters
+and the workload of assignees as of given dates, without going through the
+generation of a dataset.
+
+Copyright (C) 2019  Noam Rabbani
+This program is free software: you can redistribute it and/or modify
+it under the terms of the GNU General Public License as published by
+the Free Software Foundation, either version 3 of the License, or
+(at your option) any later version.
+This program is distributed in the hope that it will be useful,
+but WITHOUT ANY WARRANTY; without even the implied warranty of
+MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+GNU General Public License for more details.
+You should have received a copy of the GNU General Public License
+along with this program.  If not, see <https://www.gnu.org/licenses/>.
+Email: hello@noamrabbani.com
+"""
+
+from functools import lru_cache
+import bisect
+import datetime
+import numpy as np
+
+
+class CrossIssueQuery:
+    """ Point-in-time queries on the reputation and workload timelines.
+
+    A single query bisects the timeline of its user, which is converted to
+    Python dates and values once and kept in a bounded LRU cache, so the
+    queries on hot users do not touch the index again. Batches of queries are
+    answered by the index with one searchsorted over all of them.
+    """
+
+    def __init__(self, reputations, workloads, cache_size=1024):
+        """
+        Args:
+            reputations: CrossIssueIndex of the reputation of each user and
+                         how it changes over time.
+            workloads: CrossIssueIndex of the workloads of each user and
+                       how it changes over time.
+            cache_size: Maximum number of timelines kept in each cache.
+        """
+        self.reputations = reputations
+        self.workloads = workloads
+        self.get_reputation_timeline = lru_cache(maxsize=cache_size)(
+            lambda user: self.get_timeline(self.reputations, user))
+        self.get_workload_timeline = lru_cache(maxsize=cache_size)(
+            lambda user: self.get_timeline(self.workloads, user))
+
+    def reputation_at(self, user, date):
+        """ Gets the reputation of a reporter as of a date.
+
+        Args:
+            user: Key of the reporter.
+            date: Date or datetime of the query.
+        Returns:
+            reputation: Reputation of the reporter on the last change of their
+                        reputation on or before the date, or NaN if there is
+                        none.
+        """
+        return self.value_at(self.get_reputation_timeline(user), date)
+
+    def workload_at(self, user, date):
+        """ Gets the workload of an assignee as of a date.
+
+        Args:
+            user: Key of the assignee.
+            date: Date or datetime of the query.
+        Returns:
+            workload: Workload of the assignee on the last change of their
+                      workload on or before the date, or NaN if there is none.
+        """
+        return self.value_at(self.get_workload_timeline(user), date)
+
+    def reputations_at(self, users, dates):
+        """ Gets the reputation of many reporters as of the given dates.
+
+        Args:
+            users: Sequence of the keys of the reporters.
+            dates: Sequence of the dates of the queries.
+        Returns:
+            reputations: Array of float64 of the reputations, NaN where there
+                         is none.
+        """
+        return self.values_at(self.reputations, users, dates)
+
+    def workloads_at(self, users, dates):
+        """ Gets the workload of many assignees as of the given dates.
+
+        Args:
+            users: Sequence of the keys of the assignees.
+            dates: Sequence of the dates of the queries.
+        Returns:
+            workloads: Array of float64 of the workloads, NaN where there is
+                       none.
+        """
+        return self.values_at(self.workloads, users, dates)
+
+    def get_timeline(self, index, user):
+        """ Converts the timeline of a user to Python dates and values.
+
+        Args:
+            index: CrossIssueIndex of the timelines.
+            user: Key of the user.
+        Returns:
+            dates: List of the dates of the user's timeline.
+            values: List of the values on those dates.
+        """
+        if user not in index:
+            return [], []
+        dates, values = index.get_timeline(user)
+        return dates.tolist(), values.tolist()
+
+    def value_at(self, timeline, date):
+        """ Bisects a timeline for the value as of a date.
+
+        Args:
+            timeline: Tuple of the dates and values of a user.
+            date: Date or datetime of the query.
+        Returns:
+            value: Value on the last date on or before the date, or NaN.
+        """
+        dates, values = timeline
+        if isinstance(date, datetime.datetime):
+            date = date.date()
+        idx = bisect.bisect_right(dates, date)
+        if idx == 0:
+            return float("nan")
+        return values[idx - 1]
+
+    def values_at(self, index, users, dates):
+        """ Looks up many (user, date) queries in an index.
+
+        Args:
+            index: CrossIssueIndex of the timelines.
+            users: Sequence of the keys of the users.
+            dates: Sequence of the dates of the queries.
+        Returns:
+            values: Array of float64 of the values, NaN where there is none.
+        """
+        users = list(users)
+        # Datetimes are queried on their local date, as in value_at, rather
+        # than on the UTC date NumPy would convert them to.
+        dates = np.array([d.date() if isinstance(d, datetime.datetime) else d
+                          for d in dates], dtype="datetime64[D]")
+        known = np.array([user in index for user in users], dtype=bool)
+        values = np.full(len(users), np.nan)
+        if known.any():
+            values[known] = index.lookup(
+                [user for user, is_known in zip(users, known) if is_known],
+                dates[known])
+        return values
+
+    def cache_info(self):
+        """ Gets the statistics of the timeline caches.
+
+        Returns:
+            info: Dict mapping "reputations" and "workloads" to the
+                  statistics of their cache.
+        """
+        return {"reputations": self.get_reputation_timeline.cache_info(),
+                "workloads": self.get_workload_timeline.cache_info()}
@@ -0,0 +1,191 @@
+"""
+This module contains the manifest that records what the rows of a counting
+process dataset were generated from, so that the dataset can be updated by
+only processing the issues that changed.
+
+Copyright (C) 2019  Noam Rabbani
+This program is free software: you can redistribute it and/or modify
+it under the terms of the GNU General Public License as published by
+the Free Software Foundation, either version 3 of the License, or
+(at your option) any later version.
+This program is distributed in the hope that it will be useful,
+but WITHOUT ANY WARRANTY; without even the implied warranty of
+MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+GNU General Public License for more details.
+You should have received a copy of the GNU General Public License
+along with this program.  If not, see <https://www.gnu.org/licenses/>.
+Email: hello@noamrabbani.com
+"""
+
+import hashlib
+import json
+import os
+
+
+def hash_content(content):
+    """ Gets the digest of the content of an issue file.
+
+    Args:
+        content: Bytes of the file.
+    Returns:
+        digest: Hex digest of the content.
+    """
+    return hashlib.sha1(content).hexdigest()
+
+
+def digest_timelines(timelines, window_timelines=()):
+    """ Gets a digest of the timeline of each user.
+
+    Args:
+        timelines: CrossIssueIndex of the reputations or workloads of each
+                   user and how they change over time, or None.
+        window_timelines: Sequence of the CrossIssueIndex of the windowed
+                          variants of the timelines, which are digested
+                          with them.
+    Returns:
+        digests: Dict mapping each user to the hex digest of their timeline.
+    """
+    if not timelines:
+        return {}
+    digests = {}
+    for user in timelines.users:
+        dates, values = timelines.get_timeline(user)
+        digest = hashlib.sha1(dates.tobytes())
+        digest.update(values.tobytes())
+        for window_index in window_timelines:
+            if user in window_index:
+                dates, values = window_index.get_timeline(user)
+                digest.update(dates.tobytes())
+                digest.update(values.tobytes())
+        digests[user] = digest.hexdigest()
+    return digests
+
+
+class DatasetManifest:
+    """ Records the settings, cross issue data and issue files that a dataset
+    was generated from.
+
+    For each issue file, the manifest keeps the hash of its content, the
+    number of rows it produced, the users whose timelines were used for its
+    features and whether its rows are stable. The rows of an issue that is
+    unresolved, or was resolved on the day of generation, depend on the day
+    they were generated on and are not stable.
+    """
+
+    version = 1
+
+    def __init__(self, settings, generated_on, reputation_digests,
+                 workload_digests, issues=None, dataset_size=None):
+        """
+        Args:
+            settings: Dict of the generation settings, such as the flags and
+                      columns of the dataset.
+            generated_on: String of the date on which the dataset was
+                          generated.
+            reputation_digests: Dict mapping reporters to the digest of their
+                                reputation timeline.
+            workload_digests: Dict mapping assignees to the digest of their
+                              workload timeline.
+            issues: Dict mapping issue filenames to their manifest entry.
+            dataset_size: Size in bytes of the dataset.
+        """
+        self.settings = settings
+        self.generated_on = generated_on
+        self.reputation_digests = reputation_digests
+        self.workload_digests = workload_digests
+        self.issues = issues if issues is not None else {}
+        self.dataset_size = dataset_size
+
+    @classmethod
+    def load(cls, path):
+        """ Loads a manifest.
+
+        Args:
+            path: Path of the manifest.
+        Returns:
+            manifest: The DatasetManifest, or None if there is no manifest or
+                      it was written by another version.
+        """
+        if not os.path.exists(path):
+            return None
+        with open(path, "r") as f:
+            data = json.load(f)
+        if data.get("version") != cls.version:
+            return None
+        return cls(data["settings"], data["generated_on"],
+                   data["reputation_digests"], data["workload_digests"],
+                   data["issues"], data["dataset_size"])
+
+    def save(self, path):
+        """ Saves the manifest.
+
+        Args:
+            path: Path of the manifest.
+        """
+        data = {"version": self.version,
+                "settings": self.settings,
+                "generated_on": self.generated_on,
+                "dataset_size": self.dataset_size,
+                "reputation_digests": self.reputation_digests,
+                "workload_digests": self.workload_digests,
+                "issues": self.issues}
+        with open(path, "w") as f:
+            json.dump(data, f, sort_keys=True)
+
+    def matches(self, settings, dataset_path):
+        """ Checks if the dataset on disk can be updated with this manifest.
+
+        Args:
+            settings: Dict of the settings of the new generation.
+            dataset_path: Path of the dataset.
+        Returns:
+            matches: Boolean indicating if the dataset was generated with the
+                     same settings and has not been modified since.
+        """
+        return (self.settings == settings and
+                os.path.exists(dataset_path) and
+                os.path.getsize(dataset_path) == self.dataset_size)
+
+    def is_reusable(self, filename, content_hash, generated_on,
+                    reputation_digests, workload_digests):
+        """ Checks if the rows of an issue can be copied from the dataset.
+
+        Args:
+            filename: Filename of the issue.
+            content_hash: Hash of the current content of the issue file.
+            generated_on: String of the date of the new generation.
+            reputation_digests: Dict mapping reporters to the digest of their
+                                current reputation timeline.
+            workload_digests: Dict mapping assignees to the digest of their
+                              current workload timeline.
+        Returns:
+            reusable: Boolean indicating if the issue's rows are up to date.
+        """
+        entry = self.issues.get(filename)
+        if entry is None or entry["hash"] != content_hash:
+            return False
+        if not entry["stable"] and self.generated_on != generated_on:
+            return False
+        for reporter in entry["reporters"]:
+            if (self.reputation_digests.get(reporter) !=
+                    reputation_digests.get(reporter)):
+                return False
+        for assignee in entry["assignees"]:
+            if (self.workload_digests.get(assignee) !=
+                    workload_digests.get(assignee)):
+                return False
+        return True
+
+    def get_row_offsets(self):
+        """ Gets the position of the rows of each issue in the dataset.
+
+        Returns:
+            offsets: Dict mapping issue filenames to the index of their first
+                     row, not counting the header.
+        """
+        offsets = {}
+        row_idx = 0
+        for filename in sorted(self.issues):
+            offsets[filename] = row_idx
+            row_idx += self.issues[filename]["rows"]
+        return offsets
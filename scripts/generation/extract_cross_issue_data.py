@@ -17,16 +17,22 @@ Email: hello@noamrabbani.com
 """
 
 
+from concurrent.futures import ThreadPoolExecutor
 from copy import deepcopy
-import bisect
-from dateutil.parser import parse
+import gzip
 import pickle
 import datetime
 import json
 import os
 import sys
+import numpy as np
 sys.path.insert(0, "./scripts/generation/")
 import generate_dataset  # noqa
+from jira_timestamp import parse_date  # noqa
+from issue_decoder import decode_events, load_issue  # noqa
+from issue_store import open_issues  # noqa
+from cross_issue_index import (  # noqa
+    ALL_PROJECTS, CrossIssueIndex, scope_user, window_path)
 
 
 def main():
@@ -36,306 +42,857 @@ def main():
         exit()
 
     project = sys.argv[1]
+    # Days of the windowed reputations and workloads, which are only
+    # attached to a dataset when CountingProcess is given the same windows.
+    windows = (90, 365)
 
     cp = generate_dataset.CountingProcess()
+    if project == generate_dataset.GLOBAL_CROSS_ISSUE_DIR:
+        # Build the global index of the projects given after "global"
+        project_input_paths = {
+            project: cp.generate_file_paths(project)[0]
+            for project in sys.argv[2:]}
+        _, output_paths = cp.generate_file_paths(
+            generate_dataset.GLOBAL_CROSS_ISSUE_DIR)
+        cidp = CrossIssueDataProcessor()
+        cidp.generate_global_index(project_input_paths, output_paths,
+                                   windows)
+        return
+
     input_paths, output_paths = cp.generate_file_paths(project)
 
-    cidp = CrossIssueDataProcessor()
-    reputations = cidp.generate_reporter_reputations(input_paths, output_paths)
-    workloads = cidp.generate_assignee_workloads(input_paths, output_paths)
+    # The worklogs are kept to update the cross issue data later on. The
+    # other dumps are only useful to debug the timelines.
+    json_dumps = CrossIssueDataProcessor.worklog_dump_names
+    compress_json = True
+
+    cidp = CrossIssueDataProcessor(json_dumps, compress_json)
+    if len(sys.argv) > 2:
+        # Only update the users of the given issues
+        cidp.update_cross_issue_data(input_paths, output_paths, sys.argv[2:],
+                                     windows)
+    else:
+        reporter_worklogs, assignee_worklogs = cidp.generate_worklogs(
+            input_paths, output_paths)
+        reputations = cidp.generate_reporter_reputations(
+            input_paths, output_paths, reporter_worklogs)
+        workloads = cidp.generate_assignee_workloads(
+            input_paths, output_paths, assignee_worklogs)
+        cidp.generate_window_timelines(
+            input_paths, output_paths, windows, reporter_worklogs,
+            assignee_worklogs)
+    cidp.wait_for_json_dumps()
 
 
 class CrossIssueDataProcessor():
     """ Parses JSON issues to extract cross-issue data.
+
+    Besides the timelines used to generate the datasets, the extraction dumps
+    its intermediate data as JSON files. Those are written by a background
+    thread, and only the ones named in json_dumps are written.
     """
 
-    def generate_reporter_reputations(self, input_paths, output_paths):
+    # Names of the JSON dumps, without their extension. Only the worklogs are
+    # read back, by update_cross_issue_data.
+    json_dump_names = ("reporter_worklogs",
+                       "assignee_worklogs",
+                       "open_issues_timelines",
+                       "close_issues_timelines",
+                       "reputation_timelines",
+                       "assigned_issues_timelines",
+                       "unassigned_issues_timelines",
+                       "workloads_timelines",
+                       )
+    worklog_dump_names = ("reporter_worklogs", "assignee_worklogs")
+
+    def __init__(self, json_dumps=None, compress_json=False):
+        """
+        Args:
+            json_dumps: Names of the JSON dumps to write, such as
+                        "reporter_worklogs". All of them are written if None.
+            compress_json: Boolean indicating if the JSON dumps should be
+                           compressed with gzip.
+        """
+        if json_dumps is None:
+            json_dumps = self.json_dump_names
+        self.json_dumps = set(json_dumps)
+        self.compress_json = compress_json
+        self.json_writer = None
+        self.json_writes = []
+
+    def generate_reporter_reputations(self, input_paths, output_paths,
+                                      worklogs=None, reporters=None):
 
         open_issues_timelines = {}
         close_issues_timelines = {}
         reputation_timelines = {}
 
-        worklogs = self.generate_reporter_worklogs(input_paths, output_paths)
-        for reporter, worklog in worklogs.items():
+        if worklogs is None:
+            worklogs = self.generate_reporter_worklogs(input_paths,
+                                                       output_paths)
+        if reporters is not None:
+            worklogs = {reporter: worklogs[reporter] for reporter in reporters
+                        if reporter in worklogs}
+        count_timelines = self.build_count_timelines(
+            worklogs, "creation_date", "resolution_date",
+            lambda opened, fixed: fixed / (opened + 1))
+        for reporter, count_timeline in count_timelines.items():
             open_dates, issues_opened_on, open_issues_timeline = (
-                self.extract_opened_issues(reporter, worklog))
+                count_timeline["start"])
             timeline_entry = {"open_dates": open_dates,
                               "issues_opened_on": issues_opened_on,
                               "open_issues_timeline": open_issues_timeline}
             open_issues_timelines[reporter] = timeline_entry
 
             close_dates, issues_closed_on, close_issues_timeline = (
-                self.extract_closed_issues(reporter, worklog))
+                count_timeline["end"])
             timeline_entry = {"close_dates": close_dates,
                               "issues_closed_on": issues_closed_on,
                               "close_issues_timeline": close_issues_timeline}
             close_issues_timelines[reporter] = timeline_entry
 
-            reputation_timeline = {}
-            reputation_dates = []
-            for date in open_dates:
-                if reputation_timeline.get(date) is None:
-                    bisect.insort(reputation_dates, date)
-                    reputation_timeline[date] = -1
-            for date in close_dates:
-                if reputation_timeline.get(date) is None:
-                    bisect.insort(reputation_dates, date)
-                    reputation_timeline[date] = -1
-
-            opened = 0
-            fixed = 0
-            for date in reputation_dates:
-                if open_issues_timeline.get(date):
-                    opened = open_issues_timeline[date]
-                if close_issues_timeline.get(date):
-                    fixed = close_issues_timeline[date]
-                reputation_timeline[date] = (fixed / (opened + 1))
-            timeline_entry = {"reputation_dates": reputation_dates,
-                              "reputation_timeline": reputation_timeline}
+            timeline_entry = {
+                "reputation_dates": count_timeline["dates"],
+                "reputation_timeline": count_timeline["timeline"]}
             reputation_timelines[reporter] = timeline_entry
 
         output_path = os.path.join(
             output_paths["cross_issue"], "reputation_timelines.pickle")
-        with open(output_path, 'wb') as fp:
-            pickle.dump(reputation_timelines, fp)
+        reputation_timelines = self.save_dict_as_pickle(
+            output_path, reputation_timelines, reporters)
+
+        output_path = os.path.join(
+            output_paths["cross_issue"], "reputation_timelines.bin")
+        CrossIssueIndex.from_timelines(
+            reputation_timelines, "reputation_dates",
+            "reputation_timeline").save(output_path)
 
         output_path = os.path.join(
             output_paths["cross_issue"], "open_issues_timelines.json")
-        self.save_dict_as_json(output_path, open_issues_timelines)
+        self.save_dict_as_json(output_path, open_issues_timelines, reporters)
 
         output_path = os.path.join(
             output_paths["cross_issue"], "close_issues_timelines.json")
-        self.save_dict_as_json(output_path, close_issues_timelines)
+        self.save_dict_as_json(output_path, close_issues_timelines, reporters)
 
         output_path = os.path.join(
             output_paths["cross_issue"], "reputation_timelines.json")
-        self.save_dict_as_json(output_path, reputation_timelines)
+        self.save_dict_as_json(output_path, reputation_timelines, reporters)
 
         return reputation_timelines
 
-    def generate_assignee_workloads(self, input_paths, output_paths):
+    def generate_assignee_workloads(self, input_paths, output_paths,
+                                    worklogs=None, assignees=None):
         assigned_issues_timelines = {}
         unassigned_issues_timelines = {}
         workload_timelines = {}
 
-        worklogs = self.generate_assignee_worklogs(input_paths, output_paths)
-        for assignee, worklog in worklogs.items():
+        if worklogs is None:
+            worklogs = self.generate_assignee_worklogs(input_paths,
+                                                       output_paths)
+        if assignees is not None:
+            worklogs = {assignee: worklogs[assignee] for assignee in assignees
+                        if assignee in worklogs}
+        count_timelines = self.build_count_timelines(
+            worklogs, "assigned_date", "unassigned_date",
+            lambda assigned, unassigned: assigned - unassigned)
+        for assignee, count_timeline in count_timelines.items():
             assigned_dates, issues_assigned_on, assigned_issues_timeline = (
-                self.extract_assigned_issues(assignee, worklog))
+                count_timeline["start"])
             timeline_entry = {"assigned_dates": assigned_dates,
                               "issues_assigned_on": issues_assigned_on,
                               "assigned_issues_timeline": assigned_issues_timeline}  # noqa
             assigned_issues_timelines[assignee] = timeline_entry
 
             unassigned_dates, issues_unassigned_on, unassigned_issues_timeline = (  # noqa
-                self.extract_unassigned_issues(assignee, worklog))
+                count_timeline["end"])
             timeline_entry = {"unassigned_dates": unassigned_dates,
                               "issues_unassigned_on": issues_unassigned_on,
                               "unassigned_issues_timeline": unassigned_issues_timeline}  # noqa
             unassigned_issues_timelines[assignee] = timeline_entry
 
-            workload_timeline = {}
-            workload_dates = []
-            for date in assigned_dates:
-                if workload_timeline.get(date) is None:
-                    bisect.insort(workload_dates, date)
-                    workload_timeline[date] = -1
-            for date in unassigned_dates:
-                if workload_timeline.get(date) is None:
-                    bisect.insort(workload_dates, date)
-                    workload_timeline[date] = -1
-
-            assigned = 0
-            unassigned = 0
-            for date in workload_dates:
-                if assigned_issues_timeline.get(date):
-                    assigned = assigned_issues_timeline[date]
-                if unassigned_issues_timeline.get(date):
-                    unassigned = unassigned_issues_timeline[date]
-                workload_timeline[date] = assigned - unassigned
-            timeline_entry = {"workload_dates": workload_dates,
-                              "workload_timeline": workload_timeline}
+            timeline_entry = {"workload_dates": count_timeline["dates"],
+                              "workload_timeline": count_timeline["timeline"]}
             workload_timelines[assignee] = timeline_entry
 
         output_path = os.path.join(
             output_paths["cross_issue"], "workload_timelines.pickle")
-        with open(output_path, 'wb') as fp:
-            pickle.dump(workload_timelines, fp)
+        workload_timelines = self.save_dict_as_pickle(
+            output_path, workload_timelines, assignees)
+
+        output_path = os.path.join(
+            output_paths["cross_issue"], "workload_timelines.bin")
+        CrossIssueIndex.from_timelines(
+            workload_timelines, "workload_dates",
+            "workload_timeline").save(output_path)
 
         output_path = os.path.join(
             output_paths["cross_issue"], "assigned_issues_timelines.json")
-        self.save_dict_as_json(output_path, assigned_issues_timelines)
+        self.save_dict_as_json(output_path, assigned_issues_timelines,
+                               assignees)
 
         output_path = os.path.join(
             output_paths["cross_issue"], "unassigned_issues_timelines.json")
-        self.save_dict_as_json(output_path, unassigned_issues_timelines)
+        self.save_dict_as_json(output_path, unassigned_issues_timelines,
+                               assignees)
 
         output_path = os.path.join(
             output_paths["cross_issue"], "workloads_timelines.json")
-        self.save_dict_as_json(output_path, workload_timelines)
+        self.save_dict_as_json(output_path, workload_timelines, assignees)
 
         return workload_timelines
 
-    # TODO: merge the two functions below
-    def extract_closed_issues(self, reporter, worklog):
+    def generate_global_index(self, project_input_paths, output_paths,
+                              windows=()):
+        """ Generates the timelines of the users of many projects at once.
+
+        The reporters and assignees are shared by the projects of a JIRA
+        instance. Each issue is read once and counted both in the scope of
+        its project and in the ALL_PROJECTS scope, and the timelines of all
+        the scopes are built together and saved as one index per feature.
+        A scope's view of the index holds the same timelines as the ones
+        extracted for the project alone.
+
+        Args:
+            project_input_paths: Dict mapping the projects to their input
+                                 paths.
+            output_paths: Dictionary containing paths of output files.
+            windows: Sequence of the numbers of days of the windowed
+                     timelines to generate.
+        Returns:
+            reputations: CrossIssueIndex of the reputation of each scoped
+                         user and how it changes over time.
+            workloads: CrossIssueIndex of the workloads of each scoped user
+                       and how it changes over time.
+        """
+        reporter_worklogs = {}
+        assignee_worklogs = {}
+        cp = generate_dataset.CountingProcess()
+        for project, input_paths in sorted(project_input_paths.items()):
+            for issue in self.iter_issues(input_paths):
+                issue_reporter_worklogs = {}
+                issue_assignee_worklogs = {}
+                self.add_reporter_worklog_entry(issue,
+                                                issue_reporter_worklogs)
+                self.add_assignee_worklog_entries(issue,
+                                                  issue_assignee_worklogs, cp)
+                for worklogs, issue_worklogs in [
+                        (reporter_worklogs, issue_reporter_worklogs),
+                        (assignee_worklogs, issue_assignee_worklogs)]:
+                    for user, entries in issue_worklogs.items():
+                        for scope in (project, ALL_PROJECTS):
+                            scoped_user = scope_user(scope, user)
+                            worklogs[scoped_user] = worklogs.get(
+                                scoped_user, [])
+                            worklogs[scoped_user].extend(entries)
+
+        count_timelines = self.build_count_timelines(
+            reporter_worklogs, "creation_date", "resolution_date",
+            lambda opened, fixed: fixed / (opened + 1))
+        reputation_timelines = {
+            user: {"reputation_dates": count_timeline["dates"],
+                   "reputation_timeline": count_timeline["timeline"]}
+            for user, count_timeline in count_timelines.items()}
+        reputations = CrossIssueIndex.from_timelines(
+            reputation_timelines, "reputation_dates", "reputation_timeline")
+        reputations.save(os.path.join(output_paths["cross_issue"],
+                                      "reputation_timelines.bin"))
+
+        count_timelines = self.build_count_timelines(
+            assignee_worklogs, "assigned_date", "unassigned_date",
+            lambda assigned, unassigned: assigned - unassigned)
+        workload_timelines = {
+            user: {"workload_dates": count_timeline["dates"],
+                   "workload_timeline": count_timeline["timeline"]}
+            for user, count_timeline in count_timelines.items()}
+        workloads = CrossIssueIndex.from_timelines(
+            workload_timelines, "workload_dates", "workload_timeline")
+        workloads.save(os.path.join(output_paths["cross_issue"],
+                                    "workload_timelines.bin"))
+
+        if windows:
+            self.generate_window_timelines(None, output_paths, windows,
+                                           reporter_worklogs,
+                                           assignee_worklogs)
+        return reputations, workloads
+
+    def build_count_timelines(self, worklogs, start_key, end_key, combine):
+        """ Counts the issues that every user started and ended over time.
+
+        The start and end dates of all the users are flattened into arrays
+        and counted at once with unique and cumsum.
+
+        Args:
+            worklogs: Dict mapping users to their worklog entries.
+            start_key: Key of the date on which an issue was started, such as
+                       "creation_date".
+            end_key: Key of the date on which an issue was ended, or None if
+                     it was not, such as "resolution_date".
+            combine: Function computing the values of the timeline from the
+                     arrays of cumulative started and ended issues.
+        Returns:
+            count_timelines: Dict mapping users to a dict with:
+                start: Tuple of the sorted start dates, the number of issues
+                       started on each date (in the order the dates occur in
+                       the worklog) and the cumulative number of issues
+                       started as of each date.
+                end: Same tuple for the end dates.
+                dates: Sorted list of both the start and end dates.
+                timeline: Dict mapping dates to the value of the user on
+                          that date, with the start dates first.
+        """
+        users = list(worklogs)
+        groups = []
         dates = []
-        issues_closed_on = {}
-        for issue in worklog:
-            if issue["resolution_date"]:
-                date = issue["resolution_date"]
-            else:
+        for slot, user in enumerate(users):
+            for entry in worklogs[user]:
+                groups.append(2 * slot)
+                dates.append(entry[start_key])
+                if entry[end_key]:
+                    groups.append(2 * slot + 1)
+                    dates.append(entry[end_key])
+        groups = np.array(groups, dtype=np.int64)
+        days = np.fromiter((date.toordinal() for date in dates),
+                           dtype=np.int64, count=len(dates))
+        base = days.min() if len(days) else 0
+
+        # Count the issues of every (user, start or end, date) and take the
+        # running sum within each (user, start or end) group.
+        keys = (groups << 32) + (days - base)
+        keys, first_idxs, counts = np.unique(keys, return_index=True,
+                                             return_counts=True)
+        key_groups = keys >> 32
+        cumulative = np.cumsum(counts)
+        group_starts = np.searchsorted(key_groups, key_groups)
+        cumulative -= cumulative[group_starts] - counts[group_starts]
+
+        # Merge the start and end dates of every user and get the cumulative
+        # counts as of each merged date.
+        slot_keys = ((key_groups >> 1) << 32) + (keys & 0xffffffff)
+        merged_keys = np.unique(slot_keys)
+        as_of = []
+        merged_sources = np.full(len(merged_keys), -1, dtype=np.int64)
+        for kind in (0, 1):
+            kind_idxs = np.flatnonzero((key_groups & 1) == kind)
+            kind_keys = slot_keys[kind_idxs]
+            if not len(kind_keys):
+                as_of.append(np.zeros(len(merged_keys), dtype=np.int64))
                 continue
-            if issues_closed_on.get(date):
-                issues_closed_on[date] += 1
-            else:
-                issues_closed_on[date] = 1
-                bisect.insort(dates, date)
-
-        close_issues_timeline = {}
-        cumulative_close_issues = 0
-        for date in dates:
-            cumulative_close_issues += issues_closed_on[date]
-            close_issues_timeline[date] = cumulative_close_issues
-        return dates, issues_closed_on, close_issues_timeline
-
-    def extract_unassigned_issues(self, assignee, worklog):
-        dates = []
-        issues_unassigned_on = {}
-        for issue in worklog:
-            if issue["unassigned_date"]:
-                date = issue["unassigned_date"]
-            else:
+            idxs = np.searchsorted(kind_keys, merged_keys, side="right") - 1
+            found = idxs >= 0
+            found[found] = ((kind_keys[idxs[found]] >> 32) ==
+                            (merged_keys[found] >> 32))
+            as_of.append(np.where(found, cumulative[kind_idxs[idxs]], 0))
+            exact = found & (merged_sources < 0)
+            exact[exact] = kind_keys[idxs[exact]] == merged_keys[exact]
+            merged_sources[exact] = kind_idxs[idxs[exact]]
+        values = combine(as_of[0], as_of[1])
+
+        # Reuse the date objects of the worklogs, preferring start dates, so
+        # that equal dates are shared by the timelines.
+        key_dates = [dates[idx] for idx in first_idxs.tolist()]
+        first_idxs = first_idxs.tolist()
+        counts = counts.tolist()
+        cumulative = cumulative.tolist()
+        group_bounds = np.searchsorted(
+            key_groups, np.arange(2 * len(users) + 1)).tolist()
+        merged_dates = [key_dates[idx] for idx in merged_sources.tolist()]
+        values = values.tolist()
+        merged_bounds = np.searchsorted(
+            merged_keys >> 32, np.arange(len(users) + 1)).tolist()
+
+        count_timelines = {}
+        for slot, user in enumerate(users):
+            count_timeline = {}
+            for kind, name in enumerate(["start", "end"]):
+                lo = group_bounds[2 * slot + kind]
+                hi = group_bounds[2 * slot + kind + 1]
+                order = sorted(range(lo, hi), key=first_idxs.__getitem__)
+                count_timeline[name] = (
+                    key_dates[lo:hi],
+                    {key_dates[i]: counts[i] for i in order},
+                    dict(zip(key_dates[lo:hi], cumulative[lo:hi])))
+
+            lo, hi = merged_bounds[slot], merged_bounds[slot + 1]
+            timeline = dict.fromkeys(count_timeline["start"][0])
+            timeline.update(dict.fromkeys(count_timeline["end"][0]))
+            timeline.update(zip(merged_dates[lo:hi], values[lo:hi]))
+            count_timeline["dates"] = merged_dates[lo:hi]
+            count_timeline["timeline"] = timeline
+            count_timelines[user] = count_timeline
+        return count_timelines
+
+    def generate_window_timelines(self, input_paths, output_paths, windows,
+                                  reporter_worklogs=None,
+                                  assignee_worklogs=None):
+        """ Generates the windowed reputations and workloads of every user.
+
+        The reputation over a window of W days only counts the issues opened
+        and fixed in the last W days. The workload over a window only counts
+        the issues that were assigned in the last W days and are still held,
+        so that issues left assigned for a long time stop counting.
+
+        Args:
+            input_paths: Dictionary containing paths of input files.
+            output_paths: Dictionary containing paths of output files.
+            windows: Sequence of the numbers of days of the windows.
+            reporter_worklogs: Dict mapping reporters to their issues, read
+                               from the issues if None.
+            assignee_worklogs: Dict mapping assignees to their issues, read
+                               from the issues if None.
+        Returns:
+            window_timelines: Dict mapping each window to a tuple of the
+                              CrossIssueIndex of the reputations and of the
+                              workloads over that window.
+        """
+        if reporter_worklogs is None or assignee_worklogs is None:
+            reporter_worklogs, assignee_worklogs = self.generate_worklogs(
+                input_paths, output_paths)
+        reputations = self.build_window_indexes(
+            reporter_worklogs, [("creation_date", None),
+                                ("resolution_date", None)],
+            windows, lambda opened, fixed: fixed / (opened + 1))
+        workloads = self.build_window_indexes(
+            assignee_worklogs, [("assigned_date", "unassigned_date")],
+            windows, lambda held: held)
+
+        window_timelines = {}
+        for window in windows:
+            reputations[window].save(window_path(os.path.join(
+                output_paths["cross_issue"], "reputation_timelines.bin"),
+                window))
+            workloads[window].save(window_path(os.path.join(
+                output_paths["cross_issue"], "workload_timelines.bin"),
+                window))
+            window_timelines[window] = (reputations[window],
+                                        workloads[window])
+        return window_timelines
+
+    def build_window_indexes(self, worklogs, kinds, windows, combine):
+        """ Counts the issues that every user holds over sliding windows.
+
+        Each worklog entry holds an issue from a start date until an end
+        date, or forever if it has none. Over a window of W days, the entry
+        holds the issue until the earliest of its end date and W days after
+        its start. The count of a user as of a date is the number of starts
+        on or before the date minus the number of ends on or before it.
+
+        All the windows are computed in one sweep over the sorted starts
+        and ends of every user, which are merged with searchsorted rather
+        than rescanned for each date. Since every start of a user has its
+        end in the same segment, the starts and ends of the previous users
+        cancel out.
+
+        Args:
+            worklogs: Dict mapping users to their worklog entries.
+            kinds: List of tuples of the start key and end key, or None, of
+                   each count, such as ("assigned_date", "unassigned_date").
+            windows: Sequence of the numbers of days of the windows, where
+                     None counts over the lifetime of the users.
+            combine: Function computing the values of the timelines from the
+                     arrays of counts of each kind.
+        Returns:
+            indexes: Dict mapping each window to the CrossIssueIndex of the
+                     timelines of the users over that window.
+        """
+        users = list(worklogs)
+        kind_arrays = []
+        for start_key, end_key in kinds:
+            slots = []
+            starts = []
+            ends = []
+            for slot, user in enumerate(users):
+                for entry in worklogs[user]:
+                    if not entry[start_key]:
+                        continue
+                    slots.append(slot)
+                    starts.append(entry[start_key].toordinal())
+                    end_date = entry[end_key] if end_key else None
+                    ends.append(end_date.toordinal() if end_date else -1)
+            kind_arrays.append((np.array(slots, dtype=np.int64),
+                                np.array(starts, dtype=np.int64),
+                                np.array(ends, dtype=np.int64)))
+        days = np.concatenate([starts for _, starts, _ in kind_arrays] +
+                              [ends[ends >= 0] for _, _, ends in kind_arrays])
+        base = days.min() if len(days) else 0
+        # Ends that never come are after every date of the segment.
+        never = 0xffffffff
+
+        indexes = {}
+        for window in windows:
+            start_keys = []
+            end_keys = []
+            for slots, starts, ends in kind_arrays:
+                ends = np.where(ends >= 0, ends - base, never)
+                if window is not None:
+                    ends = np.minimum(ends, starts - base + window)
+                start_keys.append(np.sort((slots << 32) + starts - base))
+                end_keys.append(np.sort((slots << 32) + ends))
+            change_keys = np.unique(np.concatenate(
+                start_keys + [keys[(keys & never) != never]
+                              for keys in end_keys]))
+            counts = [np.searchsorted(starts, change_keys, side="right") -
+                      np.searchsorted(ends, change_keys, side="right")
+                      for starts, ends in zip(start_keys, end_keys)]
+            values = np.asarray(combine(*counts), dtype=np.float64)
+            offsets = np.searchsorted(change_keys >> 32,
+                                      np.arange(len(users) + 1))
+            dates = ((change_keys & never) + base -
+                     datetime.date(1970, 1, 1).toordinal())
+            indexes[window] = CrossIssueIndex(
+                users, offsets.astype(np.int64),
+                dates.astype("datetime64[D]"), values)
+        return indexes
+
+    def update_cross_issue_data(self, input_paths, output_paths, issuekeys,
+                                windows=()):
+        """ Updates the cross issue data with new, changed or deleted issues.
+
+        The saved worklogs are loaded and the entries of the given issues
+        are replaced by the ones of their current files. An issue without a
+        file is removed. Only the reporters and assignees that had or now
+        have one of the issues in their worklog get their timelines
+        computed again, and the saved timelines of the other users are kept
+        as is. The windowed timelines are computed again for every user,
+        which is fast as they do not build Python objects.
+
+        Args:
+            input_paths: Dictionary containing paths of input files.
+            output_paths: Dictionary containing paths of output files.
+            issuekeys: Iterable of the keys of the issues, which are also the
+                       names of their files.
+            windows: Sequence of the numbers of days of the windowed
+                     timelines to generate.
+        Returns:
+            reputations: Dictionary containing the reputation of each user and
+                         how it changes over time.
+            workloads: Dictionary containing the workloads of each user and
+                         how it changes over time.
+        """
+        issuekeys = set(issuekeys)
+        reporter_worklogs = self.load_worklogs(
+            output_paths, "reporter_worklogs.json")
+        assignee_worklogs = self.load_worklogs(
+            output_paths, "assignee_worklogs.json")
+
+        new_reporter_worklogs = {}
+        new_assignee_worklogs = {}
+        cp = generate_dataset.CountingProcess()
+        with open_issues(input_paths["issues"]) as issues:
+            for issuekey in sorted(issuekeys):
+                if issuekey not in issues:
+                    continue
+                issue = load_issue(issues.read_bytes(issuekey))
+                self.add_reporter_worklog_entry(issue, new_reporter_worklogs)
+                self.add_assignee_worklog_entries(
+                    issue, new_assignee_worklogs, cp)
+
+        reporters = self.replace_worklog_entries(
+            reporter_worklogs, new_reporter_worklogs, issuekeys)
+        assignees = self.replace_worklog_entries(
+            assignee_worklogs, new_assignee_worklogs, issuekeys)
+        self.save_reporter_worklogs(output_paths, reporter_worklogs)
+        self.save_assignee_worklogs(output_paths, assignee_worklogs)
+
+        reputations = self.generate_reporter_reputations(
+            input_paths, output_paths, reporter_worklogs, reporters)
+        workloads = self.generate_assignee_workloads(
+            input_paths, output_paths, assignee_worklogs, assignees)
+        if windows:
+            self.generate_window_timelines(input_paths, output_paths, windows,
+                                           reporter_worklogs,
+                                           assignee_worklogs)
+        return reputations, workloads
+
+    def replace_worklog_entries(self, worklogs, new_worklogs, issuekeys):
+        """ Replaces the worklog entries of issues.
+
+        Args:
+            worklogs: Dict mapping users to their worklog entries, which is
+                      updated in place.
+            new_worklogs: Dict mapping users to the new entries of the issues.
+            issuekeys: Set of the keys of the replaced issues.
+        Returns:
+            users: Set of the users whose worklog changed.
+        """
+        users = set(new_worklogs)
+        for user, worklog in list(worklogs.items()):
+            entries = [entry for entry in worklog
+                       if entry["issuekey"] not in issuekeys]
+            if len(entries) == len(worklog):
                 continue
-            if issues_unassigned_on.get(date):
-                issues_unassigned_on[date] += 1
+            users.add(user)
+            if entries:
+                worklogs[user] = entries
             else:
-                issues_unassigned_on[date] = 1
-                bisect.insort(dates, date)
+                del worklogs[user]
+        for user, entries in new_worklogs.items():
+            worklogs[user] = worklogs.get(user, [])
+            worklogs[user].extend(entries)
+        return users
+
+    def load_worklogs(self, output_paths, filename):
+        """ Loads worklogs saved by save_dict_as_json.
+
+        Args:
+            output_paths: Dictionary containing paths of output files.
+            filename: Name of the worklog file in the cross issue directory.
+        Returns:
+            worklogs: Dict mapping users to their worklog entries.
+        """
+        path = os.path.join(output_paths["cross_issue"], filename)
+        worklogs = self.read_json(path)
+        for worklog in worklogs.values():
+            for entry in worklog:
+                for key, value in entry.items():
+                    if key != "issuekey" and value is not None:
+                        entry[key] = datetime.date.fromisoformat(value)
+        return worklogs
 
-        unassigned_issues_timeline = {}
-        cumulative_unassigned_issues = 0
-        for date in dates:
-            cumulative_unassigned_issues += issues_unassigned_on[date]
-            unassigned_issues_timeline[date] = cumulative_unassigned_issues
-        return dates, issues_unassigned_on, unassigned_issues_timeline
+    def generate_worklogs(self, input_paths, output_paths):
+        """ Generates the reporter and assignee worklogs in one pass.
 
-    def extract_opened_issues(self, reporter, worklog):
-        dates = []
-        issues_opened_on = {}
-        for issue in worklog:
-            date = issue["creation_date"]
-            if issues_opened_on.get(date):
-                issues_opened_on[date] += 1
-            else:
-                issues_opened_on[date] = 1
-                bisect.insort(dates, date)
+        Each issue file is read once and feeds both worklogs.
 
-        open_issues_timeline = {}
-        cumulative_open_issues = 0
-        for date in dates:
-            cumulative_open_issues += issues_opened_on[date]
-            open_issues_timeline[date] = cumulative_open_issues
-        return dates, issues_opened_on, open_issues_timeline
+        Args:
+            input_paths: Dictionary containing paths of input files.
+            output_paths: Dictionary containing paths of output files.
+        Returns:
+            reporter_worklogs: Dict mapping reporters to their issues.
+            assignee_worklogs: Dict mapping assignees to their issues.
+        """
+        reporter_worklogs = {}
+        assignee_worklogs = {}
 
-    def extract_assigned_issues(self, reporter, worklog):
-        dates = []
-        issues_assigned_on = {}
-        for issue in worklog:
-            date = issue["assigned_date"]
-            if issues_assigned_on.get(date):
-                issues_assigned_on[date] += 1
-            else:
-                issues_assigned_on[date] = 1
-                bisect.insort(dates, date)
+        cp = generate_dataset.CountingProcess()
+        for issue in self.iter_issues(input_paths):
+            self.add_reporter_worklog_entry(issue, reporter_worklogs)
+            self.add_assignee_worklog_entries(issue, assignee_worklogs, cp)
 
-        assigned_issues_timeline = {}
-        cumulative_assigned_issues = 0
-        for date in dates:
-            cumulative_assigned_issues += issues_assigned_on[date]
-            assigned_issues_timeline[date] = cumulative_assigned_issues
-        return dates, issues_assigned_on, assigned_issues_timeline
+        self.save_reporter_worklogs(output_paths, reporter_worklogs)
+        self.save_assignee_worklogs(output_paths, assignee_worklogs)
+        return reporter_worklogs, assignee_worklogs
 
     def generate_reporter_worklogs(self, input_paths, output_paths):
         worklogs = {}
-        for filename in os.listdir(input_paths["issues"]):
-            issue_path = os.path.join(input_paths["issues"], filename)
-            with open(issue_path, "r") as f:
-                issue = json.load(f)
-
-            reporter = issue["fields"]["creator"]["key"]
-            issue_key = issue["key"]
-            creation_date = parse(issue["fields"]["created"]).date()
-            # TODO: Maybe this should be the first resolution occurence
-            if issue["fields"]["resolutiondate"] is None:
-                resolution_date = None
-            else:
-                resolution_date = parse(
-                    issue["fields"]["resolutiondate"]).date()
-
-            worklog_entry = {"issuekey": issue_key,
-                             "creation_date": creation_date,
-                             "resolution_date": resolution_date}
-            worklogs[reporter] = worklogs.get(reporter, [])
-            worklogs[reporter].append(worklog_entry)
-
-        output_path = os.path.join(
-            output_paths["cross_issue"], "reporter_worklogs.json")
-        self.save_dict_as_json(output_path, worklogs)
+        for issue in self.iter_issues(input_paths):
+            self.add_reporter_worklog_entry(issue, worklogs)
 
+        self.save_reporter_worklogs(output_paths, worklogs)
         return worklogs
 
     def generate_assignee_worklogs(self, input_paths, output_paths):
         worklogs = {}
 
         cp = generate_dataset.CountingProcess()
-        for filename in os.listdir(input_paths["issues"]):
-            issue_path = os.path.join(input_paths["issues"], filename)
-            # issue_path = os.path.join(input_paths["issues"], "HBASE-12277")
-            with open(issue_path, "r") as f:
-                issue = json.load(f)
-            first_resolution = False
-            increment_resolution_date = True
-            issue_states, issue_dates = cp.generate_issue_states(
-                issue_path, first_resolution, increment_resolution_date, None,
-                None)
-
-            if not issue_dates:
-                continue
+        for issue in self.iter_issues(input_paths):
+            self.add_assignee_worklog_entries(issue, worklogs, cp)
+
+        self.save_assignee_worklogs(output_paths, worklogs)
+        return worklogs
 
-            issue_key = issue["key"]
-            prev_date = issue_dates[0]
-            prev_assignee = issue_states[prev_date]["assignee"]
-            for i in range(len(issue_dates)):
-                curr_date = issue_dates[i]
-                curr_assignee = issue_states[curr_date]["assignee"]
-                if curr_assignee != prev_assignee:
-                    worklog_entry = {"issuekey": issue_key,
-                                     "assigned_date": prev_date,
-                                     "unassigned_date": curr_date}
-                    worklogs[prev_assignee] = worklogs.get(prev_assignee, [])
-                    worklogs[prev_assignee].append(worklog_entry)
-
-                    prev_date = curr_date
-                    prev_assignee = curr_assignee
-                if issue_states[curr_date]["is_dead"]:
-                    break
+    def iter_issues(self, input_paths):
+        """ Loads the issues of a project one at a time.
+
+        Args:
+            input_paths: Dictionary containing paths of input files.
+        Yields:
+            issue: Dict that contains the issue's data.
+        """
+        with open_issues(input_paths["issues"]) as issues:
+            for _, content in issues.iter_bytes():
+                yield load_issue(content)
+
+    def add_reporter_worklog_entry(self, issue, worklogs):
+        """ Adds an issue to the worklog of its reporter.
+
+        Args:
+            issue: Dict that contains the issue's data.
+            worklogs: Dict mapping reporters to their issues.
+        """
+        reporter = issue["fields"]["creator"]["key"]
+        issue_key = issue["key"]
+        creation_date = parse_date(issue["fields"]["created"])
+        # TODO: Maybe this should be the first resolution occurence
+        if issue["fields"]["resolutiondate"] is None:
+            resolution_date = None
+        else:
+            resolution_date = parse_date(
+                issue["fields"]["resolutiondate"])
+
+        worklog_entry = {"issuekey": issue_key,
+                         "creation_date": creation_date,
+                         "resolution_date": resolution_date}
+        worklogs[reporter] = worklogs.get(reporter, [])
+        worklogs[reporter].append(worklog_entry)
+
+    def add_assignee_worklog_entries(self, issue, worklogs, cp):
+        """ Adds an issue to the worklogs of its assignees.
+
+        Args:
+            issue: Dict that contains the issue's data.
+            worklogs: Dict mapping assignees to their issues.
+            cp: CountingProcess used to get the assignee timelines.
+        """
+        events = decode_events(issue)
+        first_resolution = False
+        increment_resolution_date = True
+        assignee_timelines = cp.get_assignee_timelines(
+            issue, events, first_resolution, increment_resolution_date)
+
+        issue_key = issue["key"]
+        for assignee_timeline in assignee_timelines:
+            assignee = assignee_timeline["assignee"]
             worklog_entry = {"issuekey": issue_key,
-                             "assigned_date": prev_date,
-                             "unassigned_date": curr_date}
-            worklogs[prev_assignee] = worklogs.get(prev_assignee, [])
-            worklogs[prev_assignee].append(worklog_entry)
+                             "assigned_date": (
+                                 assignee_timeline["assigned_date"]),
+                             "unassigned_date": (
+                                 assignee_timeline["unassigned_date"])}
+            worklogs[assignee] = worklogs.get(assignee, [])
+            worklogs[assignee].append(worklog_entry)
+
+    def save_reporter_worklogs(self, output_paths, worklogs):
+        output_path = os.path.join(
+            output_paths["cross_issue"], "reporter_worklogs.json")
+        self.save_dict_as_json(output_path, worklogs)
 
+    def save_assignee_worklogs(self, output_paths, worklogs):
         output_path = os.path.join(
             output_paths["cross_issue"], "assignee_worklogs.json")
         self.save_dict_as_json(output_path, worklogs)
 
-        return worklogs
-
-    def save_dict_as_json(self, path, d):
+    def save_dict_as_json(self, path, d, users=None):
+        """ Dumps a dict as JSON in the background, if the dump is selected.
+
+        Args:
+            path: Path of the uncompressed dump, ending with .json.
+            d: Dict to dump. It must not be modified while it is dumped.
+            users: Users to update in the saved dump, or None to overwrite it
+                   with d.
+        """
+        name = os.path.basename(path)[:-len(".json")]
+        if name not in self.json_dumps:
+            return
+        if self.json_writer is None:
+            self.json_writer = ThreadPoolExecutor(max_workers=1)
+        self.json_writes.append(self.json_writer.submit(
+            self.write_dict_as_json, path, d, users))
+
+    def write_dict_as_json(self, path, d, users=None):
+        """ Dumps a dict as JSON, after formatting its dates as strings.
+
+        Args:
+            path: Path of the uncompressed dump, ending with .json.
+            d: Dict to dump.
+            users: Users to update in the saved dump, or None to overwrite it
+                   with d.
+        """
+        if users is not None:
+            d = {user: d[user] for user in users if user in d}
         dict_copy = deepcopy(d)
         self.dictRecursiveFormat(dict_copy)
-        with open(path, 'w') as fp:
+        if users is not None:
+            dump_path = self.find_json(path)
+            if dump_path is None:
+                # Nothing to update, the dump was not written before
+                return
+            dict_copy = self.merge_users(self.load_json(dump_path),
+                                         dict_copy, users)
+
+        if self.compress_json:
+            output_path, stale_path = path + ".gz", path
+            fp = gzip.open(output_path, "wt")
+        else:
+            output_path, stale_path = path, path + ".gz"
+            fp = open(output_path, "w")
+        with fp:
             json.dump(dict_copy, fp)
+        if os.path.exists(stale_path):
+            os.remove(stale_path)
+
+    def wait_for_json_dumps(self):
+        """ Waits until the JSON dumps are written.
+        """
+        json_writes, self.json_writes = self.json_writes, []
+        for json_write in json_writes:
+            json_write.result()
+
+    def find_json(self, path):
+        """ Finds a JSON dump, which may be compressed.
+
+        Args:
+            path: Path of the uncompressed dump, ending with .json.
+        Returns:
+            path: Path of the dump, or None if there is none.
+        """
+        for dump_path in [path + ".gz", path]:
+            if os.path.exists(dump_path):
+                return dump_path
+        return None
+
+    def read_json(self, path):
+        """ Reads a JSON dump, which may be compressed, once it is written.
+
+        Args:
+            path: Path of the uncompressed dump, ending with .json.
+        Returns:
+            d: The loaded dump.
+        """
+        self.wait_for_json_dumps()
+        dump_path = self.find_json(path)
+        if dump_path is None:
+            raise FileNotFoundError(path)
+        return self.load_json(dump_path)
+
+    def load_json(self, dump_path):
+        """ Loads a JSON dump, decompressing it if it ends with .gz.
+
+        Args:
+            dump_path: Path of the dump.
+        Returns:
+            d: The loaded dump.
+        """
+        if dump_path.endswith(".gz"):
+            fp = gzip.open(dump_path, "rt")
+        else:
+            fp = open(dump_path, "r")
+        with fp:
+            return json.load(fp)
+
+    def save_dict_as_pickle(self, path, d, users=None):
+        """ Saves a dict of user timelines as a pickle.
+
+        Args:
+            path: Path of the pickle.
+            d: Dict mapping users to their timelines.
+            users: Users to update in the saved pickle, or None to overwrite
+                   it with d.
+        Returns:
+            d: Dict of the saved timelines of all the users.
+        """
+        if users is not None:
+            with open(path, 'rb') as fp:
+                d = self.merge_users(pickle.load(fp), d, users)
+        with open(path, 'wb') as fp:
+            pickle.dump(d, fp)
+        return d
+
+    def merge_users(self, saved, d, users):
+        """ Replaces the entries of users in a saved dict.
+
+        Args:
+            saved: Dict mapping users to their saved entries.
+            d: Dict mapping users to their new entries.
+            users: Users to replace. Users without a new entry are removed.
+        Returns:
+            saved: The updated dict.
+        """
+        for user in users:
+            if user in d:
+                saved[user] = d[user]
+            else:
+                saved.pop(user, None)
+        return saved
 
     def dictRecursiveFormat(self, d):
         if type(d) is list:
@@ -17,32 +17,57 @@ Email: hello@noamrabbani.com
 """
 
 
-import unittest
-import json
 import os
 import bisect
+import itertools
 import logging
-import pickle
-import pandas as pd
-from dateutil.parser import parse
-from copy import deepcopy
+import multiprocessing
+import operator
+import numpy as np
+from jira_timestamp import parse_date
 from datetime import datetime, timezone, timedelta
+from issue_timeline import IssueTimeline
+from issue_decoder import decode_events, load_issue
+from issue_state import IssueState, digest_description
+from row_sink import RowSink
+from cross_issue_index import CrossIssueIndex, window_path
+from issue_store import open_issues
+from dataset_manifest import DatasetManifest, digest_timelines, hash_content
 import sys
 
 
+# Directory of cross_issue_data holding the global cross issue index.
+GLOBAL_CROSS_ISSUE_DIR = "global"
+
+
 def main():
 
-    if len(sys.argv) < 2:
+    args = [arg for arg in sys.argv[1:] if not arg.startswith("--")]
+    if len(args) < 1:
         print("Must specify project as argument")
         exit()
 
-    project = sys.argv[1]
+    project = args[0]
+    workers = int(args[1]) if len(args) > 1 else 1
+    chunk_size = 100000
     include_cross_issue_features = True
     use_first_resolution = False
     increment_resolution_date = True
+    # With --incremental, such as in a scheduled regeneration, the rows of
+    # the issues unchanged since the last incremental run are copied from
+    # the existing dataset instead of being generated again.
+    incremental = "--incremental" in sys.argv[1:]
+    # None uses the timelines extracted for the project alone. The project
+    # name, or ALL_PROJECTS for reputations and workloads computed across
+    # projects, uses the global index instead.
+    cross_issue_scope = None
+    # Days of the windowed reputations and workloads to add as columns, such
+    # as (90, 365). They must have been extracted with the same windows.
+    cross_issue_windows = ()
 
     cp = CountingProcess()
-    input_paths, output_paths = cp.generate_file_paths(project)
+    input_paths, output_paths = cp.generate_file_paths(
+        project, cross_issue_scope, cross_issue_windows)
 
     logging.basicConfig(level=logging.INFO, filename=output_paths["logs"],
                         filemode='w')
@@ -52,18 +77,105 @@ def main():
         input_paths, include_cross_issue_features)
 
     cp.generate_dataset(input_paths, output_paths, use_first_resolution,
-                        increment_resolution_date, reputations, workloads)
+                        increment_resolution_date, reputations, workloads,
+                        workers, chunk_size, incremental)
+
+
+# Per-process state of the pool workers used by generate_dataset. It is
+# populated once by init_worker so that the timelines are not sent with
+# every task.
+worker_state = {}
+
+
+def init_worker(input_paths, use_first_resolution, increment_resolution_date,
+                include_reputations, include_workloads):
+    """ Initializes a pool worker by loading the cross issue data and opening
+    the issues once.
+
+    Args:
+        input_paths: Dictionary containing paths of input files.
+        use_first_resolution: Boolean indicating if we should use the first
+                              time an issue is resolved
+        increment_resolution_date: Boolean indicating if the resolution
+                                   date should be incremented by one day
+        include_reputations: Boolean indicating if the worker should load the
+                             reporter reputations.
+        include_workloads: Boolean indicating if the worker should load the
+                           assignee workloads.
+    """
+    cp = CountingProcess()
+    reputations, workloads = cp.load_cross_issue_data(
+        input_paths, include_reputations or include_workloads)
+    worker_state["cp"] = cp
+    worker_state["issues"] = open_issues(input_paths["issues"])
+    worker_state["use_first_resolution"] = use_first_resolution
+    worker_state["increment_resolution_date"] = increment_resolution_date
+    worker_state["reputations"] = reputations if include_reputations else None
+    worker_state["workloads"] = workloads if include_workloads else None
+
+
+def generate_worker_columns(issuekey):
+    """ Generates the counting process columns of an issue in a pool worker.
+
+    Args:
+        issuekey: Key of the issue.
+    Returns:
+        columns: Dict mapping the columns of the dataset to arrays, or None
+                 if the issue has no rows.
+    """
+    return worker_state["cp"].generate_issue_columns(
+        worker_state["issues"].read_bytes(issuekey),
+        worker_state["use_first_resolution"],
+        worker_state["increment_resolution_date"],
+        worker_state["reputations"], worker_state["workloads"])
+
+
+def generate_worker_update(issuekey):
+    """ Generates the counting process columns and manifest entry of an issue
+    in a pool worker.
+
+    Args:
+        issuekey: Key of the issue.
+    Returns:
+        columns: Dict mapping the columns of the dataset to arrays, or None
+                 if the issue has no rows.
+        entry: Dict containing the manifest entry of the issue.
+    """
+    return worker_state["cp"].generate_issue_update(
+        worker_state["issues"].read_bytes(issuekey),
+        worker_state["use_first_resolution"],
+        worker_state["increment_resolution_date"],
+        worker_state["reputations"], worker_state["workloads"])
 
 
 class CountingProcess:
     """ Generates a counting process dataset from JSON issue data.
     """
 
+    def __init__(self):
+        # Dict mapping the windowed columns, such as "reporter_rep_90d", to
+        # the role of the user they describe and the CrossIssueIndex of the
+        # user timelines. Filled by load_cross_issue_data.
+        self.window_features = {}
+
     def generate_dataset(self, input_paths, output_paths, use_first_resolution,
                          increment_resolution_date, reputations=None,
-                         workloads=None):
+                         workloads=None, workers=1, chunk_size=None,
+                         incremental=False):
         """ Generates the dataset in the counting process format
 
+        With workers > 1, issues are distributed over a process pool. Each
+        worker loads the cross issue data from input_paths once and the rows
+        are collected in the same order as the serial path.
+
+        With a chunk_size, rows are streamed to the output file as they are
+        generated instead of being kept in memory for the whole project. The
+        rows are written to a temporary file that replaces the dataset once
+        it is complete, so a failed run leaves the previous dataset as is.
+
+        With incremental, only the issues that changed since the last
+        incremental run are processed, see update_dataset.
+
         Args:
             input_paths: Dictionary containing paths of input files.
             output_path: Dictionary containing paths of output files.
@@ -71,21 +183,192 @@ class CountingProcess:
                                   time an issue is resolved
             increment_resolution_date: Boolean indicating if the resolution
                             date should be incremented by one day
-            reputations: Dictionary containing the reputation of each user and
+            reputations: CrossIssueIndex of the reputation of each user and
                          how it changes over time.
-            workloads: Dictionary containing the workloads of each user and
+            workloads: CrossIssueIndex of the workloads of each user and
+                       how it changes over time.
+            workers: Number of processes used to generate the rows.
+            chunk_size: Number of rows written to the output file at a time.
+                        If None, the dataset is written in one piece.
+            incremental: Boolean indicating if the rows of unchanged issues
+                         should be copied from the existing dataset.
+        """
+        if incremental:
+            self.update_dataset(input_paths, output_paths,
+                                use_first_resolution,
+                                increment_resolution_date, reputations,
+                                workloads, workers, chunk_size)
+            return
+        columns = self.get_columns(reputations, workloads)
+        dtypes = self.get_column_dtypes()
+        tmp_path = output_paths["raw_dataset"] + ".tmp"
+
+        try:
+            with open_issues(input_paths["issues"]) as issues, \
+                    RowSink(tmp_path, columns, chunk_size, dtypes) as sink:
+                issuekeys = issues.keys()
+                if workers > 1:
+                    initargs = (input_paths, use_first_resolution,
+                                increment_resolution_date, bool(reputations),
+                                bool(workloads))
+                    chunksize = max(1, len(issuekeys) // (workers * 16))
+                    with multiprocessing.Pool(workers, init_worker,
+                                              initargs) as pool:
+                        for issue_columns in pool.imap(
+                                generate_worker_columns, issuekeys,
+                                chunksize):
+                            if issue_columns is not None:
+                                sink.write_columns(issue_columns)
+                else:
+                    for issuekey in issuekeys:
+                        issue_columns = self.generate_issue_columns(
+                            issues.read_bytes(issuekey),
+                            use_first_resolution, increment_resolution_date,
+                            reputations, workloads)
+                        if issue_columns is not None:
+                            sink.write_columns(issue_columns)
+        except BaseException:
+            if os.path.exists(tmp_path):
+                os.remove(tmp_path)
+            raise
+
+        # The manifest no longer describes the dataset written above.
+        if os.path.exists(output_paths["manifest"]):
+            os.remove(output_paths["manifest"])
+        os.replace(tmp_path, output_paths["raw_dataset"])
+
+    def update_dataset(self, input_paths, output_paths, use_first_resolution,
+                       increment_resolution_date, reputations=None,
+                       workloads=None, workers=1, chunk_size=None):
+        """ Updates the dataset by only processing new or changed issues.
+
+        The manifest written next to the dataset records the settings, the
+        cross issue timelines of each user and the content of each issue
+        file it was generated from. Issues whose file, reporter reputation
+        and assignee workloads are unchanged keep their rows, which are
+        copied from the existing dataset. The other issues are generated
+        again, and the dataset is rewritten in the same order as a full run.
+        Without a manifest matching the dataset, every issue is generated.
+
+        Args:
+            input_paths: Dictionary containing paths of input files.
+            output_path: Dictionary containing paths of output files.
+            use_first_resolution: Boolean indicating if we should use the first
+                                  time an issue is resolved
+            increment_resolution_date: Boolean indicating if the resolution
+                            date should be incremented by one day
+            reputations: CrossIssueIndex of the reputation of each user and
                          how it changes over time.
+            workloads: CrossIssueIndex of the workloads of each user and
+                       how it changes over time.
+            workers: Number of processes used to generate the rows.
+            chunk_size: Number of rows written to the output file at a time.
+                        If None, the dataset is written in one piece.
         """
-        rows = []
-        for filename in sorted(os.listdir(input_paths["issues"])):
-            issue_path = os.path.join(input_paths["issues"], filename)
-            issue_states, issue_dates = self.generate_issue_states(
-                issue_path, use_first_resolution, increment_resolution_date,
-                reputations, workloads)
-            issue_rows = self.generate_counting_process_rows(
-                issue_states, issue_dates, reputations, workloads)
-            rows.extend(issue_rows)
+        columns = self.get_columns(reputations, workloads)
+        dtypes = self.get_column_dtypes()
+        settings = {"use_first_resolution": use_first_resolution,
+                    "increment_resolution_date": increment_resolution_date,
+                    "columns": columns}
+        generated_on = datetime.now(timezone.utc).date().isoformat()
+        reputation_digests = digest_timelines(
+            reputations, self.get_window_indexes("reporter"))
+        workload_digests = digest_timelines(
+            workloads, self.get_window_indexes("assignee"))
+
+        dataset_path = output_paths["raw_dataset"]
+        previous = DatasetManifest.load(output_paths["manifest"])
+        if previous is not None and not previous.matches(settings,
+                                                         dataset_path):
+            previous = None
+        manifest = DatasetManifest(settings, generated_on, reputation_digests,
+                                   workload_digests)
+
+        tmp_path = dataset_path + ".tmp"
+        issues = None
+        old_dataset = None
+        pool = None
+        try:
+            issues = open_issues(input_paths["issues"])
+            filenames = []
+            dirty_filenames = []
+            for filename, content in issues.iter_bytes():
+                filenames.append(filename)
+                content_hash = hash_content(content)
+                if previous is not None and previous.is_reusable(
+                        filename, content_hash, generated_on,
+                        reputation_digests, workload_digests):
+                    manifest.issues[filename] = previous.issues[filename]
+                else:
+                    dirty_filenames.append(filename)
+            filenames.sort()
+            dirty_filenames.sort()
+            logging.info("incremental, {} of {} issues changed".format(
+                len(dirty_filenames), len(filenames)))
+
+            if workers > 1 and len(dirty_filenames) > 1:
+                initargs = (input_paths, use_first_resolution,
+                            increment_resolution_date, bool(reputations),
+                            bool(workloads))
+                chunksize = max(1, len(dirty_filenames) // (workers * 16))
+                pool = multiprocessing.Pool(workers, init_worker, initargs)
+                updates = pool.imap(generate_worker_update, dirty_filenames,
+                                    chunksize)
+            else:
+                updates = (self.generate_issue_update(
+                    issues.read_bytes(filename), use_first_resolution,
+                    increment_resolution_date, reputations, workloads)
+                    for filename in dirty_filenames)
+
+            if previous is not None:
+                old_dataset = open(dataset_path, "r", newline="")
+                old_row_offsets = previous.get_row_offsets()
+                next(old_dataset)  # header
+                old_row_idx = 0
+            with RowSink(tmp_path, columns, chunk_size, dtypes) as sink:
+                for filename in filenames:
+                    if filename in manifest.issues:
+                        offset = old_row_offsets[filename]
+                        row_count = manifest.issues[filename]["rows"]
+                        lines = itertools.islice(
+                            old_dataset, offset - old_row_idx,
+                            offset - old_row_idx + row_count)
+                        sink.write_lines(lines)
+                        old_row_idx = offset + row_count
+                    else:
+                        issue_columns, entry = next(updates)
+                        manifest.issues[filename] = entry
+                        if issue_columns is not None:
+                            sink.write_columns(issue_columns)
+        except BaseException:
+            # The dataset is left as it was, without a partial copy.
+            if os.path.exists(tmp_path):
+                os.remove(tmp_path)
+            raise
+        finally:
+            if old_dataset is not None:
+                old_dataset.close()
+            if pool is not None:
+                pool.close()
+                pool.join()
+            if issues is not None:
+                issues.close()
+
+        os.replace(tmp_path, dataset_path)
+        manifest.dataset_size = os.path.getsize(dataset_path)
+        manifest.save(output_paths["manifest"])
+
+    def get_columns(self, reputations, workloads):
+        """ Gets the columns of the counting process dataset.
 
+        Args:
+            reputations: CrossIssueIndex of the reputation of each user and
+                         how it changes over time.
+            workloads: CrossIssueIndex of the workloads of each user and
+                       how it changes over time.
+        Returns:
+            columns: List of the columns of the dataset, in order.
+        """
         columns = ["issuekey",
                    "start_date",
                    "start",
@@ -107,8 +390,122 @@ class CountingProcess:
             columns.append("reporter_rep")
         if workloads:
             columns.append("assignee_workload")
-        df = pd.DataFrame(rows, columns=columns)
-        df.to_csv(output_paths["raw_dataset"], sep="\t", index=False)
+        columns.extend(self.window_features)
+        return columns
+
+    def get_column_dtypes(self):
+        """ Gets the dtypes of the columns of the counting process dataset.
+
+        A column holding None values is written as floats, so the workload
+        is always a float for every chunk of the dataset to be formatted
+        alike.
+
+        Returns:
+            dtypes: Dict mapping the columns to their dtypes.
+        """
+        dtypes = {"issuekey": object,
+                  "start_date": object,
+                  "assignee": object,
+                  "reporter_rep": np.float64,
+                  "assignee_workload": np.float64,
+                  }
+        for column in self.window_features:
+            dtypes[column] = np.float64
+        for column in ["start",
+                       "end",
+                       "is_dead",
+                       "priority",
+                       "issuetype",
+                       "is_assigned",
+                       "comment_count",
+                       "link_count",
+                       "affect_count",
+                       "fix_count",
+                       "has_priority_change",
+                       "has_desc_change",
+                       "has_fix_change",
+                       ]:
+            dtypes[column] = np.int64
+        return dtypes
+
+    def generate_issue_columns(self, content, first_resolution,
+                               increment_resolution_date, reputations,
+                               workloads):
+        """ Generates the counting process columns of a single issue.
+
+        Args:
+            content: Bytes of the JSON of the issue.
+            first_resolution: Boolean indicating if we should use the first
+                              time an issue is resolved
+            increment_resolution_date: Boolean indicating if the resolution
+                                       date should be incremented by one day
+            reputations: CrossIssueIndex of the reputation of each user and
+                         how it changes over time.
+            workloads: CrossIssueIndex of the workloads of each user and
+                       how it changes over time.
+        Returns:
+            columns: Dict mapping the columns of the dataset to arrays, or None
+                     if the issue has no rows.
+        """
+        issue = load_issue(content)
+        events = decode_events(issue)
+        issue_states, issue_dates = self.build_issue_states(
+            issue, events, first_resolution, increment_resolution_date,
+            reputations, workloads)
+        columns = self.generate_counting_process_columns(
+            issue_states, issue_dates, reputations, workloads)
+        self.add_window_columns(issue, columns)
+        return columns
+
+    def generate_issue_update(self, content, first_resolution,
+                              increment_resolution_date, reputations,
+                              workloads):
+        """ Generates the counting process columns and manifest entry of an
+        issue.
+
+        Args:
+            content: Bytes of the JSON of the issue.
+            first_resolution: Boolean indicating if we should use the first
+                              time an issue is resolved
+            increment_resolution_date: Boolean indicating if the resolution
+                                       date should be incremented by one day
+            reputations: CrossIssueIndex of the reputation of each user and
+                         how it changes over time.
+            workloads: CrossIssueIndex of the workloads of each user and
+                       how it changes over time.
+        Returns:
+            columns: Dict mapping the columns of the dataset to arrays, or None
+                     if the issue has no rows.
+            entry: Dict containing the hash of the issue file, its number of
+                   rows, whether its rows are stable, and the users whose
+                   timelines were used.
+        """
+        issue = load_issue(content)
+        events = decode_events(issue)
+        issue_states, issue_dates = self.build_issue_states(
+            issue, events, first_resolution, increment_resolution_date,
+            reputations, workloads)
+        columns = self.generate_counting_process_columns(
+            issue_states, issue_dates, reputations, workloads)
+        self.add_window_columns(issue, columns)
+
+        # Unresolved issues are resolved today, so their rows change daily.
+        resolution_date = self.get_resolution_date(
+            issue, events, first_resolution, increment_resolution_date)
+        today_date = datetime.now(timezone.utc).date()
+        reporters = []
+        if reputations:
+            reporters.append(issue["fields"]["creator"]["key"])
+        assignees = set()
+        if workloads and issue_states:
+            assignees = {state.assignee for state in issue_states.values()}
+            assignees.discard("unassigned")
+        entry = {"hash": hash_content(content),
+                 "rows": len(columns["issuekey"]) if columns else 0,
+                 "stable": resolution_date < today_date,
+                 "reporters": reporters,
+                 "assignees": sorted(assignees)}
+        return columns, entry
 
     def generate_issue_states(self, issue_path, first_resolution,
                               increment_resolution_date, reputations,
@@ -117,40 +514,66 @@ class CountingProcess:
 
         Args:
             issue_path: Path to the JSON file containing the issue data.
-            reputations: Dictionary containing the reputation of each user and
-                         how it changes over time.
-            workloads: Dictionary containing the workloads of each user and
+            reputations: CrossIssueIndex of the reputation of each user and
                          how it changes over time.
+            workloads: CrossIssueIndex of the workloads of each user and
+                       how it changes over time.
             increment_resolution_date: Boolean indicating if the resolution
                                        date should be incremented by one day
         Returns:
-            issue_states: Dict containg the states of the issue at the dates
-                          of interest.
-            issue_dates: Dates of interest, on which an issue changes its
-                         state.
+            issue_states: Dict mapping the dates of interest to the
+                          IssueState of the issue on that date.
+            issue_dates: IssueTimeline of the dates of interest, on which an
+                         issue changes its state.
         """
         with open(issue_path, "r") as f:
-            issue = json.load(f)
+            issue = load_issue(f.read())
+        events = decode_events(issue)
+        return self.build_issue_states(issue, events, first_resolution,
+                                       increment_resolution_date, reputations,
+                                       workloads)
+
+    def build_issue_states(self, issue, events, first_resolution,
+                           increment_resolution_date, reputations, workloads):
+        """ Builds the history of the states of a loaded issue.
 
-        creation_date = parse(issue["fields"]["created"]).date()
+        Args:
+            issue: Dict that contains the issue's data.
+            events: List of IssueEvent decoded from the issue.
+            first_resolution: Boolean indicating if we should use the first
+                              time an issue is resolved
+            increment_resolution_date: Boolean indicating if the resolution
+                                       date should be incremented by one day
+            reputations: CrossIssueIndex of the reputation of each user and
+                         how it changes over time.
+            workloads: CrossIssueIndex of the workloads of each user and
+                       how it changes over time.
+        Returns:
+            issue_states: Dict mapping the dates of interest to the
+                          IssueState of the issue on that date.
+            issue_dates: IssueTimeline of the dates of interest, on which an
+                         issue changes its state.
+        """
+        creation_date = parse_date(issue["fields"]["created"])
         resolution_date = self.get_resolution_date(
-            issue, first_resolution, increment_resolution_date)
+            issue, events, first_resolution, increment_resolution_date)
 
         if creation_date == resolution_date:
             logging.info(
                 "{}, creation_date == resolution_date".format(issue["key"]))
             return [], {}
 
-        issue_dates = []
+        issue_dates = IssueTimeline()
         issue_states = {}
         self.append_state_at_current_time(issue, issue_states, issue_dates)
-        self.append_states_from_changelog(issue, issue_states, issue_dates)
+        self.append_states_from_changelog(issue, events, issue_states,
+                                          issue_dates)
         self.append_state_at_creation(issue, issue_states, issue_dates)
         self.append_state_at_resolution(
             issue, issue_states, issue_dates, resolution_date)
 
         # Order of these functions matters.
-        self.add_comment_features(issue, issue_states, issue_dates)
+        self.add_comment_features(issue, events, issue_states, issue_dates)
         if reputations:
             self.add_reporter_rep_feature(
                 issue, issue_states, issue_dates, reputations)
@@ -163,84 +586,106 @@ class CountingProcess:
 
         return issue_states, issue_dates
 
-    def generate_counting_process_rows(self, issue_states, issue_dates,
-                                       reputations, workloads):
-        """ Generates the counting process rows for the final dataset.
+    def generate_counting_process_columns(self, issue_states, issue_dates,
+                                          reputations, workloads):
+        """ Generates the counting process rows of an issue as columns.
+
+        Each row covers the interval from a date of interest to the next,
+        with the features of the state at its start, and the rows stop at the
+        issue's death. There is one list per column instead of one dict per
+        row, and the lists of many issues are turned into arrays at once by
+        the RowSink.
 
         Args:
             issue_states: Dict containg the states of the issue at the dates
                           of interest.
             issue_dates: Dates of interest, on which an issue changes its
                          state.
-            reputations: Dictionary containing the reputation of each user and
-                         how it changes over time.
-            workloads: Dictionary containing the workloads of each user and
+            reputations: CrossIssueIndex of the reputation of each user and
                          how it changes over time.
+            workloads: CrossIssueIndex of the workloads of each user and
+                       how it changes over time.
         Returns:
-            rows: list of rows containing an issues features in couting process
+            columns: Dict mapping the columns of the dataset to lists, or None
+                     if the issue has no rows.
         """
-        rows = []
-
-        if not issue_dates or not issue_states:
-            return rows
-
-        creation_date = issue_dates[0]
-        # Two pointer approach to building a counting process dataset.
-        curr_idx, nxt_idx = 0, 1
-        while nxt_idx < len(issue_dates):
-            curr_date, nxt_date = issue_dates[curr_idx], issue_dates[nxt_idx]
-            issuekey = issue_states[curr_date]["issuekey"]
-            start_date = curr_date
-            start = (curr_date - creation_date).days
-            end = (nxt_date - creation_date).days
-            is_dead = issue_states[nxt_date]["is_dead"]
-            priority = issue_states[curr_date]["priority"]
-            assignee = issue_states[curr_date]["assignee"]
-            is_assigned = issue_states[curr_date]["is_assigned"]
-            issuetype = issue_states[curr_date]["issuetype"]
-            has_priority_change = (
-                issue_states[curr_date]["has_priority_change"])
-            has_desc_change = issue_states[curr_date]["has_desc_change"]
-            comment_count = issue_states[curr_date]["comment_count"]
-            link_count = issue_states[curr_date]["link_count"]
-            affect_count = (
-                issue_states[curr_date]["affect_count"])
-            fix_count = issue_states[curr_date]["fix_count"]
-            has_fix_change = issue_states[curr_date]["has_fix_change"]
-            if reputations:
-                reporter_rep = issue_states[curr_date]["reporter_rep"]
-            if workloads:
-                assignee_workload = (
-                    issue_states[curr_date]["assignee_workload"])
-            row = {"issuekey": issuekey,
-                   "start_date": start_date,
-                   "start": start,
-                   "end": end,
+        if not issue_dates or not issue_states or len(issue_dates) < 2:
+            return None
+
+        dates = list(issue_dates)
+        states = [issue_states[date] for date in dates]
+
+        # Each row ends on the next date and the rows stop at the first
+        # interval that ends with the issue's death.
+        row_count = len(dates) - 1
+        for idx in range(1, len(states)):
+            if states[idx].is_dead:
+                row_count = idx
+                break
+        creation_date = dates[0]
+        offsets = [(date - creation_date).days
+                   for date in dates[:row_count + 1]]
+        is_dead = [0] * row_count
+        is_dead[-1] = states[row_count].is_dead
+        states = states[:row_count]
+
+        columns = {"issuekey": [states[0].issuekey] * row_count,
+                   "start_date": dates[:row_count],
+                   "start": offsets[:-1],
+                   "end": offsets[1:],
                    "is_dead": is_dead,
-                   "priority": priority,
-                   "issuetype": issuetype,
-                   "assignee": assignee,
-                   "is_assigned": is_assigned,
-                   "has_priority_change": has_priority_change,
-                   "has_desc_change": has_desc_change,
-                   "comment_count": comment_count,
-                   "link_count": link_count,
-                   "affect_count": affect_count,
-                   "fix_count": fix_count,
-                   "has_fix_change": has_fix_change,
                    }
-            if reputations:
-                row["reporter_rep"] = reporter_rep
-            if workloads:
-                row["assignee_workload"] = assignee_workload
-            rows.append(row)
-            if is_dead:
-                break
-            else:
-                curr_idx += 1
-                nxt_idx += 1
+        features = ["priority",
+                    "issuetype",
+                    "assignee",
+                    "is_assigned",
+                    "comment_count",
+                    "link_count",
+                    "affect_count",
+                    "fix_count",
+                    "has_priority_change",
+                    "has_desc_change",
+                    "has_fix_change",
+                    ]
+        if reputations:
+            features.append("reporter_rep")
+        if workloads:
+            features.append("assignee_workload")
+        values = zip(*map(operator.attrgetter(*features), states))
+        columns.update(zip(features, values))
 
-        return rows
+        return columns
+
+    def add_window_columns(self, issue, columns):
+        """ Adds the windowed reputation and workload columns of an issue.
+
+        Unlike reporter_rep and assignee_workload, the windowed features do
+        not add rows when they change. Each row gets the value of the
+        windowed timeline as of its start date.
+
+        Args:
+            issue: Dict that contains the issue's data.
+            columns: Dict mapping the columns of the dataset to lists, or None
+                     if the issue has no rows.
+        """
+        if not self.window_features or columns is None:
+            return
+        reporter = issue["fields"]["creator"]["key"]
+        start_dates = columns["start_date"]
+        for column, (role, index) in self.window_features.items():
+            if role == "reporter":
+                users = [reporter] * len(start_dates)
+            else:
+                users = columns["assignee"]
+            # Like the assignee_workload, unassigned issues have no workload.
+            known = [user in index and user != "unassigned"
+                     for user in users]
+            values = np.full(len(users), np.nan)
+            if any(known):
+                values[known] = index.lookup(
+                    list(itertools.compress(users, known)),
+                    list(itertools.compress(start_dates, known)))
+            columns[column] = values
 
     def append_state_at_current_time(self, issue, issue_states, issue_dates):
         """ Appends the state of an issue at the current time.
@@ -265,65 +710,69 @@ class CountingProcess:
         affect_count = self.get_feature("affect_count", issue)
         fix_count = self.get_feature("fix_count", issue)
 
-        state = {"issuekey": issuekey,
-                 "is_dead": is_dead,
-                 "priority": priority,
-                 "assignee": assignee,
-                 "is_assigned": is_assigned,
-                 "issuetype": issuetype,
-                 "desc": desc,
-                 "link_count": link_count,
-                 "affect_count": affect_count,
-                 "fix_count": fix_count
-                 }
-
-        bisect.insort(issue_dates, date)
+        state = IssueState(issuekey, is_dead, priority, assignee, is_assigned,
+                           issuetype, digest_description(desc), link_count,
+                           affect_count, fix_count)
+
+        issue_dates.add(date)
         issue_states[date] = state
 
-    def append_states_from_changelog(self, issue, issue_states, issue_dates):
+    def append_states_from_changelog(self, issue, events, issue_states,
+                                     issue_dates):
         """ Extract states from an issue's changelog in reverse chronogical order.
 
+        The changes are visited from the latest to the earliest, while the
+        items of a single change are visited in the order of the changelog.
+
+        Args:
+            issue: Dict that contains the issue's data
+            events: List of IssueEvent decoded from the issue.
+            issue_states: Dict containg the states of the issue at the dates
+                          of interest.
+            issue_dates: Dates of interest, on which an issue changes its
+                         state.
+        """
+        changes = itertools.groupby(reversed(events),
+                                    key=lambda event: event.change)
+        for _, change_events in changes:
+            for event in reversed(list(change_events)):
+                self.append_state_at_event(issue, event, issue_states,
+                                           issue_dates)
+
+    def append_state_at_event(self, issue, event, issue_states, issue_dates):
+        """ Appends the state of an issue for a single changelog event.
+
         Args:
             issue: Dict that contains the issue's data
+            event: IssueEvent of the change.
             issue_states: Dict containg the states of the issue at the dates
                           of interest.
             issue_dates: Dates of interest, on which an issue changes its
                          state.
         """
-        for change in reversed(issue["changelog"]["histories"]):
-            date = parse(change["created"]).date()
-            for item in change["items"]:
-                if item["field"] == "priority":
-                    self.append_state_at_feature_change(
-                        "priority", issue, item, date, issue_states,
-                        issue_dates)
-                if item["field"] == "assignee":
-                    self.append_state_at_feature_change(
-                        "assignee", issue, item, date, issue_states,
-                        issue_dates)
-                    self.append_state_at_feature_change(
-                        "is_assigned", issue, item, date, issue_states,
-                        issue_dates)
-                if item["field"] == "issuetype":
-                    self.append_state_at_feature_change(
-                        "issuetype", issue, item, date, issue_states,
-                        issue_dates)
-                if item["field"] == "description":
-                    self.append_state_at_feature_change(
-                        "desc", issue, item, date, issue_states,
-                        issue_dates)
-                if item["field"] == "Link":
-                    self.append_state_at_feature_change(
-                        "link_count", issue, item, date, issue_states,
-                        issue_dates)
-                if item["field"] == "Version":
-                    self.append_state_at_feature_change(
-                        "affect_count", issue, item, date,
-                        issue_states, issue_dates)
-                if item["field"] == "Fix Version":
-                    self.append_state_at_feature_change(
-                        "fix_count", issue, item, date,
-                        issue_states, issue_dates)
+        if event.field == "priority":
+            self.append_state_at_feature_change(
+                "priority", issue, event, issue_states, issue_dates)
+        if event.field == "assignee":
+            self.append_state_at_feature_change(
+                "assignee", issue, event, issue_states, issue_dates)
+            self.append_state_at_feature_change(
+                "is_assigned", issue, event, issue_states, issue_dates)
+        if event.field == "issuetype":
+            self.append_state_at_feature_change(
+                "issuetype", issue, event, issue_states, issue_dates)
+        if event.field == "description":
+            self.append_state_at_feature_change(
+                "desc", issue, event, issue_states, issue_dates)
+        if event.field == "Link":
+            self.append_state_at_feature_change(
+                "link_count", issue, event, issue_states, issue_dates)
+        if event.field == "Version":
+            self.append_state_at_feature_change(
+                "affect_count", issue, event, issue_states, issue_dates)
+        if event.field == "Fix Version":
+            self.append_state_at_feature_change(
+                "fix_count", issue, event, issue_states, issue_dates)
 
     def append_state_at_creation(self, issue, issue_states,
                                  issue_dates):
@@ -336,13 +785,13 @@ class CountingProcess:
             issue_dates: Dates of interest, on which an issue changes its
                          state.
         """
-        date = parse(issue["fields"]["created"]).date()
+        date = parse_date(issue["fields"]["created"])
 
         if date in issue_dates:
             return
         else:
             state = self.infer_state(date, issue_states, issue_dates)
-            bisect.insort(issue_dates, date)
+            issue_dates.add(date)
             issue_states[date] = state
 
     def append_state_at_resolution(self, issue, issue_states, issue_dates,
@@ -361,19 +810,20 @@ class CountingProcess:
         else:
             is_dead = 1
             if resolution_date in issue_dates:
-                issue_states[resolution_date]["is_dead"] = is_dead
+                issue_states[resolution_date].is_dead = is_dead
             else:
                 state = self.infer_state(
                     resolution_date, issue_states, issue_dates)
-                state["is_dead"] = is_dead
-                bisect.insort(issue_dates, resolution_date)
+                state.is_dead = is_dead
+                issue_dates.add(resolution_date)
                 issue_states[resolution_date] = state
 
-    def add_comment_features(self, issue, issue_states, issue_dates):
+    def add_comment_features(self, issue, events, issue_states, issue_dates):
         """ Adds the comment_count feature to the issue_states
 
         Args:
             issue: Dict that contains the issue's data
+            events: List of IssueEvent decoded from the issue.
             issue_states: Dict containg the states of the issue at the dates
                           of interest
             issue_dates: Dates of interest, on which an issue changes its
@@ -383,15 +833,17 @@ class CountingProcess:
 
         # We do a pass on the comment log and update states on dates
         # where comments have been written
-        for comment in issue["comments"]:
-            date = parse(comment["created"]).date()
+        for event in events:
+            if event.field != "comment":
+                continue
+            date = event.date
             comment_count += 1
             if date in issue_dates:
-                issue_states[date]["comment_count"] = comment_count
+                issue_states[date].comment_count = comment_count
             else:
                 state = self.infer_state(date, issue_states, issue_dates)
-                state["comment_count"] = comment_count
-                bisect.insort(issue_dates, date)
+                state.comment_count = comment_count
+                issue_dates.add(date)
                 issue_states[date] = state
 
     def add_reporter_rep_feature(self, issue, issue_states, issue_dates,
@@ -404,34 +856,35 @@ class CountingProcess:
                           of interest
             issue_dates: Dates of interest, on which an issue changes its
                          state.
-            reputations: Dictionary containing the reputation of each user and
+            reputations: CrossIssueIndex of the reputation of each user and
                          how it changes over time.
         """
         reporter = issue["fields"]["creator"]["key"]
-        reputation_dates = reputations[reporter]["reputation_dates"]
-        reputation_timeline = reputations[reporter]["reputation_timeline"]
-        creation_date = parse(issue["fields"]["created"]).date()
+        creation_date = parse_date(issue["fields"]["created"])
 
         # Get the starting date for the issue
-        idx = bisect.bisect(reputation_dates, creation_date) - 1
-        date = reputation_dates[idx]
+        idx = max(reputations.searchsorted([reporter], [creation_date])[0] - 1,
+                  0)
         prev_reporter_rep = float("inf")
+        checked_date = None
         # Do a pass to add reputation changes
-        while date <= issue_dates[-1] and idx < len(reputation_dates):
-            date = reputation_dates[idx]
-            reporter_rep = reputation_timeline[date]
+        for date, reporter_rep in reputations.iter_timeline(reporter, idx):
+            if checked_date is None:
+                checked_date = date
+            if checked_date > issue_dates[-1]:
+                break
             if abs(reporter_rep - prev_reporter_rep) >= 0.01:
                 prev_reporter_rep = reporter_rep
                 if date < issue_dates[0]:
                     date = issue_dates[0]
                 if date in issue_dates:
-                    issue_states[date]["reporter_rep"] = reporter_rep
+                    issue_states[date].reporter_rep = reporter_rep
                 else:
                     state = self.infer_state(date, issue_states, issue_dates)
-                    state["reporter_rep"] = reporter_rep
-                    bisect.insort(issue_dates, date)
+                    state.reporter_rep = reporter_rep
+                    issue_dates.add(date)
                     issue_states[date] = state
-            idx += 1
+            checked_date = date
 
     def add_assignee_workload_feature(self, issue, issue_states, issue_dates,
                                       workloads):
@@ -443,8 +896,8 @@ class CountingProcess:
                           of interest
             issue_dates: Dates of interest, on which an issue changes its
                          state.
-            workloads: Dictionary containing the workloads of each user and
-                         how it changes over time.
+            workloads: CrossIssueIndex of the workloads of each user and
+                       how it changes over time.
         """
         # duplicate code
         if not issue_dates:
@@ -453,10 +906,9 @@ class CountingProcess:
         # get the assignees in an issues
         assignee_timelines = []
         prev_date = issue_dates[0]
-        prev_assignee = issue_states[prev_date]["assignee"]
-        for i in range(len(issue_dates)):
-            curr_date = issue_dates[i]
-            curr_assignee = issue_states[curr_date]["assignee"]
+        prev_assignee = issue_states[prev_date].assignee
+        for curr_date in issue_dates:
+            curr_assignee = issue_states[curr_date].assignee
             if curr_assignee != prev_assignee:
                 assignees_entry = {"assignee": prev_assignee,
                                    "assigned_date": prev_date,
@@ -465,53 +917,136 @@ class CountingProcess:
 
                 prev_date = curr_date
                 prev_assignee = curr_assignee
-            if issue_states[curr_date]["is_dead"]:
+            if issue_states[curr_date].is_dead:
                 break
         assignees_entry = {"assignee": prev_assignee,
                            "assigned_date": prev_date,
                            "unassigned_date": curr_date}
         assignee_timelines.append(assignees_entry)
 
+        # Get the starting date of the workload of every assignee at once
+        assignee_timelines = [assignee_timeline
+                              for assignee_timeline in assignee_timelines
+                              if assignee_timeline["assignee"] != "unassigned"]
+        start_idxs = workloads.searchsorted(
+            [assignee_timeline["assignee"]
+             for assignee_timeline in assignee_timelines],
+            [assignee_timeline["assigned_date"]
+             for assignee_timeline in assignee_timelines]) - 1
+        start_idxs = np.maximum(start_idxs, 0)
+
         # add the workloads for each assignee to the issue states
-        for assignee_timeline in assignee_timelines:
+        for assignee_timeline, idx in zip(assignee_timelines, start_idxs):
             assignee = assignee_timeline["assignee"]
-            if assignee == "unassigned":
-                continue
-            workload_dates = workloads[assignee]["workload_dates"]
-            workload_timeline = workloads[assignee_timeline["assignee"]
-                                          ]["workload_timeline"]
-
-            # Get the starting date for the assignee workload
-            assigned_date = assignee_timeline["assigned_date"]
             unassigned_date = assignee_timeline["unassigned_date"]
-            idx = bisect.bisect(workload_dates, assigned_date) - 1
-            workload_date = workload_dates[idx]
             prev_assignee_workload = float("inf")
+            checked_date = None
             # Do a pass to add the assignee's workload
-            while (workload_date <= issue_dates[-1] and
-                   workload_date < unassigned_date and
-                   idx < len(workload_dates)):
-                workload_date = workload_dates[idx]
-                assignee_workload = workload_timeline[workload_date]
+            for workload_date, assignee_workload in workloads.iter_timeline(
+                    assignee, idx):
+                if checked_date is None:
+                    checked_date = workload_date
+                if (checked_date > issue_dates[-1] or
+                        checked_date >= unassigned_date):
+                    break
                 if abs(prev_assignee_workload - assignee_workload > 0):
                     prev_assignee_workload = assignee_workload
                     if workload_date < issue_dates[0]:
                         workload_date = issue_dates[0]
                     if workload_date in issue_dates:
-                        issue_states[workload_date]["assignee_workload"] = (
+                        issue_states[workload_date].assignee_workload = (
                             assignee_workload)
                     else:
                         state = self.infer_state(
                             workload_date, issue_states, issue_dates)
-                        state["assignee_workload"] = assignee_workload
-                        bisect.insort(issue_dates, workload_date)
+                        state.assignee_workload = assignee_workload
+                        issue_dates.add(workload_date)
                         issue_states[workload_date] = state
-                idx += 1
+                checked_date = workload_date
 
         # do a pass to set the workload of unassigned issues to None
         for date in issue_dates:
-            if issue_states[date]["assignee"] == "unassigned":
-                issue_states[date]["assignee_workload"] = None
+            if issue_states[date].assignee == "unassigned":
+                issue_states[date].assignee_workload = None
+
+    def get_assignee_timelines(self, issue, events, first_resolution,
+                               increment_resolution_date):
+        """ Gets the periods during which an issue was held by each assignee.
+
+        The periods match the ones found by walking the states built by
+        generate_issue_states, but they are computed from the assignee events
+        alone.
+
+        Args:
+            issue: Dict that contains the issue's data.
+            events: List of IssueEvent decoded from the issue.
+            first_resolution: Boolean indicating if we should use the first
+                              time an issue is resolved
+            increment_resolution_date: Boolean indicating if the resolution
+                                       date should be incremented by one day
+        Returns:
+            assignee_timelines: List of dicts containing an assignee with the
+                                dates on which the issue was assigned to and
+                                unassigned from them. Empty if the issue has
+                                no states.
+        """
+        creation_date = parse_date(issue["fields"]["created"])
+        resolution_date = self.get_resolution_date(
+            issue, events, first_resolution, increment_resolution_date)
+        if creation_date == resolution_date:
+            return []
+
+        # Dates on which generate_issue_states would create a state.
+        dates = {datetime.now(timezone.utc).date(), creation_date}
+        dates.update(event.date for event in events
+                     if event.field != "resolution")
+        if issue["fields"]["resolutiondate"] is not None:
+            dates.add(resolution_date)
+            last_date = resolution_date
+        else:
+            last_date = max(dates)
+        first_date = min(dates)
+
+        # The assignee after a date is the one the next change was made from.
+        # As in append_states_from_changelog, the last item of that change
+        # takes precedence.
+        assignee_events = [event for event in events
+                           if event.field == "assignee"]
+        change_dates = [event.date for event in assignee_events]
+        current_assignee = self.get_feature("assignee", issue)
+
+        def get_assignee_after(date):
+            idx = bisect.bisect(change_dates, date)
+            if idx == len(assignee_events):
+                return current_assignee
+            while (idx + 1 < len(assignee_events) and
+                   assignee_events[idx + 1].change ==
+                   assignee_events[idx].change):
+                idx += 1
+            if assignee_events[idx].from_ is None:
+                return "unassigned"
+            return assignee_events[idx].from_
+
+        assignee_timelines = []
+        prev_date = first_date
+        prev_assignee = get_assignee_after(first_date)
+        for curr_date in sorted(set(change_dates)):
+            if curr_date <= first_date or curr_date > last_date:
+                continue
+            curr_assignee = get_assignee_after(curr_date)
+            if curr_assignee != prev_assignee:
+                assignees_entry = {"assignee": prev_assignee,
+                                   "assigned_date": prev_date,
+                                   "unassigned_date": curr_date}
+                assignee_timelines.append(assignees_entry)
+
+                prev_date = curr_date
+                prev_assignee = curr_assignee
+        assignees_entry = {"assignee": prev_assignee,
+                           "assigned_date": prev_date,
+                           "unassigned_date": last_date}
+        assignee_timelines.append(assignees_entry)
+        return assignee_timelines
 
     def level_issue_states(self, issue, issue_states, issue_dates,
                            reputations, workloads):
@@ -521,35 +1056,35 @@ class CountingProcess:
             issue: Dict that contains the issue's data.
             issue_states: Dict containg the states of the issue at the dates
                           of interest.
-            reputations: Dictionary containing the reputation of each user and
-                         how it changes over time.
-            workloads: Dictionary containing the workloads of each user and
+            reputations: CrossIssueIndex of the reputation of each user and
                          how it changes over time.
+            workloads: CrossIssueIndex of the workloads of each user and
+                       how it changes over time.
         """
         comment_count = 0
         first_date = issue_dates[0]
         if reputations:
-            reporter_rep = issue_states[first_date]["reporter_rep"]
+            reporter_rep = issue_states[first_date].reporter_rep
         if workloads:
-            assignee_workload = issue_states[first_date]["assignee_workload"]
+            assignee_workload = issue_states[first_date].assignee_workload
 
         for date in issue_dates:
-            if issue_states[date].get("comment_count") is None:
-                issue_states[date]["comment_count"] = comment_count
+            if issue_states[date].comment_count is None:
+                issue_states[date].comment_count = comment_count
             else:
-                comment_count = issue_states[date]["comment_count"]
+                comment_count = issue_states[date].comment_count
 
             if reputations:
-                if issue_states[date].get("reporter_rep") is None:
-                    issue_states[date]["reporter_rep"] = reporter_rep
+                if issue_states[date].reporter_rep is None:
+                    issue_states[date].reporter_rep = reporter_rep
                 else:
-                    reporter_rep = issue_states[date]["reporter_rep"]
+                    reporter_rep = issue_states[date].reporter_rep
 
             if workloads:
-                if issue_states[date].get("assignee_workload") is None:
-                    issue_states[date]["assignee_workload"] = assignee_workload
+                if issue_states[date].assignee_workload is None:
+                    issue_states[date].assignee_workload = assignee_workload
                 else:
-                    assignee_workload = issue_states[date]["assignee_workload"]
+                    assignee_workload = issue_states[date].assignee_workload
 
     def add_count_features(self, issue, issue_states, issue_dates,
                            count=False):
@@ -568,184 +1103,185 @@ class CountingProcess:
         has_desc_change = 0
         has_fix_change = 0
         for date in issue_dates:
-            if issue_states[date].get("previous_priority") is not None:
+            if issue_states[date].previous_priority is not None:
                 if count:
                     has_priority_change += 1
                 else:
                     has_priority_change = 1
-            if issue_states[date].get("previous_desc") is not None:
+            if issue_states[date].previous_desc is not None:
                 if count:
                     has_desc_change += 1
                 else:
                     has_desc_change = 1
-            if issue_states[date].get("previous_fix_count") is not None:
+            if issue_states[date].previous_fix_count is not None:
                 if count:
                     has_fix_change += 1
                 else:
                     has_fix_change = 1
-            issue_states[date]["has_priority_change"] = has_priority_change
-            issue_states[date]["has_desc_change"] = has_desc_change
-            issue_states[date]["has_fix_change"] = has_fix_change
+            issue_states[date].has_priority_change = has_priority_change
+            issue_states[date].has_desc_change = has_desc_change
+            issue_states[date].has_fix_change = has_fix_change
 
-    def append_state_at_feature_change(self, feature, issue, item, date,
+    def append_state_at_feature_change(self, feature, issue, event,
                                        issue_states, issue_dates):
         """ Appends the state of an issue when a feature changes.
 
         Args:
             feature: Feature that changed.
             issue: Dict that contains the issue's data.
-            item: Dict that contains the item that was changed.
-            date: Datetime on which the change occured.
+            event: IssueEvent of the change.
             issue_states: Dict containg the states of the issue at the dates
                           of interest.
             issue_dates: Dates of interest, on which an issue changes its
                          state.
         """
+        date = event.date
         if feature == "priority":
             if date in issue_dates:
-                issue_states[date]["previous_priority"] = int(item["from"])
+                issue_states[date].previous_priority = int(event.from_)
             else:
                 state = self.infer_state(date, issue_states, issue_dates)
-                state["previous_priority"] = int(item["from"])
-                bisect.insort(issue_dates, date)
+                state.previous_priority = int(event.from_)
+                issue_dates.add(date)
                 issue_states[date] = state
 
         elif feature == "assignee":
-            if item["from"] is None:
+            if event.from_ is None:
                 previous_assignee = "unassigned"
             else:
-                previous_assignee = item["from"]
+                previous_assignee = event.from_
             if date in issue_dates:
-                issue_states[date]["previous_assignee"] = previous_assignee
+                issue_states[date].previous_assignee = previous_assignee
             else:
                 state = self.infer_state(date, issue_states, issue_dates)
-                state["previous_assignee"] = previous_assignee
-                bisect.insort(issue_dates, date)
+                state.previous_assignee = previous_assignee
+                issue_dates.add(date)
                 issue_states[date] = state
 
         elif feature == "is_assigned":
-            if item["from"] is None:
+            if event.from_ is None:
                 previous_is_assigned = 0
             else:
                 previous_is_assigned = 1
             if date in issue_dates:
-                issue_states[date]["previous_is_assigned"] = (
+                issue_states[date].previous_is_assigned = (
                     previous_is_assigned)
             else:
                 state = self.infer_state(date, issue_states, issue_dates)
-                state["previous_is_assigned"] = previous_is_assigned
-                bisect.insort(issue_dates, date)
+                state.previous_is_assigned = previous_is_assigned
+                issue_dates.add(date)
                 issue_states[date] = state
 
         elif feature == "issuetype":
             if date in issue_dates:
-                issue_states[date]["previous_issuetype"] = int(item["from"])
+                issue_states[date].previous_issuetype = int(event.from_)
             else:
                 state = self.infer_state(date, issue_states, issue_dates)
-                state["previous_issuetype"] = int(item["from"])
-                bisect.insort(issue_dates, date)
+                state.previous_issuetype = int(event.from_)
+                issue_dates.add(date)
                 issue_states[date] = state
 
         elif feature == "desc":
+            previous_desc = digest_description(event.from_)
             if date in issue_dates:
-                issue_states[date]["previous_desc"] = item["fromString"]
+                issue_states[date].previous_desc = previous_desc
             else:
                 state = self.infer_state(date, issue_states, issue_dates)
-                state["previous_desc"] = item["fromString"]
-                bisect.insort(issue_dates, date)
+                state.previous_desc = previous_desc
+                issue_dates.add(date)
                 issue_states[date] = state
 
         elif feature == "link_count":
             if date in issue_dates:
-                if item["from"]:
-                    if issue_states[date].get("previous_link_count"):
-                        issue_states[date]["previous_link_count"] += 1
+                if event.from_:
+                    if issue_states[date].previous_link_count:
+                        issue_states[date].previous_link_count += 1
                     else:
-                        issue_states[date]["previous_link_count"] = (
-                            issue_states[date]["link_count"] + 1)
-                elif item["to"]:
-                    if issue_states[date].get("previous_link_count"):
-                        issue_states[date]["previous_link_count"] -= 1
+                        issue_states[date].previous_link_count = (
+                            issue_states[date].link_count + 1)
+                elif event.to:
+                    if issue_states[date].previous_link_count:
+                        issue_states[date].previous_link_count -= 1
                     else:
-                        issue_states[date]["previous_link_count"] = (
-                            issue_states[date]["link_count"] - 1)
+                        issue_states[date].previous_link_count = (
+                            issue_states[date].link_count - 1)
                 else:
                     logging.INFO(
                         "Issue has both 'to' and 'from' in link feature")
             else:
                 state = self.infer_state(date, issue_states, issue_dates)
-                if item["from"]:
-                    state["previous_link_count"] = (
-                        state["link_count"] + 1)
-                elif item["to"]:
-                    state["previous_link_count"] = (
-                        state["link_count"] - 1)
+                if event.from_:
+                    state.previous_link_count = (
+                        state.link_count + 1)
+                elif event.to:
+                    state.previous_link_count = (
+                        state.link_count - 1)
                 else:
                     logging.INFO(
                         "Issue has both 'to' and 'from' in link feature")
-                bisect.insort(issue_dates, date)
+                issue_dates.add(date)
                 issue_states[date] = state
 
         elif feature == "affect_count":
             if date in issue_dates:
-                if item["from"]:
-                    if issue_states[date].get("previous_affect_count"):
-                        issue_states[date]["previous_affect_count"] += 1
+                if event.from_:
+                    if issue_states[date].previous_affect_count:
+                        issue_states[date].previous_affect_count += 1
                     else:
-                        issue_states[date]["previous_affect_count"] = (
-                            issue_states[date]["affect_count"] + 1)
-                elif item["to"]:
-                    if issue_states[date].get("previous_affect_count"):
-                        issue_states[date]["previous_affect_count"] -= 1
+                        issue_states[date].previous_affect_count = (
+                            issue_states[date].affect_count + 1)
+                elif event.to:
+                    if issue_states[date].previous_affect_count:
+                        issue_states[date].previous_affect_count -= 1
                     else:
-                        issue_states[date]["previous_affect_count"] = (
-                            issue_states[date]["affect_count"] - 1)
+                        issue_states[date].previous_affect_count = (
+                            issue_states[date].affect_count - 1)
                 else:
                     logging.INFO(
                         "Issue has both 'to' and 'from' in affect feature")
             else:
                 state = self.infer_state(date, issue_states, issue_dates)
-                if item["from"]:
-                    state["previous_affect_count"] = (
-                        state["affect_count"] + 1)
-                elif item["to"]:
-                    state["previous_affect_count"] = (
-                        state["affect_count"] - 1)
+                if event.from_:
+                    state.previous_affect_count = (
+                        state.affect_count + 1)
+                elif event.to:
+                    state.previous_affect_count = (
+                        state.affect_count - 1)
                 else:
                     logging.INFO(
                         "Issue has both 'to' and 'from' in affect feature")
-                bisect.insort(issue_dates, date)
+                issue_dates.add(date)
                 issue_states[date] = state
 
         elif feature == "fix_count":
             if date in issue_dates:
-                if item["from"]:
-                    if issue_states[date].get("previous_fix_count"):
-                        issue_states[date]["previous_fix_count"] += 1
+                if event.from_:
+                    if issue_states[date].previous_fix_count:
+                        issue_states[date].previous_fix_count += 1
                     else:
-                        issue_states[date]["previous_fix_count"] = (
-                            issue_states[date]["fix_count"] + 1)
-                elif item["to"]:
-                    if issue_states[date].get("previous_fix_count"):
-                        issue_states[date]["previous_fix_count"] -= 1
+                        issue_states[date].previous_fix_count = (
+                            issue_states[date].fix_count + 1)
+                elif event.to:
+                    if issue_states[date].previous_fix_count:
+                        issue_states[date].previous_fix_count -= 1
                     else:
-                        issue_states[date]["previous_fix_count"] = (
-                            issue_states[date]["fix_count"] - 1)
+                        issue_states[date].previous_fix_count = (
+                            issue_states[date].fix_count - 1)
                 else:
                     logging.INFO(
                         "Issue has both 'to' and 'from' in fix feature")
             else:
                 state = self.infer_state(date, issue_states, issue_dates)
-                if item["from"]:
-                    state["previous_fix_count"] = (
-                        state["fix_count"] + 1)
-                elif item["to"]:
-                    state["previous_fix_count"] = (
-                        state["fix_count"] - 1)
+                if event.from_:
+                    state.previous_fix_count = (
+                        state.fix_count + 1)
+                elif event.to:
+                    state.previous_fix_count = (
+                        state.fix_count - 1)
                 else:
                     logging.INFO(
                         "Issue has both 'to' and 'from' in fix feature")
-                bisect.insort(issue_dates, date)
+                issue_dates.add(date)
                 issue_states[date] = state
 
         else:
@@ -761,65 +1297,55 @@ class CountingProcess:
         Returns:
             state: Issuekey as a string.
         """
-        idx = bisect.bisect(issue_dates, date)
-
-        next_date = issue_dates[idx]
+        next_date = issue_dates.next_after(date)
         reference_state = issue_states[next_date]
 
         is_dead = 0
-        issuekey = reference_state["issuekey"]
+        issuekey = reference_state.issuekey
 
-        if reference_state.get("previous_priority") is None:
-            priority = reference_state["priority"]
+        if reference_state.previous_priority is None:
+            priority = reference_state.priority
         else:
-            priority = reference_state["previous_priority"]
+            priority = reference_state.previous_priority
 
-        if reference_state.get("previous_assignee") is None:
-            assignee = reference_state["assignee"]
+        if reference_state.previous_assignee is None:
+            assignee = reference_state.assignee
         else:
-            assignee = reference_state["previous_assignee"]
+            assignee = reference_state.previous_assignee
 
-        if reference_state.get("previous_is_assigned") is None:
-            is_assigned = reference_state["is_assigned"]
+        if reference_state.previous_is_assigned is None:
+            is_assigned = reference_state.is_assigned
         else:
-            is_assigned = reference_state["previous_is_assigned"]
+            is_assigned = reference_state.previous_is_assigned
 
-        if reference_state.get("previous_issuetype") is None:
-            issuetype = reference_state["issuetype"]
+        if reference_state.previous_issuetype is None:
+            issuetype = reference_state.issuetype
         else:
-            issuetype = reference_state["previous_issuetype"]
+            issuetype = reference_state.previous_issuetype
 
-        if reference_state.get("previous_desc") is None:
-            desc = reference_state["desc"]
+        if reference_state.previous_desc is None:
+            desc = reference_state.desc
         else:
-            desc = reference_state["previous_desc"]
+            desc = reference_state.previous_desc
 
-        if reference_state.get("previous_link_count") is None:
-            link_count = reference_state["link_count"]
+        if reference_state.previous_link_count is None:
+            link_count = reference_state.link_count
         else:
-            link_count = reference_state["previous_link_count"]
+            link_count = reference_state.previous_link_count
 
-        if reference_state.get("previous_affect_count") is None:
-            affect_count = reference_state["affect_count"]
+        if reference_state.previous_affect_count is None:
+            affect_count = reference_state.affect_count
         else:
-            affect_count = reference_state["previous_affect_count"]
+            affect_count = reference_state.previous_affect_count
 
-        if reference_state.get("previous_fix_count") is None:
-            fix_count = reference_state["fix_count"]
+        if reference_state.previous_fix_count is None:
+            fix_count = reference_state.fix_count
         else:
-            fix_count = reference_state["previous_fix_count"]
-
-        state = {"issuekey": issuekey,
-                 "is_dead": is_dead,
-                 "priority": priority,
-                 "assignee": assignee,
-                 "is_assigned": is_assigned,
-                 "issuetype": issuetype,
-                 "desc": desc,
-                 "link_count": link_count,
-                 "affect_count": affect_count,
-                 "fix_count": fix_count,
-                 }
+            fix_count = reference_state.previous_fix_count
+
+        state = IssueState(issuekey, is_dead, priority, assignee, is_assigned,
+                           issuetype, desc, link_count, affect_count,
+                           fix_count)
 
         return state
 
@@ -893,12 +1419,13 @@ class CountingProcess:
         else:
             raise ValueError()
 
-    def get_resolution_date(self, issue, first_resolution,
+    def get_resolution_date(self, issue, events, first_resolution,
                             increment_resolution_date):
         """ Gets the date of the first resolution of an issue
 
         Args:
             issue: A dict containing an issue's data
+            events: List of IssueEvent decoded from the issue.
             first_resolution: Boolean indicating wether we should consider the
                               first resolution_date or the latest one
             increment_resolution_date: Boolean indicating if the resolution
@@ -912,74 +1439,120 @@ class CountingProcess:
             return resolution_date
         else:
             if first_resolution:
-                for change in issue["changelog"]["histories"]:
-                    date = parse(change["created"]).date()
-                    for item in change["items"]:
-                        if item["field"] == "resolution":
-                            resolution_date = date
-                            if (increment_resolution_date and
-                                    resolution_date < today_date):
-                                resolution_date += timedelta(days=1)
-                            return resolution_date
+                for event in events:
+                    if event.field == "resolution":
+                        resolution_date = event.date
+                        if (increment_resolution_date and
+                                resolution_date < today_date):
+                            resolution_date += timedelta(days=1)
+                        return resolution_date
             else:
-                resolution_date = parse(
-                    issue["fields"]["resolutiondate"]).date()
+                resolution_date = parse_date(
+                    issue["fields"]["resolutiondate"])
                 if increment_resolution_date and resolution_date < today_date:
                     resolution_date = (resolution_date +
                                        timedelta(days=1))
                 return resolution_date
 
     def load_cross_issue_data(self, input_paths, include_cross_issue_features):
-        """ Loads the cross issue JSON data into dicts
+        """ Loads the cross issue data into indexes of the user timelines
 
         Args:
             input_paths: Dictionary containing paths of input files.
             include_cross_issue_features: bool indicating if we want to
                                           include cross issue features.
         Returns:
-            reputations: Dictionary containing the reputation of each user and
-                         how it changes over time.
-            workloads: Dictionary containing the workloads of each user and
+            reputations: CrossIssueIndex of the reputation of each user and
                          how it changes over time.
+            workloads: CrossIssueIndex of the workloads of each user and
+                       how it changes over time.
         """
         if include_cross_issue_features:
-            with open(input_paths["reputations"], 'rb') as fp:
-                reputations = pickle.load(fp)
-            with open(input_paths["workloads"], 'rb') as fp:
-                workloads = pickle.load(fp)
+            reputations = CrossIssueIndex.load(input_paths["reputations"])
+            workloads = CrossIssueIndex.load(input_paths["workloads"])
+            scope = input_paths.get("cross_issue_scope")
+            if scope is not None:
+                reputations = reputations.view(scope)
+                workloads = workloads.view(scope)
+            self.load_window_features(input_paths)
         else:
             reputations = None
             workloads = None
         return reputations, workloads
 
-    def generate_file_paths(self, project):
+    def load_window_features(self, input_paths):
+        """ Loads the windowed timelines into the window_features.
+
+        Args:
+            input_paths: Dictionary containing paths of input files.
+        """
+        self.window_features = {}
+        scope = input_paths.get("cross_issue_scope")
+        for window in input_paths.get("cross_issue_windows", ()):
+            for column, role, path in [
+                    ("reporter_rep", "reporter", input_paths["reputations"]),
+                    ("assignee_workload", "assignee",
+                     input_paths["workloads"])]:
+                index = CrossIssueIndex.load(window_path(path, window))
+                if scope is not None:
+                    index = index.view(scope)
+                self.window_features["{}_{}d".format(column, window)] = (
+                    role, index)
+
+    def get_window_indexes(self, role):
+        """ Gets the windowed timelines of the users with a role.
+
+        Args:
+            role: "reporter" or "assignee".
+        Returns:
+            indexes: List of the CrossIssueIndex of the windowed timelines.
+        """
+        return [index for index_role, index in self.window_features.values()
+                if index_role == role]
+
+    def generate_file_paths(self, project, cross_issue_scope=None,
+                            cross_issue_windows=()):
         """ Generates the input and output paths for the project.
 
         Args:
             project: Project for which we are generating the dataset.
+            cross_issue_scope: Scope of the global cross issue index to use,
+                               or None to use the project's own timelines.
+            cross_issue_windows: Sequence of the numbers of days of the
+                                 windowed timelines to add as columns.
         Returns:
             input_paths: Dictionary containing paths of input files.
             output_path: Dictionary containing paths of output files.
         """
         dir_path = os.path.dirname(os.path.realpath(__file__))
 
+        cross_issue_project = project
+        if cross_issue_scope is not None:
+            cross_issue_project = GLOBAL_CROSS_ISSUE_DIR
         reputations = os.path.join(
-            dir_path, "..", "..", "cross_issue_data", project,
-            "reputation_timelines.pickle")
+            dir_path, "..", "..", "cross_issue_data", cross_issue_project,
+            "reputation_timelines.bin")
         workloads = os.path.join(
-            dir_path, "..", "..", "cross_issue_data", project,
-            "workload_timelines.pickle")
+            dir_path, "..", "..", "cross_issue_data", cross_issue_project,
+            "workload_timelines.bin")
         issues = os.path.join(dir_path, "..", "..", "issues", project)
         input_paths = {"issues": issues,
                        "reputations": reputations,
                        "workloads": workloads}
+        if cross_issue_scope is not None:
+            input_paths["cross_issue_scope"] = cross_issue_scope
+        if cross_issue_windows:
+            input_paths["cross_issue_windows"] = list(cross_issue_windows)
 
         raw_dataset = os.path.join(
             dir_path, "..", "..", "datasets", project, "raw.csv")
         cross_issue = os.path.join(
             dir_path, "..", "..", "cross_issue_data", project)
         logs = os.path.join(dir_path, "..", "..", "logs", project, "log.csv")
+        manifest = os.path.join(
+            dir_path, "..", "..", "datasets", project, "raw_manifest.json")
         output_paths = {"raw_dataset": raw_dataset,
+                        "manifest": manifest,
                         "cross_issue": cross_issue,
                         "logs": logs}
         return input_paths, output_paths
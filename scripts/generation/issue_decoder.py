@@ -0,0 +1,164 @@
+"""
+This module contains the functionality to decode the changelog and comments
+of a JIRA issue into a single time-sorted list of events, and to drop the
+parts of an issue that are not decoded.
+
+Copyright (C) 2019  Noam Rabbani
+This program is free software: you can redistribute it and/or modify
+it under the terms of the GNU General Public License as published by
+the Free Software Foundation, either version 3 of the License, or
+(at your option) any later version.
+This program is distributed in the hope that it will be useful,
+but WITHOUT ANY WARRANTY; without even the implied warranty of
+MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+GNU General Public License for more details.
+You should have received a copy of the GNU General Public License
+along with this program.  If not, see <https://www.gnu.org/licenses/>.
+Email: hello@noamrabbani.com
+"""
+
+from collections import namedtuple
+import json
+from jira_timestamp import parse_date, parse_timestamp
+
+
+# An event is a change of a field on a given date. For descriptions, from and
+# to hold the text of the description rather than JIRA's (empty) ids. change
+# is the index of the changelog history the event belongs to. Comments are
+# events of the "comment" field with no from, to or change values.
+IssueEvent = namedtuple("IssueEvent", ["date", "field", "from_", "to",
+                                       "change"])
+
+# Changelog fields used to build the issue states.
+TRACKED_FIELDS = {"priority", "assignee", "issuetype", "description", "Link",
+                  "Version", "Fix Version", "resolution"}
+
+# Parts of an issue read by the generation of the datasets and the extraction
+# of the cross-issue data. True keeps a whole member, and a dict keeps the
+# given members of an object, or of each object of a list. The changelog
+# items of untracked fields are dropped as well.
+ISSUE_PROJECTION = {
+    "key": True,
+    "fields": {"priority": {"id": True},
+               "assignee": {"key": True},
+               "issuetype": {"id": True},
+               "description": True,
+               "issuelinks": {"id": True},
+               "versions": {"id": True},
+               "fixVersions": {"id": True},
+               "creator": {"key": True},
+               "created": True,
+               "resolutiondate": True},
+    "changelog": {"histories": {"created": True,
+                                "items": {"field": True,
+                                          "from": True,
+                                          "to": True,
+                                          "fromString": True,
+                                          "toString": True}}},
+    "comments": {"created": True},
+}
+
+
+def decode_events(issue):
+    """ Decodes the changelog and comments of an issue into events.
+
+    Args:
+        issue: Dict that contains the issue's data.
+    Returns:
+        events: List of IssueEvent sorted by the time at which they occured.
+                Events of the same change keep their order in the changelog.
+    """
+    timed_events = []
+    for change_idx, change in enumerate(issue["changelog"]["histories"]):
+        timestamp = parse_timestamp(change["created"])
+        date = parse_date(change["created"])
+        for item in change["items"]:
+            field = item["field"]
+            if field not in TRACKED_FIELDS:
+                continue
+            if field == "description":
+                event = IssueEvent(date, field, item.get("fromString"),
+                                   item.get("toString"), change_idx)
+            else:
+                event = IssueEvent(date, field, item["from"], item["to"],
+                                   change_idx)
+            timed_events.append((timestamp, event))
+
+    for comment in issue["comments"]:
+        timestamp = parse_timestamp(comment["created"])
+        date = parse_date(comment["created"])
+        timed_events.append((timestamp, IssueEvent(date, "comment", None,
+                                                   None, None)))
+
+    timed_events.sort(key=lambda timed_event: timed_event[0])
+    return [event for _, event in timed_events]
+
+
+def load_issue(content):
+    """ Loads an issue, keeping only the parts that are decoded.
+
+    The issue is only projected two levels deep: the unused members of the
+    issue, of its fields and changelog, and of each comment are dropped,
+    along with the changelog items of untracked fields. The objects below
+    that, such as each change of the changelog, are kept whole, since
+    copying them as well more than doubles the time taken to project an
+    issue. Stores written with project_fields are projected at every depth.
+
+    Args:
+        content: String or bytes of the JSON of the issue.
+    Returns:
+        issue: Dict that contains the issue's data.
+    """
+    return project_issue(json.loads(content), depth=2)
+
+
+def project_issue(issue, depth=None):
+    """ Drops the parts of an issue that are not in ISSUE_PROJECTION, the
+    changelog items of untracked fields and the changes left without items.
+
+    The changes that are kept stay in order, so the events decoded from the
+    projected issue are the same. Projecting an issue again leaves it as is.
+
+    Args:
+        issue: Dict that contains the issue's data.
+        depth: Number of levels of objects to project, or None for all.
+    Returns:
+        issue: Dict that contains the projected issue's data.
+    """
+    changelog = issue.get("changelog")
+    if changelog and changelog.get("histories"):
+        histories = []
+        for change in changelog["histories"]:
+            items = [item for item in change.get("items", ())
+                     if item.get("field") in TRACKED_FIELDS]
+            if items:
+                histories.append(dict(change, items=items))
+        issue = dict(issue, changelog=dict(changelog, histories=histories))
+    return project(issue, ISSUE_PROJECTION, depth)
+
+
+def project(value, schema, depth=None):
+    """ Keeps the parts of a JSON value given by a projection schema.
+
+    Args:
+        value: JSON value to project.
+        schema: Dict mapping the members to keep to their own schema, or to
+                True to keep them whole.
+        depth: Number of levels of objects to project, or None for all.
+    Returns:
+        value: Projected copy of the value.
+    """
+    if isinstance(value, list):
+        return [project(element, schema, depth) for element in value]
+    if not isinstance(value, dict):
+        return value
+    if depth is not None:
+        depth -= 1
+    projected = {}
+    for key, member_schema in schema.items():
+        if key in value:
+            member = value[key]
+            if member_schema is not True and depth != 0:
+                member = project(member, member_schema, depth)
+            projected[key] = member
+    return projected
@@ -0,0 +1,125 @@
+"""
+This module contains the record used to store the state of an issue at a
+date of interest.
+
+Copyright (C) 2019  Noam Rabbani
+This program is free software: you can redistribute it and/or modify
+it under the terms of the GNU General Public License as published by
+the Free Software Foundation, either version 3 of the License, or
+(at your option) any later version.
+This program is distributed in the hope that it will be useful,
+but WITHOUT ANY WARRANTY; without even the implied warranty of
+MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+GNU General Public License for more details.
+You should have received a copy of the GNU General Public License
+along with this program.  If not, see <https://www.gnu.org/licenses/>.
+Email: hello@noamrabbani.com
+"""
+
+import hashlib
+
+
+def digest_description(desc):
+    """ Gets a short digest of a description.
+
+    Descriptions are only compared with each other to detect changes, so
+    states keep a digest instead of a copy of the text.
+
+    Args:
+        desc: String containing the description, or None.
+    Returns:
+        digest: Bytes digest of the description, or None if desc is None.
+    """
+    if desc is None:
+        return None
+    return hashlib.blake2b(desc.encode("utf-8"), digest_size=8).digest()
+
+
+class IssueState:
+    """ State of an issue at a date of interest.
+
+    Features that have not been set are None. The record can also be used
+    like the dicts it replaces, e.g. state["priority"] or
+    state.get("previous_priority").
+    """
+
+    __slots__ = ("issuekey",
+                 "is_dead",
+                 "priority",
+                 "assignee",
+                 "is_assigned",
+                 "issuetype",
+                 "desc",
+                 "link_count",
+                 "affect_count",
+                 "fix_count",
+                 "comment_count",
+                 "reporter_rep",
+                 "assignee_workload",
+                 "has_priority_change",
+                 "has_desc_change",
+                 "has_fix_change",
+                 "previous_priority",
+                 "previous_assignee",
+                 "previous_is_assigned",
+                 "previous_issuetype",
+                 "previous_desc",
+                 "previous_link_count",
+                 "previous_affect_count",
+                 "previous_fix_count",
+                 )
+
+    def __init__(self, issuekey, is_dead, priority, assignee, is_assigned,
+                 issuetype, desc, link_count, affect_count, fix_count):
+        self.issuekey = issuekey
+        self.is_dead = is_dead
+        self.priority = priority
+        self.assignee = assignee
+        self.is_assigned = is_assigned
+        self.issuetype = issuetype
+        self.desc = desc
+        self.link_count = link_count
+        self.affect_count = affect_count
+        self.fix_count = fix_count
+        self.comment_count = None
+        self.reporter_rep = None
+        self.assignee_workload = None
+        self.has_priority_change = None
+        self.has_desc_change = None
+        self.has_fix_change = None
+        self.previous_priority = None
+        self.previous_assignee = None
+        self.previous_is_assigned = None
+        self.previous_issuetype = None
+        self.previous_desc = None
+        self.previous_link_count = None
+        self.previous_affect_count = None
+        self.previous_fix_count = None
+
+    def __getitem__(self, feature):
+        try:
+            return getattr(self, feature)
+        except AttributeError:
+            raise KeyError(feature)
+
+    def __setitem__(self, feature, value):
+        try:
+            setattr(self, feature, value)
+        except AttributeError:
+            raise KeyError(feature)
+
+    def get(self, feature, default=None):
+        value = getattr(self, feature, None)
+        return default if value is None else value
+
+    def to_dict(self):
+        """ Gets the features that have been set.
+
+        Returns:
+            state: Dict mapping the features to their values.
+        """
+        return {feature: getattr(self, feature) for feature in self.__slots__
+                if getattr(self, feature) is not None}
+
+    def __repr__(self):
+        return "IssueState({})".format(self.to_dict())
@@ -0,0 +1,425 @@
+"""
+This script contains the stores of the raw JIRA issues of a project: the
+directory of JSON files written by the scraper, and a store of compressed
+JSON-lines shards with an index of the position of each issue. It converts
+the first into the second.
+
+Copyright (C) 2019  Noam Rabbani
+This program is free software: you can redistribute it and/or modify
+it under the terms of the GNU General Public License as published by
+the Free Software Foundation, either version 3 of the License, or
+(at your option) any later version.
+This program is distributed in the hope that it will be useful,
+but WITHOUT ANY WARRANTY; without even the implied warranty of
+MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+GNU General Public License for more details.
+You should have received a copy of the GNU General Public License
+along with this program.  If not, see <https://www.gnu.org/licenses/>.
+Email: hello@noamrabbani.com
+"""
+
+import json
+import os
+import sys
+import zlib
+from issue_decoder import project_issue
+
+
+def main():
+
+    if len(sys.argv) < 3:
+        print("Must specify the issue directory and the store as arguments")
+        exit()
+
+    # Drop the parts of the issues that the datasets do not use.
+    project_fields = "--project-fields" in sys.argv[3:]
+    convert_issues(sys.argv[1], sys.argv[2], project_fields=project_fields)
+
+
+def open_issues(path):
+    """ Opens the issues of a project, whichever way they are stored.
+
+    Args:
+        path: Path of the directory of JSON files or of the IssueStore.
+    Returns:
+        issues: IssueStore if the path holds a store, otherwise an
+                IssueDirectory.
+    """
+    if os.path.exists(os.path.join(path, IssueStore.index_name)):
+        return IssueStore(path)
+    return IssueDirectory(path)
+
+
+def convert_issues(src_path, dst_path, shard_size=None,
+                   project_fields=False):
+    """ Copies the issues of a project into a new IssueStore.
+
+    The source can be a directory of JSON files or another store, in which
+    case the copy drops the old versions of rewritten issues.
+
+    Args:
+        src_path: Path of the issues to copy.
+        dst_path: Path of the new IssueStore.
+        shard_size: Number of bytes after which a new shard is started.
+        project_fields: Boolean indicating if the issues should be reduced
+                        to the parts in ISSUE_PROJECTION, at every depth.
+    """
+    with open_issues(src_path) as src, IssueStore(dst_path,
+                                                  shard_size) as dst:
+        for issuekey, content in src.iter_bytes():
+            if project_fields:
+                dst.put(issuekey, project_issue(json.loads(content)))
+            else:
+                dst.put_bytes(issuekey, content)
+
+
+class IssueDirectory:
+    """ Issues stored as one JSON file per issue, named by the issue key.
+    """
+
+    def __init__(self, path):
+        """
+        Args:
+            path: Path of the directory.
+        """
+        self.path = path
+
+    def keys(self):
+        """ Gets the keys of the issues.
+
+        Returns:
+            issuekeys: Sorted list of the keys.
+        """
+        return sorted(filename for filename in os.listdir(self.path)
+                      if not filename.endswith(".tmp"))
+
+    def read_bytes(self, issuekey):
+        """ Reads the JSON of an issue.
+
+        Args:
+            issuekey: Key of the issue.
+        Returns:
+            content: Bytes of the JSON of the issue.
+        """
+        with open(os.path.join(self.path, issuekey), "rb") as f:
+            return f.read()
+
+    def get(self, issuekey):
+        """ Loads an issue.
+
+        Args:
+            issuekey: Key of the issue.
+        Returns:
+            issue: Dict that contains the issue's data.
+        """
+        return json.loads(self.read_bytes(issuekey))
+
+    def iter_bytes(self):
+        """ Reads the JSON of the issues one at a time, in the order of the
+        directory.
+
+        Yields:
+            item: Tuple of the key of an issue and the bytes of its JSON.
+        """
+        for issuekey in os.listdir(self.path):
+            if not issuekey.endswith(".tmp"):
+                yield issuekey, self.read_bytes(issuekey)
+
+    def iter_issues(self):
+        """ Loads the issues one at a time.
+
+        Yields:
+            issue: Dict that contains the issue's data.
+        """
+        for _, content in self.iter_bytes():
+            yield json.loads(content)
+
+    def put(self, issuekey, issue):
+        """ Writes an issue atomically.
+
+        The file is written next to its destination and then moved, so that
+        an interrupted write never leaves a partial issue file.
+
+        Args:
+            issuekey: Key of the issue.
+            issue: Dict that contains the issue's data.
+        """
+        path = os.path.join(self.path, issuekey)
+        tmp_path = path + ".tmp"
+        with open(tmp_path, "w") as f:
+            json.dump(issue, f)
+        os.replace(tmp_path, path)
+
+    def put_bytes(self, issuekey, content):
+        """ Writes the JSON of an issue atomically.
+
+        Args:
+            issuekey: Key of the issue.
+            content: Bytes of the JSON of the issue.
+        """
+        path = os.path.join(self.path, issuekey)
+        with open(path + ".tmp", "wb") as f:
+            f.write(content)
+        os.replace(path + ".tmp", path)
+
+    def __contains__(self, issuekey):
+        return os.path.exists(os.path.join(self.path, issuekey))
+
+    def close(self):
+        pass
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.close()
+
+
+class IssueStore:
+    """ Issues stored as compressed JSON lines in a few large shards.
+
+    Each issue is compressed on its own as a gzip member and appended to the
+    current shard, so a shard is also a valid gzip file of JSON lines. The
+    index maps the keys of the issues to their shard, offset and length, so
+    an issue is read with one seek. The index is an append-only file of JSON
+    lines: an issue that is written again is appended, and the last entry of
+    a key is its current version. A line cut short by a crash is ignored.
+
+    The shard and then the index are synced to disk every sync_interval
+    issues and when the store is closed. An index entry only appears once
+    the bytes of its issue are durable, so a crash loses the last issues
+    written rather than leaving entries that point to missing data.
+    """
+
+    index_name = "index.jsonl"
+    shard_format = "shard-{:05d}.jsonl.gz"
+    default_shard_size = 256 * 1024 * 1024
+    # Number of issues written between two syncs of the store.
+    sync_interval = 256
+
+    def __init__(self, path, shard_size=None):
+        """
+        Args:
+            path: Path of the directory of the store, created if it does not
+                  exist.
+            shard_size: Number of bytes after which a new shard is started.
+        """
+        self.path = path
+        self.shard_size = shard_size or self.default_shard_size
+        if not os.path.exists(path):
+            os.mkdir(path)
+        self.entries = {}
+        index_path = os.path.join(path, self.index_name)
+        is_terminated = True
+        if os.path.exists(index_path):
+            with open(index_path, "r") as f:
+                for line in f:
+                    is_terminated = line.endswith("\n")
+                    try:
+                        issuekey, shard, offset, length = json.loads(line)
+                    except ValueError:
+                        continue
+                    self.entries[issuekey] = (shard, offset, length)
+        self.index_file = None
+        self.index_needs_newline = not is_terminated
+        self.unsynced_entries = []
+        self.readers = {}
+        self.writer = None
+        self.writer_shard = None
+
+    def keys(self):
+        """ Gets the keys of the issues.
+
+        Returns:
+            issuekeys: Sorted list of the keys.
+        """
+        return sorted(self.entries)
+
+    def read_bytes(self, issuekey):
+        """ Reads the JSON of an issue.
+
+        Args:
+            issuekey: Key of the issue.
+        Returns:
+            content: Bytes of the JSON of the issue, without its newline.
+        """
+        shard, offset, length = self.entries[issuekey]
+        reader = self.get_reader(shard)
+        reader.seek(offset)
+        return self.decompress(reader.read(length))
+
+    def get(self, issuekey):
+        """ Loads an issue.
+
+        Args:
+            issuekey: Key of the issue.
+        Returns:
+            issue: Dict that contains the issue's data.
+        """
+        return json.loads(self.read_bytes(issuekey))
+
+    def iter_bytes(self):
+        """ Reads the JSON of the issues one at a time, in the order they are
+        stored.
+
+        Yields:
+            item: Tuple of the key of an issue and the bytes of its JSON.
+        """
+        for issuekey, (shard, offset, length) in sorted(
+                self.entries.items(), key=lambda item: item[1]):
+            reader = self.get_reader(shard)
+            if reader.tell() != offset:
+                reader.seek(offset)
+            yield issuekey, self.decompress(reader.read(length))
+
+    def iter_issues(self):
+        """ Loads the issues one at a time, in the order they are stored.
+
+        Yields:
+            issue: Dict that contains the issue's data.
+        """
+        for _, content in self.iter_bytes():
+            yield json.loads(content)
+
+    def put(self, issuekey, issue):
+        """ Appends an issue to the store.
+
+        Args:
+            issuekey: Key of the issue.
+            issue: Dict that contains the issue's data.
+        """
+        self.put_bytes(issuekey, json.dumps(issue).encode("utf-8"))
+
+    def put_bytes(self, issuekey, content):
+        """ Appends the JSON of an issue to the store.
+
+        The issue can be read from the store at once, but its index entry is
+        only written by the next sync, after the shard is synced.
+
+        Args:
+            issuekey: Key of the issue.
+            content: Bytes of the JSON of the issue.
+        """
+        compressor = zlib.compressobj(6, zlib.DEFLATED, 31)
+        data = compressor.compress(content + b"\n") + compressor.flush()
+        writer, shard = self.get_writer(len(data))
+        offset = writer.tell()
+        writer.write(data)
+        writer.flush()
+        # Readers of the shard may have buffered its previous end.
+        self.close_reader(shard)
+
+        self.entries[issuekey] = (shard, offset, len(data))
+        self.unsynced_entries.append([issuekey, shard, offset, len(data)])
+        if len(self.unsynced_entries) >= self.sync_interval:
+            self.sync()
+
+    def sync(self):
+        """ Durably writes the issues appended since the last sync.
+
+        The shard is synced first, and only then are the index entries of
+        the issues appended to the index and synced.
+        """
+        if not self.unsynced_entries:
+            return
+        os.fsync(self.writer.fileno())
+
+        if self.index_file is None:
+            self.index_file = open(
+                os.path.join(self.path, self.index_name), "a")
+            if self.index_needs_newline:
+                self.index_file.write("\n")
+        self.index_file.writelines(json.dumps(entry) + "\n"
+                                   for entry in self.unsynced_entries)
+        self.index_file.flush()
+        os.fsync(self.index_file.fileno())
+        self.unsynced_entries = []
+
+    def get_writer(self, size):
+        """ Gets the shard to which the next issue is appended.
+
+        Args:
+            size: Number of bytes of the next issue.
+        Returns:
+            writer: File of the shard, opened for appending.
+            shard: Number of the shard.
+        """
+        if self.writer is None:
+            shard = max((entry[0] for entry in self.entries.values()),
+                        default=0)
+            self.open_writer(shard)
+        if (self.writer.tell() and
+                self.writer.tell() + size > self.shard_size):
+            # The entries waiting for a sync are all in the current shard.
+            self.sync()
+            self.writer.close()
+            self.open_writer(self.writer_shard + 1)
+        return self.writer, self.writer_shard
+
+    def open_writer(self, shard):
+        """ Opens a shard for appending.
+
+        Args:
+            shard: Number of the shard.
+        """
+        self.writer = open(self.get_shard_path(shard), "ab")
+        self.writer_shard = shard
+
+    def get_reader(self, shard):
+        """ Gets the open file of a shard for reading.
+
+        Args:
+            shard: Number of the shard.
+        Returns:
+            reader: File of the shard.
+        """
+        if shard not in self.readers:
+            self.readers[shard] = open(self.get_shard_path(shard), "rb")
+        return self.readers[shard]
+
+    def close_reader(self, shard):
+        """ Closes the file of a shard opened for reading.
+
+        Args:
+            shard: Number of the shard.
+        """
+        reader = self.readers.pop(shard, None)
+        if reader is not None:
+            reader.close()
+
+    def get_shard_path(self, shard):
+        return os.path.join(self.path, self.shard_format.format(shard))
+
+    def decompress(self, data):
+        """ Decompresses an issue, removing its newline.
+        """
+        return zlib.decompress(data, 31)[:-1]
+
+    def __contains__(self, issuekey):
+        return issuekey in self.entries
+
+    def __len__(self):
+        return len(self.entries)
+
+    def close(self):
+        """ Syncs and closes the files of the store.
+        """
+        self.sync()
+        for shard in list(self.readers):
+            self.close_reader(shard)
+        if self.writer is not None:
+            self.writer.close()
+            self.writer = None
+        if self.index_file is not None:
+            self.index_file.close()
+            self.index_file = None
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.close()
+
+
+if __name__ == "__main__":
+    main()
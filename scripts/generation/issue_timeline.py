@@ -0,0 +1,121 @@
+"""
+This module contains the ordered timeline used to keep track of the dates on
+which an issue changes its state.
+
+Copyright (C) 2019  Noam Rabbani
+This program is free software: you can redistribute it and/or modify
+it under the terms of the GNU General Public License as published by
+the Free Software Foundation, either version 3 of the License, or
+(at your option) any later version.
+This program is distributed in the hope that it will be useful,
+but WITHOUT ANY WARRANTY; without even the implied warranty of
+MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+GNU General Public License for more details.
+You should have received a copy of the GNU General Public License
+along with this program.  If not, see <https://www.gnu.org/licenses/>.
+Email: hello@noamrabbani.com
+"""
+
+import bisect
+import itertools
+
+
+class IssueTimeline:
+    """ Ordered set of the dates of interest of an issue.
+
+    Membership is checked against a set. The dates themselves are kept in
+    a list of sorted buckets of bounded size, indexed by the maximum of each
+    bucket, so that an insertion only shifts the elements of one bucket.
+    """
+
+    load = 64
+
+    def __init__(self, dates=()):
+        self._members = set()
+        self._buckets = []
+        self._maxes = []
+        for date in dates:
+            self.add(date)
+
+    def add(self, date):
+        """ Inserts a date in the timeline if it is not already in it.
+
+        Args:
+            date: Date to insert.
+        Returns:
+            added: Boolean indicating if the date was inserted.
+        """
+        if date in self._members:
+            return False
+        self._members.add(date)
+
+        if not self._buckets:
+            self._buckets.append([date])
+            self._maxes.append(date)
+            return True
+
+        pos = bisect.bisect_left(self._maxes, date)
+        if pos == len(self._maxes):
+            pos -= 1
+            self._buckets[pos].append(date)
+            self._maxes[pos] = date
+        else:
+            bisect.insort(self._buckets[pos], date)
+
+        bucket = self._buckets[pos]
+        if len(bucket) > 2 * self.load:
+            half = bucket[self.load:]
+            del bucket[self.load:]
+            self._maxes[pos] = bucket[-1]
+            self._buckets.insert(pos + 1, half)
+            self._maxes.insert(pos + 1, half[-1])
+        return True
+
+    def next_after(self, date):
+        """ Gets the first date of the timeline that is after a given date.
+
+        Args:
+            date: Reference date.
+        Returns:
+            next_date: Earliest date in the timeline greater than date.
+        Raises:
+            IndexError: If no date in the timeline is greater than date.
+        """
+        pos = bisect.bisect_right(self._maxes, date)
+        if pos == len(self._maxes):
+            raise IndexError("no date after {}".format(date))
+        bucket = self._buckets[pos]
+        return bucket[bisect.bisect_right(bucket, date)]
+
+    def __contains__(self, date):
+        return date in self._members
+
+    def __len__(self):
+        return len(self._members)
+
+    def __iter__(self):
+        return itertools.chain.from_iterable(self._buckets)
+
+    def __reversed__(self):
+        for bucket in reversed(self._buckets):
+            yield from reversed(bucket)
+
+    def __getitem__(self, idx):
+        if idx < 0:
+            idx += len(self)
+        if idx < 0 or idx >= len(self):
+            raise IndexError("timeline index out of range")
+
+        if idx >= len(self) // 2:
+            idx -= len(self)
+            for bucket in reversed(self._buckets):
+                if -idx <= len(bucket):
+                    return bucket[idx]
+                idx += len(bucket)
+        for bucket in self._buckets:
+            if idx < len(bucket):
+                return bucket[idx]
+            idx -= len(bucket)
+
+    def __repr__(self):
+        return "IssueTimeline({})".format(list(self))
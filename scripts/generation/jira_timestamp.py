@@ -0,0 +1,76 @@
+"""
+This module contains the functionality to parse the timestamps found in JIRA
+issues, such as the created and resolutiondate fields.
+
+JIRA always formats its timestamps as 2019-01-31T23:59:59.000+0000, so those
+are parsed by slicing the string. Anything else falls back to dateutil.
+Results are cached since the same timestamps appear several times per issue.
+
+Copyright (C) 2019  Noam Rabbani
+This program is free software: you can redistribute it and/or modify
+it under the terms of the GNU General Public License as published by
+the Free Software Foundation, either version 3 of the License, or
+(at your option) any later version.
+This program is distributed in the hope that it will be useful,
+but WITHOUT ANY WARRANTY; without even the implied warranty of
+MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+GNU General Public License for more details.
+You should have received a copy of the GNU General Public License
+along with this program.  If not, see <https://www.gnu.org/licenses/>.
+Email: hello@noamrabbani.com
+"""
+
+import functools
+import re
+from datetime import datetime, timedelta, timezone
+from dateutil.parser import parse
+
+
+JIRA_TIMESTAMP = re.compile(
+    r"\d{4}-\d{2}-\d{2}T\d{2}:\d{2}:\d{2}\.\d{3}[+-]\d{4}$")
+CACHE_SIZE = 2 ** 16
+
+
+@functools.lru_cache(maxsize=None)
+def get_timezone(offset):
+    """ Gets the timezone of a JIRA offset such as +0000 or -0700.
+
+    Args:
+        offset: String containing the offset.
+    Returns:
+        tz: Timezone with the given offset from UTC.
+    """
+    minutes = int(offset[1:3]) * 60 + int(offset[3:5])
+    if offset[0] == "-":
+        minutes = -minutes
+    return timezone(timedelta(minutes=minutes))
+
+
+@functools.lru_cache(maxsize=CACHE_SIZE)
+def parse_timestamp(timestamp):
+    """ Parses a JIRA timestamp.
+
+    Args:
+        timestamp: String containing the timestamp.
+    Returns:
+        datetime: Timezone aware datetime of the timestamp.
+    """
+    if JIRA_TIMESTAMP.match(timestamp):
+        return datetime(int(timestamp[0:4]), int(timestamp[5:7]),
+                        int(timestamp[8:10]), int(timestamp[11:13]),
+                        int(timestamp[14:16]), int(timestamp[17:19]),
+                        int(timestamp[20:23]) * 1000,
+                        get_timezone(timestamp[23:28]))
+    return parse(timestamp)
+
+
+@functools.lru_cache(maxsize=CACHE_SIZE)
+def parse_date(timestamp):
+    """ Parses a JIRA timestamp and keeps its date in the timestamp's timezone.
+
+    Args:
+        timestamp: String containing the timestamp.
+    Returns:
+        date: Date of the timestamp.
+    """
+    return parse_timestamp(timestamp).date()
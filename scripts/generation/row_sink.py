@@ -0,0 +1,108 @@
+"""
+This module contains the sink used to write the rows of the counting process
+dataset to disk.
+
+Copyright (C) 2019  Noam Rabbani
+This program is free software: you can redistribute it and/or modify
+it under the terms of the GNU General Public License as published by
+the Free Software Foundation, either version 3 of the License, or
+(at your option) any later version.
+This program is distributed in the hope that it will be useful,
+but WITHOUT ANY WARRANTY; without even the implied warranty of
+MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+GNU General Public License for more details.
+You should have received a copy of the GNU General Public License
+along with this program.  If not, see <https://www.gnu.org/licenses/>.
+Email: hello@noamrabbani.com
+"""
+
+import itertools
+import numpy as np
+import pandas as pd
+
+
+class RowSink:
+    """ Writes rows to a tab separated CSV file in fixed-size chunks.
+
+    Rows are written in batches of columns and buffered until chunk_size of
+    them have been written, after which they are appended to the file. With
+    chunk_size=None, all rows are kept in memory and written when the sink
+    is closed. The columns of all buffered batches are joined into one typed
+    array per column when the chunk is written, which avoids building a dict
+    per row.
+    """
+
+    def __init__(self, path, columns, chunk_size=None, dtypes=None):
+        """
+        Args:
+            path: Path of the CSV file to write.
+            columns: List of the columns of the dataset, in order.
+            chunk_size: Number of rows written at a time.
+            dtypes: Dict mapping columns to their dtype, so that every chunk
+                    formats its values the same way.
+        """
+        self.path = path
+        self.columns = columns
+        self.chunk_size = chunk_size
+        dtypes = dtypes or {}
+        self.dtypes = {column: dtype for column, dtype in dtypes.items()
+                       if column in columns}
+        self.batches = []
+        self.batch_row_count = 0
+        self.header_written = False
+        self.file = open(path, "w", newline="")
+
+    def write_columns(self, batch):
+        """ Adds a batch of rows given as columns to the sink.
+
+        Args:
+            batch: Dict mapping the columns to sequences of equal length.
+        """
+        self.batches.append(batch)
+        self.batch_row_count += len(batch[self.columns[0]])
+        if self.chunk_size and self.batch_row_count >= self.chunk_size:
+            self.flush()
+
+    def write_lines(self, lines):
+        """ Copies lines that are already formatted to the file.
+
+        The buffered rows are written first so that the lines keep their
+        position in the dataset.
+
+        Args:
+            lines: Iterable of tab separated lines, including their newline.
+        """
+        self.flush()
+        self.file.writelines(lines)
+
+    def flush(self):
+        """ Writes the buffered rows to the file.
+        """
+        if not self.batches and self.header_written:
+            return
+        data = {}
+        for column in self.columns:
+            values = itertools.chain.from_iterable(
+                batch[column] for batch in self.batches)
+            data[column] = np.array(list(values),
+                                    dtype=self.dtypes.get(column))
+        df = pd.DataFrame(data, columns=self.columns)
+        if self.dtypes:
+            df = df.astype(self.dtypes)
+        df.to_csv(self.file, sep="\t", index=False,
+                  header=not self.header_written)
+        self.header_written = True
+        self.batches = []
+        self.batch_row_count = 0
+
+    def close(self):
+        """ Writes the remaining rows and closes the file.
+        """
+        self.flush()
+        self.file.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.close()
@@ -0,0 +1,96 @@
+"""
+Compares the sorted list + bisect.insort approach that was used to keep the
+dates of an issue against IssueTimeline, for issues with thousands of events.
+
+Usage: python scripts/misc/benchmark_issue_timeline.py [event_counts...]
+
+Copyright (C) 2019  Noam Rabbani
+This program is free software: you can redistribute it and/or modify
+it under the terms of the GNU General Public License as published by
+the Free Software Foundation, either version 3 of the License, or
+(at your option) any later version.
+This program is distributed in the hope that it will be useful,
+but WITHOUT ANY WARRANTY; without even the implied warranty of
+MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+GNU General Public License for more details.
+You should have received a copy of the GNU General Public License
+along with this program.  If not, see <https://www.gnu.org/licenses/>.
+Email: hello@noamrabbani.com
+"""
+
+import bisect
+import random
+import sys
+import timeit
+from datetime import date, timedelta
+sys.path.insert(0, "./scripts/generation/")
+from issue_timeline import IssueTimeline  # noqa
+
+
+def main():
+    if len(sys.argv) > 1:
+        event_counts = [int(arg) for arg in sys.argv[1:]]
+    else:
+        event_counts = [1000, 5000, 20000]
+
+    b = TimelineBenchmark()
+    print("{:>8} {:>12} {:>12} {:>8}".format(
+        "events", "list (s)", "timeline (s)", "speedup"))
+    for event_count in event_counts:
+        events = b.generate_events(event_count)
+        list_time = b.time(b.build_with_list, events)
+        timeline_time = b.time(b.build_with_timeline, events)
+        print("{:>8} {:>12.4f} {:>12.4f} {:>7.1f}x".format(
+            event_count, list_time, timeline_time, list_time / timeline_time))
+
+
+class TimelineBenchmark:
+    """ Replays the access pattern of generate_issue_states on both
+    structures: a membership check, an optional state inference on the next
+    date and an insertion.
+    """
+
+    def generate_events(self, event_count, seed=0):
+        """ Generates the event dates of a synthetic issue.
+
+        The dates are spread over ten years and contain duplicates, like the
+        changelog, comment and cross issue dates of a long lived issue.
+
+        Args:
+            event_count: Number of events of the issue.
+            seed: Seed of the random number generator.
+        Returns:
+            events: List of dates in the order they are added to the issue.
+        """
+        rng = random.Random(seed)
+        creation_date = date(2010, 1, 1)
+        return [creation_date + timedelta(days=rng.randint(0, 3650))
+                for _ in range(event_count)]
+
+    def build_with_list(self, events):
+        issue_dates = [date(2030, 1, 1)]
+        for event in events:
+            if event in issue_dates:
+                continue
+            issue_dates[bisect.bisect(issue_dates, event)]
+            bisect.insort(issue_dates, event)
+        return issue_dates
+
+    def build_with_timeline(self, events):
+        issue_dates = IssueTimeline([date(2030, 1, 1)])
+        for event in events:
+            if event in issue_dates:
+                continue
+            issue_dates.next_after(event)
+            issue_dates.add(event)
+        return issue_dates
+
+    def time(self, build, events, repeat=3):
+        """ Gets the best run time of a build function over a few runs.
+        """
+        return min(timeit.repeat(lambda: build(events), number=1,
+                                 repeat=repeat))
+
+
+if __name__ == "__main__":
+    main()
@@ -16,11 +16,11 @@ along with this program.  If not, see <https://www.gnu.org/licenses/>.
 Email: hello@noamrabbani.com
 """
 
-import pickle
 import sys
 import os
 sys.path.insert(0, "./scripts/generation/")
 import generate_dataset  # noqa
+from cross_issue_query import CrossIssueQuery  # noqa
 
 
 def main():
@@ -35,10 +35,7 @@ class Caller:
 
     def call_generate_issue_states(self, input_paths, issuekey):
         cp = generate_dataset.CountingProcess()
-        with open(input_paths["reputations"], 'rb') as fp:
-            reputations = pickle.load(fp)
-        with open(input_paths["workloads"], 'rb') as fp:
-            workloads = pickle.load(fp)
+        reputations, workloads = cp.load_cross_issue_data(input_paths, True)
         first_resolution = False
         increment_resolution_date = True
         issue_path = os.path.join(input_paths["issues"], issuekey)
@@ -47,6 +44,14 @@ class Caller:
             reputations, workloads)
         pass
 
+    def call_cross_issue_query(self, input_paths, user, date):
+        cp = generate_dataset.CountingProcess()
+        reputations, workloads = cp.load_cross_issue_data(input_paths, True)
+        query = CrossIssueQuery(reputations, workloads)
+        reputation = query.reputation_at(user, date)
+        workload = query.workload_at(user, date)
+        return reputation, workload
+
 
 if __name__ == "__main__":
     main()
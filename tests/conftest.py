@@ -0,0 +1,94 @@
+import pytest
+import json
+import os
+
+
+def change(created, field, from_value, to_value, from_string=None):
+    return {"created": created,
+            "items": [{"field": field,
+                       "from": from_value,
+                       "to": to_value,
+                       "fromString": from_string,
+                       "toString": None}]}
+
+
+ISSUES = [
+    {"key": "TEST-1",
+     "fields": {"priority": {"id": "3"},
+                "assignee": {"key": "bob"},
+                "issuetype": {"id": "1"},
+                "description": "Second description",
+                "issuelinks": [{}],
+                "versions": [{}],
+                "fixVersions": [{}, {}],
+                "creator": {"key": "alice"},
+                "created": "2015-01-01T10:00:00.000+0000",
+                "resolutiondate": "2015-03-01T10:00:00.000+0000"},
+     "changelog": {"histories": [
+         change("2015-01-05T10:00:00.000+0000", "assignee", None, "bob"),
+         change("2015-01-10T10:00:00.000+0000", "priority", "4", "3"),
+         change("2015-01-10T11:00:00.000+0000", "description", None, None,
+                "First description"),
+         change("2015-01-20T10:00:00.000+0000", "Link", None, "TEST-2"),
+         change("2015-02-01T10:00:00.000+0000", "Fix Version", None, "1"),
+         change("2015-02-02T10:00:00.000+0000", "Fix Version", None, "2"),
+         change("2015-03-01T10:00:00.000+0000", "resolution", None, "1")]},
+     "comments": [{"created": "2015-01-02T10:00:00.000+0000"},
+                  {"created": "2015-01-10T12:00:00.000+0000"},
+                  {"created": "2015-02-15T10:00:00.000+0000"}]},
+    {"key": "TEST-2",
+     "fields": {"priority": {"id": "2"},
+                "assignee": None,
+                "issuetype": {"id": "4"},
+                "description": None,
+                "issuelinks": [{}],
+                "versions": [],
+                "fixVersions": [],
+                "creator": {"key": "bob"},
+                "created": "2015-01-15T08:30:00.000+0000",
+                "resolutiondate": None},
+     "changelog": {"histories": [
+         change("2015-01-20T10:00:00.000+0000", "Link", None, "TEST-1"),
+         change("2015-02-10T10:00:00.000+0000", "assignee", "bob", None),
+         change("2015-02-12T10:00:00.000+0000", "issuetype", "1", "4")]},
+     "comments": []},
+    {"key": "TEST-3",
+     "fields": {"priority": {"id": "3"},
+                "assignee": {"key": "alice"},
+                "issuetype": {"id": "1"},
+                "description": "Fixed on the same day",
+                "issuelinks": [],
+                "versions": [{}],
+                "fixVersions": [{}],
+                "creator": {"key": "alice"},
+                "created": "2015-02-01T09:00:00.000+0000",
+                "resolutiondate": "2015-02-20T17:00:00.000+0000"},
+     "changelog": {"histories": [
+         change("2015-02-03T10:00:00.000+0000", "assignee", None, "alice"),
+         change("2015-02-20T17:00:00.000+0000", "resolution", None, "1")]},
+     "comments": [{"created": "2015-02-19T10:00:00.000+0000"}]},
+]
+
+
+@pytest.fixture()
+def project_paths(tmp_path):
+    """ Writes a small set of JIRA issues and returns the project paths.
+    """
+    issues_dir = tmp_path / "issues"
+    issues_dir.mkdir()
+    for issue in ISSUES:
+        with open(os.path.join(str(issues_dir), issue["key"]), "w") as f:
+            json.dump(issue, f)
+
+    cross_issue_dir = str(tmp_path)
+    input_paths = {"issues": str(issues_dir),
+                   "reputations": os.path.join(cross_issue_dir,
+                                               "reputation_timelines.bin"),
+                   "workloads": os.path.join(cross_issue_dir,
+                                             "workload_timelines.bin")}
+    output_paths = {"raw_dataset": os.path.join(str(tmp_path), "raw.csv"),
+                    "manifest": os.path.join(str(tmp_path),
+                                             "raw_manifest.json"),
+                    "cross_issue": cross_issue_dir,
+                    "logs": os.path.join(str(tmp_path), "log.csv")}
+    return input_paths, output_paths
@@ -0,0 +1,79 @@
+import pytest
+import bisect
+import math
+import os
+import random
+import sys
+from datetime import date, timedelta
+
+current_dir = os.path.dirname(__file__)
+sys.path.insert(0, os.path.join(current_dir, "..", "scripts", "generation"))
+from cross_issue_index import CrossIssueIndex  # noqa
+
+
+@pytest.fixture()
+def timelines():
+    rng = random.Random(0)
+    timelines = {}
+    for user in ["user{}".format(i) for i in range(20)]:
+        dates = sorted({date(2010, 1, 1) + timedelta(days=rng.randint(0, 900))
+                        for _ in range(rng.randint(1, 60))})
+        timelines[user] = {"workload_dates": dates,
+                           "workload_timeline": {d: rng.randint(0, 10)
+                                                 for d in dates}}
+    return timelines
+
+
+def test_lookup_matches_bisect(timelines):
+    index = CrossIssueIndex.from_timelines(timelines, "workload_dates",
+                                           "workload_timeline")
+    rng = random.Random(1)
+    users = [rng.choice(list(timelines)) for _ in range(500)]
+    dates = [date(2009, 12, 1) + timedelta(days=rng.randint(0, 1000))
+             for _ in users]
+
+    positions = index.searchsorted(users, dates)
+    values = index.lookup(users, dates)
+    for user, d, position, value in zip(users, dates, positions, values):
+        user_dates = timelines[user]["workload_dates"]
+        idx = bisect.bisect(user_dates, d)
+        assert position == idx
+        if idx == 0:
+            assert math.isnan(value)
+        else:
+            assert value == timelines[user]["workload_timeline"][
+                user_dates[idx - 1]]
+
+
+def test_iter_timeline_matches_timeline(timelines):
+    index = CrossIssueIndex.from_timelines(timelines, "workload_dates",
+                                           "workload_timeline")
+    for user, entry in timelines.items():
+        expected = [(d, entry["workload_timeline"][d])
+                    for d in entry["workload_dates"]]
+        assert list(index.iter_timeline(user, chunk_size=7)) == expected
+        assert list(index.iter_timeline(user, 3)) == expected[3:]
+
+
+def test_saved_index_matches_index(timelines, tmp_path):
+    index = CrossIssueIndex.from_timelines(timelines, "workload_dates",
+                                           "workload_timeline")
+    path = os.path.join(str(tmp_path), "workload_timelines.bin")
+    index.save(path)
+    loaded = CrossIssueIndex.load(path)
+
+    assert loaded.users == index.users
+    for user in timelines:
+        assert (list(loaded.iter_timeline(user)) ==
+                list(index.iter_timeline(user)))
+    dates = [date(2011, 1, 1)] * len(index.users)
+    assert list(loaded.searchsorted(index.users, dates)) == list(
+        index.searchsorted(index.users, dates))
+
+
+def test_saved_empty_index(tmp_path):
+    path = os.path.join(str(tmp_path), "empty.bin")
+    CrossIssueIndex.from_timelines({}, "workload_dates",
+                                   "workload_timeline").save(path)
+
+    assert len(CrossIssueIndex.load(path)) == 0
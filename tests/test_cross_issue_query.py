@@ -0,0 +1,101 @@
+import pytest
+import bisect
+import math
+import os
+import random
+import sys
+from datetime import date, datetime, timedelta, timezone
+
+current_dir = os.path.dirname(__file__)
+sys.path.insert(0, os.path.join(current_dir, "..", "scripts", "generation"))
+from cross_issue_index import CrossIssueIndex  # noqa
+from cross_issue_query import CrossIssueQuery  # noqa
+
+
+def make_timelines(feature, seed):
+    rng = random.Random(seed)
+    timelines = {}
+    for user in ["user{}".format(i) for i in range(20)]:
+        dates = sorted({date(2010, 1, 1) + timedelta(days=rng.randint(0, 900))
+                        for _ in range(rng.randint(1, 60))})
+        timelines[user] = {feature + "_dates": dates,
+                           feature + "_timeline": {d: rng.random()
+                                                   for d in dates}}
+    return timelines
+
+
+@pytest.fixture()
+def timelines():
+    return make_timelines("reputation", 0), make_timelines("workload", 1)
+
+
+@pytest.fixture()
+def query(timelines):
+    reputations, workloads = timelines
+    return CrossIssueQuery(
+        CrossIssueIndex.from_timelines(reputations, "reputation_dates",
+                                       "reputation_timeline"),
+        CrossIssueIndex.from_timelines(workloads, "workload_dates",
+                                       "workload_timeline"),
+        cache_size=4)
+
+
+def expected_value(entry, feature, d):
+    dates = entry[feature + "_dates"]
+    idx = bisect.bisect(dates, d)
+    if idx == 0:
+        return float("nan")
+    return entry[feature + "_timeline"][dates[idx - 1]]
+
+
+def assert_same(value, expected):
+    assert value == expected or (math.isnan(value) and math.isnan(expected))
+
+
+def test_queries_match_bisect(timelines, query):
+    rng = random.Random(2)
+    users = [rng.choice(list(timelines[0]) + ["nobody"]) for _ in range(300)]
+    dates = [date(2009, 12, 1) + timedelta(days=rng.randint(0, 1000))
+             for _ in users]
+
+    reputations = query.reputations_at(users, dates)
+    workloads = query.workloads_at(users, dates)
+    for i, (user, d) in enumerate(zip(users, dates)):
+        expected_rep = expected_value(timelines[0].get(user, {
+            "reputation_dates": []}), "reputation", d)
+        expected_workload = expected_value(timelines[1].get(user, {
+            "workload_dates": []}), "workload", d)
+        assert_same(query.reputation_at(user, d), expected_rep)
+        assert_same(query.workload_at(user, datetime(d.year, d.month, d.day,
+                                                     12)), expected_workload)
+        assert_same(reputations[i], expected_rep)
+        assert_same(workloads[i], expected_workload)
+
+
+def test_batch_queries_use_local_date_of_datetimes():
+    dates = [date(2015, 1, 1), date(2015, 1, 2)]
+    reputations = {"alice": {"reputation_dates": dates,
+                             "reputation_timeline": {dates[0]: 0.25,
+                                                     dates[1]: 0.75}}}
+    index = CrossIssueIndex.from_timelines(reputations, "reputation_dates",
+                                           "reputation_timeline")
+    query = CrossIssueQuery(index, index)
+    # 23:00 in UTC-5 is already January 2 in UTC.
+    local_time = datetime(2015, 1, 1, 23,
+                          tzinfo=timezone(timedelta(hours=-5)))
+    query_dates = [local_time, local_time.replace(tzinfo=None), dates[1]]
+
+    values = query.reputations_at(["alice"] * 3, query_dates)
+    for value, query_date in zip(values, query_dates):
+        assert value == query.reputation_at("alice", query_date)
+    assert list(values) == [0.25, 0.25, 0.75]
+
+
+def test_timeline_cache_is_bounded(query):
+    for i in range(10):
+        query.reputation_at("user{}".format(i), date(2011, 1, 1))
+    query.reputation_at("user9", date(2012, 1, 1))
+
+    info = query.cache_info()["reputations"]
+    assert info.currsize == 4
+    assert info.hits == 1
@@ -0,0 +1,477 @@
+import pytest
+import json
+import math
+import os
+import sys
+import pandas as pd
+from datetime import datetime, timedelta
+from conftest import ISSUES, change
+
+current_dir = os.path.dirname(__file__)
+sys.path.insert(0, os.path.join(current_dir, "..", "scripts", "generation"))
+import generate_dataset  # noqa
+import extract_cross_issue_data  # noqa
+from issue_decoder import decode_events, load_issue, project_issue  # noqa
+from issue_state import digest_description  # noqa
+
+
+@pytest.fixture()
+def cross_issue_data(project_paths):
+    input_paths, output_paths = project_paths
+    cidp = extract_cross_issue_data.CrossIssueDataProcessor()
+    cidp.generate_reporter_reputations(input_paths, output_paths)
+    cidp.generate_assignee_workloads(input_paths, output_paths)
+    cp = generate_dataset.CountingProcess()
+    return cp.load_cross_issue_data(input_paths, True)
+
+
+def read_output(output_paths):
+    with open(output_paths["raw_dataset"], "rb") as f:
+        return f.read()
+
+
+def test_parallel_dataset_matches_serial(project_paths, cross_issue_data):
+    input_paths, output_paths = project_paths
+    reputations, workloads = cross_issue_data
+    cp = generate_dataset.CountingProcess()
+
+    cp.generate_dataset(input_paths, output_paths, False, True, reputations,
+                        workloads)
+    serial = read_output(output_paths)
+    cp.generate_dataset(input_paths, output_paths, False, True, reputations,
+                        workloads, workers=2)
+    parallel = read_output(output_paths)
+
+    assert serial == parallel
+    assert serial.count(b"\n") > 1
+
+
+def test_streamed_dataset_matches_single_write(project_paths,
+                                               cross_issue_data):
+    input_paths, output_paths = project_paths
+    reputations, workloads = cross_issue_data
+    cp = generate_dataset.CountingProcess()
+
+    cp.generate_dataset(input_paths, output_paths, False, True, reputations,
+                        workloads)
+    single_write = read_output(output_paths)
+    cp.generate_dataset(input_paths, output_paths, False, True, reputations,
+                        workloads, chunk_size=2)
+    streamed = read_output(output_paths)
+
+    assert single_write == streamed
+
+
+def test_assignee_timelines_match_issue_states(project_paths):
+    input_paths, _ = project_paths
+    cp = generate_dataset.CountingProcess()
+
+    for filename in sorted(os.listdir(input_paths["issues"])):
+        issue_path = os.path.join(input_paths["issues"], filename)
+        with open(issue_path, "r") as f:
+            issue = json.load(f)
+        assignee_timelines = cp.get_assignee_timelines(
+            issue, decode_events(issue), False, True)
+
+        issue_states, issue_dates = cp.generate_issue_states(
+            issue_path, False, True, None, None)
+        expected = []
+        prev_date = issue_dates[0]
+        prev_assignee = issue_states[prev_date]["assignee"]
+        for curr_date in issue_dates:
+            curr_assignee = issue_states[curr_date]["assignee"]
+            if curr_assignee != prev_assignee:
+                expected.append({"assignee": prev_assignee,
+                                 "assigned_date": prev_date,
+                                 "unassigned_date": curr_date})
+                prev_date = curr_date
+                prev_assignee = curr_assignee
+            if issue_states[curr_date]["is_dead"]:
+                break
+        expected.append({"assignee": prev_assignee,
+                         "assigned_date": prev_date,
+                         "unassigned_date": curr_date})
+
+        assert assignee_timelines == expected
+
+
+def test_issue_states_match_dict_states(tmp_path):
+    issue = {"key": "TEST-4",
+             "fields": {"priority": {"id": "3"},
+                        "assignee": None,
+                        "issuetype": {"id": "1"},
+                        "description": "Edited description",
+                        "issuelinks": [],
+                        "versions": [],
+                        "fixVersions": [],
+                        "creator": {"key": "alice"},
+                        "created": "2015-01-01T10:00:00.000+0000",
+                        "resolutiondate": "2015-01-20T10:00:00.000+0000"},
+             "changelog": {"histories": [
+                 change("2015-01-05T10:00:00.000+0000", "description", None,
+                        None),
+                 change("2015-01-10T10:00:00.000+0000", "description", None,
+                        None, "Added description"),
+                 change("2015-01-20T10:00:00.000+0000", "resolution", None,
+                        "1")]},
+             "comments": []}
+    histories = issue["changelog"]["histories"]
+    histories[0]["items"][0]["toString"] = "Added description"
+    histories[1]["items"][0]["toString"] = "Edited description"
+    issue_path = str(tmp_path / "TEST-4")
+    with open(issue_path, "w") as f:
+        json.dump(issue, f)
+
+    # States generated when they were dicts holding the description text.
+    # The last state is the one on the day the dataset is generated.
+    initial_state = {"issuekey": "TEST-4", "is_dead": 0, "priority": 3,
+                     "assignee": "unassigned", "is_assigned": 0,
+                     "issuetype": 1, "desc": "Added description",
+                     "link_count": 0, "affect_count": 0, "fix_count": 0,
+                     "comment_count": 0, "has_priority_change": 0,
+                     "has_desc_change": 0, "has_fix_change": 0}
+    dict_states = [
+        initial_state,
+        dict(initial_state, previous_desc=None),
+        dict(initial_state, desc="Edited description",
+             previous_desc="Added description", has_desc_change=1),
+        dict(initial_state, desc="Edited description", is_dead=1,
+             has_desc_change=1),
+        dict(initial_state, desc="Edited description", has_desc_change=1)]
+    dict_dates = [datetime(2015, 1, day).date() for day in (1, 5, 10, 21)]
+
+    cp = generate_dataset.CountingProcess()
+    issue_states, issue_dates = cp.generate_issue_states(
+        issue_path, False, True, None, None)
+
+    assert list(issue_dates)[:-1] == dict_dates
+    for date, dict_state in zip(issue_dates, dict_states):
+        expected = {feature: value for feature, value in dict_state.items()
+                    if value is not None}
+        for feature in ("desc", "previous_desc"):
+            if feature in expected:
+                expected[feature] = digest_description(expected[feature])
+        assert issue_states[date].to_dict() == expected
+        assert issue_states[date].get("previous_desc") == \
+            digest_description(dict_state.get("previous_desc"))
+    assert digest_description("Added description") != \
+        digest_description("Edited description")
+
+
+def get_expected_rows(issue_states, issue_dates, columns):
+    # One row per interval between dates of interest, until the death.
+    dates = list(issue_dates)
+    rows = []
+    for curr_date, nxt_date in zip(dates, dates[1:]):
+        row = {column: issue_states[curr_date][column] for column in columns
+               if column not in ("start_date", "start", "end", "is_dead")}
+        row["start_date"] = curr_date
+        row["start"] = (curr_date - dates[0]).days
+        row["end"] = (nxt_date - dates[0]).days
+        row["is_dead"] = issue_states[nxt_date].is_dead
+        rows.append(row)
+        if row["is_dead"]:
+            break
+    return rows
+
+
+def test_counting_process_columns_match_rows(project_paths, cross_issue_data):
+    input_paths, _ = project_paths
+    reputations, workloads = cross_issue_data
+    cp = generate_dataset.CountingProcess()
+    columns = cp.get_columns(reputations, workloads)
+
+    for filename in sorted(os.listdir(input_paths["issues"])):
+        issue_path = os.path.join(input_paths["issues"], filename)
+        issue_states, issue_dates = cp.generate_issue_states(
+            issue_path, False, True, reputations, workloads)
+        rows = get_expected_rows(issue_states, issue_dates, columns)
+        issue_columns = cp.generate_counting_process_columns(
+            issue_states, issue_dates, reputations, workloads)
+
+        for column in columns:
+            assert list(issue_columns[column]) == [row[column]
+                                                   for row in rows]
+
+
+def test_incremental_dataset_matches_full_run(project_paths,
+                                              cross_issue_data):
+    input_paths, output_paths = project_paths
+    reputations, workloads = cross_issue_data
+    cp = generate_dataset.CountingProcess()
+
+    cp.generate_dataset(input_paths, output_paths, False, True, reputations,
+                        workloads, incremental=True)
+    assert read_output(output_paths) == read_output_of_full_run(
+        cp, input_paths, output_paths, reputations, workloads)
+
+    issue_path = os.path.join(input_paths["issues"], "TEST-2")
+    with open(issue_path, "r") as f:
+        issue = json.load(f)
+    issue["comments"].append({"created": "2015-01-25T10:00:00.000+0000"})
+    with open(issue_path, "w") as f:
+        json.dump(issue, f)
+
+    cp.generate_dataset(input_paths, output_paths, False, True, reputations,
+                        workloads, workers=2, incremental=True)
+    incremental = read_output(output_paths)
+    assert incremental == read_output_of_full_run(
+        cp, input_paths, output_paths, reputations, workloads)
+
+
+def test_failed_run_keeps_dataset(project_paths, cross_issue_data,
+                                  monkeypatch):
+    input_paths, output_paths = project_paths
+    reputations, workloads = cross_issue_data
+    cp = generate_dataset.CountingProcess()
+    cp.generate_dataset(input_paths, output_paths, False, True, reputations,
+                        workloads)
+    dataset = read_output(output_paths)
+
+    def fail(*args):
+        raise RuntimeError("Generation failed")
+    monkeypatch.setattr(cp, "generate_issue_columns", fail)
+
+    with pytest.raises(RuntimeError):
+        cp.generate_dataset(input_paths, output_paths, False, True,
+                            reputations, workloads, chunk_size=1)
+    assert read_output(output_paths) == dataset
+    assert not os.path.exists(output_paths["raw_dataset"] + ".tmp")
+
+
+def test_failed_update_keeps_dataset(project_paths, cross_issue_data,
+                                     monkeypatch):
+    input_paths, output_paths = project_paths
+    reputations, workloads = cross_issue_data
+    cp = generate_dataset.CountingProcess()
+    cp.generate_dataset(input_paths, output_paths, False, True, reputations,
+                        workloads, incremental=True)
+    dataset = read_output(output_paths)
+
+    def fail(*args):
+        raise RuntimeError("Update failed")
+    monkeypatch.setattr(cp, "generate_issue_update", fail)
+    issue_path = os.path.join(input_paths["issues"], "TEST-2")
+    with open(issue_path, "r") as f:
+        issue = json.load(f)
+    issue["comments"].append({"created": "2015-01-25T10:00:00.000+0000"})
+    with open(issue_path, "w") as f:
+        json.dump(issue, f)
+
+    with pytest.raises(RuntimeError):
+        cp.generate_dataset(input_paths, output_paths, False, True,
+                            reputations, workloads, incremental=True)
+    assert read_output(output_paths) == dataset
+    assert not os.path.exists(output_paths["raw_dataset"] + ".tmp")
+
+
+def read_output_of_full_run(cp, input_paths, output_paths, reputations,
+                            workloads):
+    full_paths = dict(output_paths)
+    full_paths["raw_dataset"] = output_paths["raw_dataset"] + ".full"
+    full_paths["manifest"] = output_paths["manifest"] + ".full"
+    cp.generate_dataset(input_paths, full_paths, False, True, reputations,
+                        workloads)
+    return read_output(full_paths)
+
+
+def test_shared_worklog_pass_matches_separate_passes(project_paths):
+    input_paths, output_paths = project_paths
+    cidp = extract_cross_issue_data.CrossIssueDataProcessor()
+
+    reporter_worklogs, assignee_worklogs = cidp.generate_worklogs(
+        input_paths, output_paths)
+
+    assert reporter_worklogs == cidp.generate_reporter_worklogs(
+        input_paths, output_paths)
+    assert assignee_worklogs == cidp.generate_assignee_worklogs(
+        input_paths, output_paths)
+
+
+def test_count_timelines_match_running_counts(project_paths):
+    input_paths, output_paths = project_paths
+    cidp = extract_cross_issue_data.CrossIssueDataProcessor()
+    worklogs = cidp.generate_reporter_worklogs(input_paths, output_paths)
+
+    count_timelines = cidp.build_count_timelines(
+        worklogs, "creation_date", "resolution_date",
+        lambda opened, fixed: fixed / (opened + 1))
+    for reporter, worklog in worklogs.items():
+        count_timeline = count_timelines[reporter]
+        opened = [entry["creation_date"] for entry in worklog]
+        fixed = [entry["resolution_date"] for entry in worklog
+                 if entry["resolution_date"]]
+
+        assert count_timeline["start"][0] == sorted(set(opened))
+        assert count_timeline["end"][0] == sorted(set(fixed))
+        assert count_timeline["dates"] == sorted(set(opened + fixed))
+        for date in count_timeline["dates"]:
+            opened_count = sum(d <= date for d in opened)
+            fixed_count = sum(d <= date for d in fixed)
+            assert (count_timeline["timeline"][date] ==
+                    fixed_count / (opened_count + 1))
+
+
+def test_cross_issue_update_matches_full_extraction(project_paths):
+    input_paths, output_paths = project_paths
+    cidp = extract_cross_issue_data.CrossIssueDataProcessor()
+    cidp.generate_reporter_reputations(input_paths, output_paths)
+    cidp.generate_assignee_workloads(input_paths, output_paths)
+
+    issue_path = os.path.join(input_paths["issues"], "TEST-2")
+    with open(issue_path, "r") as f:
+        issue = json.load(f)
+    issue["fields"]["creator"] = {"key": "carol"}
+    issue["fields"]["resolutiondate"] = None
+    with open(issue_path, "w") as f:
+        json.dump(issue, f)
+    os.remove(os.path.join(input_paths["issues"], "TEST-3"))
+
+    reputations, workloads = cidp.update_cross_issue_data(
+        input_paths, output_paths, ["TEST-2", "TEST-3"])
+
+    assert reputations == cidp.generate_reporter_reputations(
+        input_paths, output_paths)
+    assert workloads == cidp.generate_assignee_workloads(
+        input_paths, output_paths)
+
+
+def test_selected_json_dumps_are_compressed(project_paths):
+    input_paths, output_paths = project_paths
+    cidp = extract_cross_issue_data.CrossIssueDataProcessor(
+        extract_cross_issue_data.CrossIssueDataProcessor.worklog_dump_names,
+        compress_json=True)
+    reporter_worklogs, _ = cidp.generate_worklogs(input_paths, output_paths)
+    cidp.generate_reporter_reputations(input_paths, output_paths,
+                                       reporter_worklogs)
+    cidp.wait_for_json_dumps()
+
+    dumps = sorted(filename
+                   for filename in os.listdir(output_paths["cross_issue"])
+                   if ".json" in filename)
+    assert dumps == ["assignee_worklogs.json.gz",
+                     "reporter_worklogs.json.gz"]
+    assert cidp.load_worklogs(output_paths, "reporter_worklogs.json") == (
+        reporter_worklogs)
+
+
+def test_global_index_view_matches_project_extraction(project_paths):
+    input_paths, output_paths = project_paths
+    cidp = extract_cross_issue_data.CrossIssueDataProcessor()
+    reputations = cidp.generate_reporter_reputations(input_paths,
+                                                     output_paths)
+    workloads = cidp.generate_assignee_workloads(input_paths, output_paths)
+
+    global_paths = dict(output_paths)
+    global_paths["cross_issue"] = os.path.join(output_paths["cross_issue"],
+                                               "global")
+    os.makedirs(global_paths["cross_issue"])
+    cidp.generate_global_index({"TEST": input_paths}, global_paths)
+    cp = generate_dataset.CountingProcess()
+    scoped_paths = {
+        "reputations": os.path.join(global_paths["cross_issue"],
+                                    "reputation_timelines.bin"),
+        "workloads": os.path.join(global_paths["cross_issue"],
+                                  "workload_timelines.bin"),
+        "cross_issue_scope": "TEST"}
+    global_reputations, global_workloads = cp.load_cross_issue_data(
+        scoped_paths, True)
+
+    for index, timelines, key in [(global_reputations, reputations,
+                                   "reputation"),
+                                  (global_workloads, workloads, "workload")]:
+        assert sorted(index.users) == sorted(timelines)
+        for user, entry in timelines.items():
+            expected = [(d, entry[key + "_timeline"][d])
+                        for d in entry[key + "_dates"]]
+            assert list(index.iter_timeline(user)) == expected
+
+
+def test_window_timelines_match_brute_force(project_paths):
+    input_paths, output_paths = project_paths
+    cidp = extract_cross_issue_data.CrossIssueDataProcessor()
+    reporter_worklogs, assignee_worklogs = cidp.generate_worklogs(
+        input_paths, output_paths)
+    window_timelines = cidp.generate_window_timelines(
+        input_paths, output_paths, [10, 30], reporter_worklogs,
+        assignee_worklogs)
+
+    start = min(entry["assigned_date"]
+                for worklog in assignee_worklogs.values()
+                for entry in worklog)
+    dates = [start + timedelta(days=days) for days in range(120)]
+    for window, (reputations, workloads) in window_timelines.items():
+        for reporter, worklog in reporter_worklogs.items():
+            for date in dates:
+                opened = sum(0 <= (date - entry["creation_date"]).days < window
+                             for entry in worklog)
+                fixed = sum(entry["resolution_date"] is not None and
+                            0 <= (date - entry["resolution_date"]).days <
+                            window for entry in worklog)
+                value = reputations.lookup([reporter], [date])[0]
+                if date < min(entry["creation_date"] for entry in worklog):
+                    assert math.isnan(value)
+                else:
+                    assert value == fixed / (opened + 1)
+        for assignee, worklog in assignee_worklogs.items():
+            for date in dates:
+                held = sum(entry["assigned_date"] <= date <
+                           min(entry["unassigned_date"],
+                               entry["assigned_date"] +
+                               timedelta(days=window))
+                           for entry in worklog)
+                value = workloads.lookup([assignee], [date])[0]
+                assert math.isnan(value) or value == held
+
+
+def test_window_columns_match_timelines(project_paths):
+    input_paths, output_paths = project_paths
+    cidp = extract_cross_issue_data.CrossIssueDataProcessor()
+    cidp.generate_reporter_reputations(input_paths, output_paths)
+    cidp.generate_assignee_workloads(input_paths, output_paths)
+    window_timelines = cidp.generate_window_timelines(
+        input_paths, output_paths, [30])
+    reputations_30d, workloads_30d = window_timelines[30]
+
+    input_paths["cross_issue_windows"] = [30]
+    cp = generate_dataset.CountingProcess()
+    reputations, workloads = cp.load_cross_issue_data(input_paths, True)
+    cp.generate_dataset(input_paths, output_paths, False, True, reputations,
+                        workloads)
+    df = pd.read_csv(output_paths["raw_dataset"], sep="\t")
+
+    assert list(df.columns[-2:]) == ["reporter_rep_30d",
+                                     "assignee_workload_30d"]
+    reporters = {issue["key"]: issue["fields"]["creator"]["key"]
+                 for issue in ISSUES}
+    for row in df.itertuples():
+        start_date = datetime.strptime(row.start_date, "%Y-%m-%d").date()
+        assert row.reporter_rep_30d == reputations_30d.lookup(
+            [reporters[row.issuekey]], [start_date])[0]
+        if row.assignee == "unassigned":
+            assert math.isnan(row.assignee_workload_30d)
+        else:
+            assert row.assignee_workload_30d == workloads_30d.lookup(
+                [row.assignee], [start_date])[0]
+
+
+def test_projected_issues_decode_same_events():
+    for issue in ISSUES:
+        full_issue = json.loads(json.dumps(issue))
+        full_issue["fields"]["summary"] = "Unused"
+        full_issue["fields"]["creator"]["displayName"] = "Unused"
+        histories = full_issue["changelog"]["histories"]
+        histories.insert(0, {"created": "2015-01-01T11:00:00.000+0000",
+                             "items": [{"field": "labels", "from": None,
+                                        "to": "unused"}]})
+        histories[-1]["items"].append({"field": "status", "from": "1",
+                                       "to": "5"})
+
+        projected = project_issue(full_issue)
+        assert "summary" not in projected["fields"]
+        assert projected["fields"]["creator"] == issue["fields"]["creator"]
+        assert projected["changelog"] == issue["changelog"]
+        assert project_issue(projected) == projected
+        assert decode_events(projected) == decode_events(issue)
+        assert decode_events(load_issue(json.dumps(full_issue))) == \
+            decode_events(issue)
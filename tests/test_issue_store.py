@@ -0,0 +1,186 @@
+import pytest
+import json
+import os
+import sys
+from conftest import ISSUES
+
+current_dir = os.path.dirname(__file__)
+sys.path.insert(0, os.path.join(current_dir, "..", "scripts", "generation"))
+import generate_dataset  # noqa
+import extract_cross_issue_data  # noqa
+from issue_decoder import project_issue  # noqa
+import issue_store  # noqa
+from issue_store import (IssueDirectory, IssueStore, convert_issues,  # noqa
+                         open_issues)
+
+
+def test_store_round_trips_issues(tmp_path):
+    path = str(tmp_path / "store")
+    with IssueStore(path) as store:
+        for issue in ISSUES:
+            store.put(issue["key"], issue)
+        assert store.get("TEST-1") == ISSUES[0]
+
+    with open_issues(path) as store:
+        assert isinstance(store, IssueStore)
+        assert store.keys() == sorted(issue["key"] for issue in ISSUES)
+        assert list(store.iter_issues()) == ISSUES
+        for issue in ISSUES:
+            assert issue["key"] in store
+            assert store.get(issue["key"]) == issue
+        assert "TEST-0" not in store
+
+
+def test_rewritten_issue_keeps_last_version(tmp_path):
+    path = str(tmp_path / "store")
+    with IssueStore(path) as store:
+        store.put("TEST-1", {"version": 1})
+        store.put("TEST-2", {"version": 1})
+        assert store.get("TEST-1") == {"version": 1}
+        store.put("TEST-1", {"version": 2})
+        assert store.get("TEST-1") == {"version": 2}
+
+    with IssueStore(path) as store:
+        assert len(store) == 2
+        assert store.get("TEST-1") == {"version": 2}
+        assert [issue["version"] for issue in store.iter_issues()] == [1, 2]
+
+    convert_issues(path, str(tmp_path / "compacted"))
+    with IssueStore(str(tmp_path / "compacted")) as store:
+        assert store.get("TEST-1") == {"version": 2}
+        shard_path = store.get_shard_path(0)
+    assert os.path.getsize(shard_path) < os.path.getsize(
+        os.path.join(path, IssueStore.shard_format.format(0)))
+
+
+def test_shards_roll_over(tmp_path):
+    path = str(tmp_path / "store")
+    with IssueStore(path, shard_size=1) as store:
+        for issue in ISSUES:
+            store.put(issue["key"], issue)
+
+    shards = [filename for filename in os.listdir(path)
+              if filename.startswith("shard")]
+    assert len(shards) == len(ISSUES)
+    with IssueStore(path) as store:
+        assert list(store.iter_issues()) == ISSUES
+
+
+def test_partial_index_entry_is_ignored(tmp_path):
+    path = str(tmp_path / "store")
+    with IssueStore(path) as store:
+        store.put("TEST-1", ISSUES[0])
+    with open(os.path.join(path, IssueStore.index_name), "a") as f:
+        f.write('["TEST-2", 0, ')
+
+    with IssueStore(path) as store:
+        assert store.keys() == ["TEST-1"]
+        store.put("TEST-2", ISSUES[1])
+    with IssueStore(path) as store:
+        assert store.keys() == ["TEST-1", "TEST-2"]
+        assert store.get("TEST-2") == ISSUES[1]
+
+
+def test_index_entries_follow_synced_shards(tmp_path, monkeypatch):
+    synced = []
+    monkeypatch.setattr(issue_store.os, "fsync", synced.append)
+    monkeypatch.setattr(IssueStore, "sync_interval", 2)
+    path = str(tmp_path / "store")
+    store = IssueStore(path)
+    for issue in ISSUES:
+        store.put(issue["key"], issue)
+        assert store.get(issue["key"]) == issue
+    shard_fileno = store.writer.fileno()
+    index_fileno = store.index_file.fileno()
+    assert synced == [shard_fileno, index_fileno]
+    # The last issue is not indexed until the store is synced.
+    with IssueStore(path) as other_store:
+        assert other_store.keys() == ["TEST-1", "TEST-2"]
+
+    store.close()
+    assert synced == [shard_fileno, index_fileno] * 2
+    with IssueStore(path) as other_store:
+        assert list(other_store.iter_issues()) == ISSUES
+
+
+@pytest.mark.parametrize("project_fields", [False, True])
+def test_dataset_from_store_matches_directory(project_paths, tmp_path,
+                                              project_fields):
+    input_paths, output_paths = project_paths
+    store_path = str(tmp_path / "store")
+    convert_issues(input_paths["issues"], store_path,
+                   project_fields=project_fields)
+    with IssueDirectory(input_paths["issues"]) as issues, \
+            IssueStore(store_path) as store:
+        assert store.keys() == issues.keys()
+        for issuekey in issues.keys():
+            content = issues.read_bytes(issuekey)
+            if project_fields:
+                content = json.dumps(
+                    project_issue(json.loads(content))).encode("utf-8")
+            assert store.read_bytes(issuekey) == content
+
+    outputs = []
+    for issues_path in (input_paths["issues"], store_path):
+        input_paths["issues"] = issues_path
+        cidp = extract_cross_issue_data.CrossIssueDataProcessor()
+        cidp.generate_reporter_reputations(input_paths, output_paths)
+        cidp.generate_assignee_workloads(input_paths, output_paths)
+        cp = generate_dataset.CountingProcess()
+        reputations, workloads = cp.load_cross_issue_data(input_paths, True)
+        cp.generate_dataset(input_paths, output_paths, False, True,
+                            reputations, workloads, workers=2)
+        with open(output_paths["raw_dataset"], "rb") as f:
+            outputs.append(f.read())
+
+    assert outputs[0] == outputs[1]
+    assert outputs[0].count(b"\n") > 1
+
+
+def test_projected_store_drops_nested_members(tmp_path):
+    issue = {"key": "TEST-1",
+             "expand": "renderedFields",
+             "fields": {"priority": {"id": "3", "iconUrl": "p.svg"},
+                        "creator": {"key": "alice",
+                                    "displayName": "Alice",
+                                    "avatarUrls": {"48x48": "a.png"}},
+                        "created": "2015-01-01T10:00:00.000+0000",
+                        "summary": "Dropped"},
+             "changelog": {"startAt": 0, "histories": [
+                 {"created": "2015-01-05T10:00:00.000+0000",
+                  "author": {"key": "bob", "displayName": "Bob"},
+                  "items": [{"field": "assignee",
+                             "fieldtype": "jira",
+                             "tmpFromAccountId": None,
+                             "from": None,
+                             "to": "bob"},
+                            {"field": "summary", "from": None,
+                             "to": None}]}]},
+             "comments": [{"created": "2015-01-06T10:00:00.000+0000",
+                           "author": {"key": "bob"},
+                           "body": "Dropped"}]}
+    issues_path = str(tmp_path / "issues")
+    os.mkdir(issues_path)
+    with IssueDirectory(issues_path) as issues:
+        issues.put("TEST-1", issue)
+
+    store_path = str(tmp_path / "store")
+    convert_issues(issues_path, store_path,
+                   project_fields=True)
+    with IssueStore(store_path) as store:
+        projected = store.get("TEST-1")
+    assert projected == project_issue(issue)
+    assert projected["fields"]["priority"] == {"id": "3"}
+    assert projected["fields"]["creator"] == {"key": "alice"}
+    assert projected["changelog"]["histories"] == [
+        {"created": "2015-01-05T10:00:00.000+0000",
+         "items": [{"field": "assignee", "from": None, "to": "bob"}]}]
+
+
+def test_directory_writes_issues(tmp_path):
+    with IssueDirectory(str(tmp_path)) as issues:
+        issues.put("TEST-1", ISSUES[0])
+        assert "TEST-1" in issues
+        assert issues.keys() == ["TEST-1"]
+    with open(str(tmp_path / "TEST-1"), "r") as f:
+        assert json.load(f) == ISSUES[0]
@@ -0,0 +1,39 @@
+import pytest
+import os
+import random
+import sys
+from datetime import date, timedelta
+
+current_dir = os.path.dirname(__file__)
+sys.path.insert(0, os.path.join(current_dir, "..", "scripts", "generation"))
+from issue_timeline import IssueTimeline  # noqa
+
+
+@pytest.fixture()
+def dates():
+    rng = random.Random(0)
+    return [date(2010, 1, 1) + timedelta(days=rng.randint(0, 2000))
+            for _ in range(3000)]
+
+
+def test_timeline_matches_sorted_dates(dates):
+    timeline = IssueTimeline(dates)
+    expected = sorted(set(dates))
+
+    assert list(timeline) == expected
+    assert list(reversed(timeline)) == expected[::-1]
+    assert len(timeline) == len(expected)
+    assert [timeline[i] for i in range(len(expected))] == expected
+    assert timeline[-1] == expected[-1]
+    assert all(d in timeline for d in dates)
+    assert date(2000, 1, 1) not in timeline
+
+
+def test_timeline_next_after(dates):
+    timeline = IssueTimeline(dates)
+    expected = sorted(set(dates))
+
+    assert timeline.next_after(date(2000, 1, 1)) == expected[0]
+    assert timeline.next_after(expected[10]) == expected[11]
+    with pytest.raises(IndexError):
+        timeline.next_after(expected[-1])
@@ -0,0 +1,176 @@
+import pytest
+import asyncio
+import json
+import os
+import sys
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+current_dir = os.path.dirname(__file__)
+sys.path.insert(0, os.path.join(current_dir, "..", "scripts", "collection"))
+from jira_client import JiraClient, JsonArrayDecoder, TokenBucket  # noqa
+
+
+class Handler(BaseHTTPRequestHandler):
+
+    def do_GET(self):
+        server = self.server
+        with server.lock:
+            server.in_flight += 1
+            server.max_in_flight = max(server.max_in_flight,
+                                       server.in_flight)
+            server.requests += 1
+            throttled = server.requests <= server.throttled
+            stalled = server.requests <= server.stalled
+        time.sleep(0.5 if stalled else 0.05)
+        with server.lock:
+            server.in_flight -= 1
+        if throttled:
+            self.send_response(429)
+            self.send_header("Retry-After", "0")
+            self.end_headers()
+            return
+        body = json.dumps(server.body or {"path": self.path},
+                          ensure_ascii=False).encode("utf-8")
+        self.send_response(200)
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, *args):
+        pass
+
+
+@pytest.fixture()
+def server():
+    server = ThreadingHTTPServer(("127.0.0.1", 0), Handler)
+    server.lock = threading.Lock()
+    server.in_flight = 0
+    server.max_in_flight = 0
+    server.requests = 0
+    server.throttled = 0
+    server.stalled = 0
+    server.body = None
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    yield server
+    server.shutdown()
+    server.server_close()
+
+
+def get_all(client, paths):
+    async def run():
+        return await asyncio.gather(*[client.get_json(path)
+                                      for path in paths])
+    try:
+        return asyncio.run(run())
+    finally:
+        client.close()
+
+
+def test_token_bucket_limits_rate():
+    async def run():
+        bucket = TokenBucket(rate=50, capacity=5)
+        start = time.monotonic()
+        for _ in range(30):
+            await bucket.acquire()
+        return time.monotonic() - start
+    # 5 requests are sent at once and the other 25 at 50 per second.
+    assert asyncio.run(run()) >= 25 / 50 * 0.9
+
+
+def test_client_limits_concurrency(server):
+    client = JiraClient("http://127.0.0.1:{}".format(server.server_port),
+                        concurrency=4, rate=1000, burst=20)
+    paths = ["rest/api/2/issue/TEST-{}/comment".format(i) for i in range(20)]
+    results = get_all(client, paths)
+
+    assert [result["path"] for result in results] == ["/" + path
+                                                      for path in paths]
+    assert 1 < server.max_in_flight <= 4
+
+
+def test_client_retries_throttled_requests(server):
+    server.throttled = 3
+    client = JiraClient("http://127.0.0.1:{}".format(server.server_port),
+                        concurrency=1, rate=1000)
+    results = get_all(client, ["rest/api/2/search"])
+
+    assert results == [{"path": "/rest/api/2/search"}]
+    assert server.requests == 4
+
+
+def test_client_retries_timed_out_requests(server):
+    server.stalled = 1
+    client = JiraClient("http://127.0.0.1:{}".format(server.server_port),
+                        concurrency=1, rate=1000, timeout=(1, 0.2))
+    results = get_all(client, ["rest/api/2/search"])
+
+    assert results == [{"path": "/rest/api/2/search"}]
+    assert server.requests == 2
+
+
+PAGE = {"startAt": 0, "maxResults": 1000, "total": 40,
+        "issues": [{"key": "TEST-{}".format(i), "fields": {
+            "summary": "caf\u00e9 \"quoted\" ]}", "votes": i * 1.5}}
+                   for i in range(40)],
+        "names": {"summary": "Summary"}}
+
+
+def stream_all(client, decoder, stop_after=None):
+    async def run():
+        elements = []
+        async for element in client.stream_json("rest/api/2/search", {},
+                                                decoder):
+            elements.append(element)
+            if len(elements) == stop_after:
+                break
+        return elements
+    try:
+        return asyncio.run(run())
+    finally:
+        client.close()
+
+
+def test_decoder_returns_elements_of_chunks():
+    text = json.dumps(PAGE, indent=2)
+    for size in (1, 3, 64, len(text)):
+        decoder = JsonArrayDecoder("issues")
+        elements = []
+        for i in range(0, len(text), size):
+            elements.extend(decoder.feed(text[i:i + size]))
+        elements.extend(decoder.close())
+        assert elements == PAGE["issues"]
+        assert decoder.fields == {key: value for key, value in PAGE.items()
+                                  if key != "issues"}
+
+    decoder = JsonArrayDecoder("issues")
+    decoder.feed(text[:-10])
+    with pytest.raises(ValueError):
+        decoder.close()
+
+
+def test_client_streams_array(server):
+    server.throttled = 1
+    server.body = PAGE
+    client = JiraClient("http://127.0.0.1:{}".format(server.server_port),
+                        rate=1000)
+    client.chunk_size = 7
+    client.stream_buffer = 2
+    decoder = JsonArrayDecoder("issues")
+
+    assert stream_all(client, decoder) == PAGE["issues"]
+    assert decoder.fields["total"] == 40
+    assert server.requests == 2
+
+
+def test_client_stops_stream_early(server):
+    server.body = PAGE
+    client = JiraClient("http://127.0.0.1:{}".format(server.server_port),
+                        rate=1000)
+    client.chunk_size = 7
+    client.stream_buffer = 2
+
+    elements = stream_all(client, JsonArrayDecoder("issues"), stop_after=3)
+    assert elements == PAGE["issues"][:3]
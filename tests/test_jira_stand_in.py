@@ -0,0 +1,145 @@
+import pytest
+import asyncio
+import math
+import os
+import sys
+import requests
+
+current_dir = os.path.dirname(__file__)
+sys.path.insert(0, os.path.join(current_dir, "..", "scripts", "collection"))
+from jira_stand_in import JiraStandIn, generate_issues  # noqa
+from scrape_jira_issues import IssueScraper  # noqa
+from scrape_journal import ScrapeJournal  # noqa
+from issue_store import IssueStore  # noqa
+
+YEARS = [2015, 2016]
+ISSUES = generate_issues("TEST", 120, YEARS)
+# The last issue of 2015 is created after midnight on December 31, which a
+# search ending with created <= "2015/12/31" would miss.
+LAST_2015_ISSUE = [issue for issue in ISSUES
+                   if issue["fields"]["created"] < "2016"][-1]
+LAST_2015_ISSUE["fields"]["created"] = "2015-12-31T23:00:00.000+0000"
+
+
+@pytest.fixture()
+def stand_in():
+    server = JiraStandIn(ISSUES, max_results=25, search_comments=2,
+                         retry_after=0)
+    server.start()
+    yield server
+    server.shutdown()
+    server.server_close()
+
+
+def scrape(stand_in, tmp_path, scrape_coroutine, *args, **kwargs):
+    scraper = IssueScraper(stand_in.base_url, rate=1000, page_size=50,
+                           **kwargs)
+    journal_path = os.path.join(str(tmp_path), "scrape_journal.jsonl")
+    with IssueStore(str(tmp_path / "issues")) as store, \
+            ScrapeJournal(journal_path) as journal:
+        return asyncio.run(scraper.run_with_client(
+            getattr(scraper, scrape_coroutine), *args, store, journal))
+
+
+def read_store(tmp_path):
+    with IssueStore(str(tmp_path / "issues")) as store:
+        return {issue["key"]: issue for issue in store.iter_issues()}
+
+
+def test_search_filters_and_pages_issues(stand_in):
+    url = stand_in.base_url + "/rest/api/2/search"
+    jql = ('project=TEST and created >= "2015/01/01" and '
+           'created < "2016/01/01"')
+    response = requests.get(url, {"jql": jql, "startAt": 20,
+                                  "maxResults": 1000})
+    json_data = response.json()
+
+    expected = [issue for issue in ISSUES
+                if issue["fields"]["created"].startswith("2015")]
+    assert json_data["total"] == len(expected)
+    assert json_data["maxResults"] == 25
+    assert [issue["key"] for issue in json_data["issues"]] == [
+        issue["key"] for issue in expected[20:45]]
+    assert "changelog" not in json_data["issues"][0]
+    assert "comment" not in json_data["issues"][0]["fields"]
+
+    response = requests.get(url, {"jql": jql, "expand": "changelog",
+                                  "fields": "*navigable,comment"})
+    issue = response.json()["issues"][0]
+    assert issue["changelog"] == expected[0]["changelog"]
+    assert issue["fields"]["comment"]["comments"] == \
+        expected[0]["comments"][:2]
+    assert issue["fields"]["comment"]["total"] == len(expected[0]["comments"])
+
+    response = requests.get(url, {"jql": "created >= 2015"})
+    assert response.status_code == 400
+
+
+def test_failed_request_answers_server_error(stand_in):
+    url = stand_in.base_url + "/rest/api/2/search"
+    response = requests.get(url, {"jql": "project=TEST", "startAt": "x"})
+    assert response.status_code == 500
+    assert response.json()["errorMessages"]
+    assert stand_in.statuses[500] == 1
+    assert stand_in.in_flight == 0
+
+
+def test_stand_in_limits_rate():
+    server = JiraStandIn(ISSUES, rate=1, burst=2)
+    server.start()
+    url = server.base_url + "/rest/api/2/issue/TEST-1/comment"
+    try:
+        statuses = [requests.get(url).status_code for _ in range(3)]
+        response = requests.get(url)
+    finally:
+        server.shutdown()
+        server.server_close()
+
+    assert statuses == [200, 200, 429]
+    assert response.status_code == 429
+    assert response.headers["Retry-After"] == "1"
+
+
+@pytest.mark.parametrize("bulk_comments", [False, True])
+def test_scraper_gets_every_issue(stand_in, tmp_path, bulk_comments):
+    scrape(stand_in, tmp_path, "scrape_years", "TEST", YEARS,
+           bulk_comments=bulk_comments)
+    assert scrape(stand_in, tmp_path, "scrape_comments",
+                  bulk_comments=bulk_comments) == []
+
+    issues = read_store(tmp_path)
+    assert len(issues) == len(ISSUES)
+    assert [issues[issue["key"]] for issue in ISSUES] == ISSUES
+
+
+def test_scraper_retries_injected_errors(stand_in, tmp_path):
+    stand_in.error_rate = 0.3
+    scrape(stand_in, tmp_path, "scrape_years", "TEST", YEARS,
+           bulk_comments=True, concurrency=1)
+
+    assert stand_in.statuses[503] > 0
+    issues = read_store(tmp_path)
+    assert [issues[issue["key"]] for issue in ISSUES] == ISSUES
+
+
+def test_scraper_resumes_after_failures(stand_in, tmp_path):
+    stand_in.error_rate = 0.2
+    stand_in.error_statuses = (500,)
+    for attempts in range(1, 50):
+        try:
+            scrape(stand_in, tmp_path, "scrape_years", "TEST", YEARS,
+                   bulk_comments=True)
+            break
+        except requests.HTTPError:
+            pass
+    stand_in.error_rate = 0
+    scrape(stand_in, tmp_path, "scrape_comments", bulk_comments=True)
+
+    assert attempts > 1
+    pages = sum(math.ceil(len([
+        issue for issue in ISSUES
+        if issue["fields"]["created"].startswith(str(year))]) / 25)
+        for year in YEARS)
+    assert stand_in.requests["search"] < attempts * pages
+    issues = read_store(tmp_path)
+    assert [issues[issue["key"]] for issue in ISSUES] == ISSUES
@@ -0,0 +1,21 @@
+import pytest
+import os
+import sys
+from dateutil.parser import parse
+
+current_dir = os.path.dirname(__file__)
+sys.path.insert(0, os.path.join(current_dir, "..", "scripts", "generation"))
+import jira_timestamp  # noqa
+
+
+@pytest.mark.parametrize("timestamp", [
+    "2015-01-01T10:00:00.000+0000",
+    "2012-02-29T23:59:59.999-0800",
+    "2018-12-31T00:00:00.123+0530",
+    "2016-07-14T04:30:00.000-0000",
+    "2016-07-14 04:30:00",
+    "2016-07-14T04:30:00Z",
+])
+def test_parse_timestamp_matches_dateutil(timestamp):
+    assert jira_timestamp.parse_timestamp(timestamp) == parse(timestamp)
+    assert jira_timestamp.parse_date(timestamp) == parse(timestamp).date()
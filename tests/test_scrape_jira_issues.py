@@ -0,0 +1,236 @@
+import pytest
+import asyncio
+import json
+import os
+import sys
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, urlparse
+
+current_dir = os.path.dirname(__file__)
+sys.path.insert(0, os.path.join(current_dir, "..", "scripts", "collection"))
+from scrape_jira_issues import IssueScraper  # noqa
+import scrape_journal  # noqa
+from scrape_journal import ScrapeJournal  # noqa
+from issue_store import IssueDirectory, IssueStore  # noqa
+
+ISSUE_COUNT = 25
+UPDATED_ISSUES = [{"key": "TEST-3",
+                   "fields": {"creator": {"key": "alice"}, "updated": True}},
+                  {"key": "TEST-30",
+                   "fields": {"creator": {"key": "bob"}, "updated": True}},
+                  {"key": "TEST-31", "fields": {"creator": None}}]
+
+
+def get_comments(issuekey):
+    number = int(issuekey.split("-")[1])
+    return [{"id": str(i), "created": "2015-01-0{}T10:00:00.000+0000".format(
+        i + 1)} for i in range(number % 5)]
+
+
+class Handler(BaseHTTPRequestHandler):
+
+    def do_GET(self):
+        url = urlparse(self.path)
+        query = parse_qs(url.query)
+        self.server.paths.append(url.path)
+        if url.path.endswith("/search") and "updated" in query["jql"][0]:
+            body = {"total": len(UPDATED_ISSUES), "issues": UPDATED_ISSUES}
+        elif url.path.endswith("/search"):
+            start_at = int(query["startAt"][0])
+            # The server returns fewer issues than requested per page.
+            stop = min(ISSUE_COUNT, start_at + 10)
+            body = {"total": ISSUE_COUNT,
+                    "issues": [{"key": "TEST-{}".format(i),
+                                "fields": {"creator": {"key": "alice"}}}
+                               for i in range(start_at, stop)]}
+            if "comment" in query.get("fields", [""])[0]:
+                # The search only returns the first comment of each issue.
+                for issue in body["issues"]:
+                    comments = get_comments(issue["key"])
+                    issue["fields"]["comment"] = {
+                        "comments": comments[:1], "total": len(comments)}
+        else:
+            start_at = int(query.get("startAt", ["0"])[0])
+            comments = get_comments(url.path.split("/")[-2])
+            body = {"comments": comments[start_at:start_at + 2],
+                    "total": len(comments)}
+        data = json.dumps(body).encode("utf-8")
+        self.send_response(200)
+        self.send_header("Content-Length", str(len(data)))
+        self.end_headers()
+        self.wfile.write(data)
+
+    def log_message(self, *args):
+        pass
+
+
+@pytest.fixture()
+def server():
+    server = ThreadingHTTPServer(("127.0.0.1", 0), Handler)
+    server.paths = []
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    yield server
+    server.shutdown()
+    server.server_close()
+
+
+def scrape(server, tmp_path, scrape_coroutine, *args, bulk_comments=False):
+    scraper = IssueScraper(
+        "http://127.0.0.1:{}".format(server.server_port), rate=1000,
+        page_size=100, bulk_comments=bulk_comments)
+    journal_path = os.path.join(str(tmp_path), "scrape_journal.jsonl")
+    with ScrapeJournal(journal_path) as journal:
+        return asyncio.run(scraper.run_with_client(
+            getattr(scraper, scrape_coroutine), *args, journal))
+
+
+def test_journal_skips_scraped_pages_and_comments(server, tmp_path):
+    issues_dir = tmp_path / "issues"
+    issues_dir.mkdir()
+    store = IssueDirectory(str(issues_dir))
+    scrape(server, tmp_path, "scrape_years", "TEST", [2015], store)
+    assert len(server.paths) == 3
+    assert len(os.listdir(str(issues_dir))) == ISSUE_COUNT
+    assert scrape(server, tmp_path, "scrape_comments", store) == []
+    assert len(server.paths) == 3 + ISSUE_COUNT
+    with open(str(issues_dir / "TEST-3"), "r") as f:
+        assert json.load(f)["comments"] == get_comments("TEST-3")[:2]
+
+    server.paths.clear()
+    scrape(server, tmp_path, "scrape_years", "TEST", [2015], store)
+    scrape(server, tmp_path, "scrape_comments", store)
+    assert server.paths == []
+
+
+class CountingDirectory(IssueDirectory):
+    """ Counts the issues loaded and not yet written back.
+    """
+
+    def __init__(self, path):
+        super().__init__(path)
+        self.loaded = 0
+        self.max_loaded = 0
+
+    def get(self, issuekey):
+        self.loaded += 1
+        self.max_loaded = max(self.max_loaded, self.loaded)
+        return super().get(issuekey)
+
+    def put(self, issuekey, issue):
+        super().put(issuekey, issue)
+        self.loaded -= 1
+
+
+def test_comments_load_only_issues_in_flight(server, tmp_path):
+    issues_dir = tmp_path / "issues"
+    issues_dir.mkdir()
+    store = CountingDirectory(str(issues_dir))
+    scrape(server, tmp_path, "scrape_years", "TEST", [2015], store)
+    store.loaded = 0
+    assert scrape(server, tmp_path, "scrape_comments", store) == []
+    assert store.loaded == 0
+    assert 1 <= store.max_loaded <= IssueScraper().concurrency
+
+
+def test_journal_ignores_partial_record(tmp_path):
+    path = os.path.join(str(tmp_path), "scrape_journal.jsonl")
+    with ScrapeJournal(path) as journal:
+        journal.add_page(2015, 0, 25, 10)
+        journal.add_comments("TEST-1")
+    with open(path, "a") as f:
+        f.write('{"comments": "TES')
+
+    with ScrapeJournal(path) as journal:
+        assert journal.get_first_page(2015) == (25, 10)
+        assert journal.has_page(2015, 0)
+        assert not journal.has_page(2015, 10)
+        assert journal.has_comments("TEST-1")
+        journal.add_comments("TEST-2")
+    with ScrapeJournal(path) as journal:
+        assert journal.has_comments("TEST-2")
+
+
+def test_journal_syncs_comments_in_batches(tmp_path, monkeypatch):
+    synced = []
+    monkeypatch.setattr(scrape_journal.os, "fsync", synced.append)
+    path = os.path.join(str(tmp_path), "scrape_journal.jsonl")
+    comment_count = ScrapeJournal.sync_interval * 2 + 1
+    with ScrapeJournal(path) as journal:
+        journal.add_page(2015, 0, 25, 10)
+        assert len(synced) == 1
+        for i in range(comment_count):
+            journal.add_comments("TEST-{}".format(i))
+        assert len(synced) == 3
+    assert len(synced) == 4
+
+    with ScrapeJournal(path) as journal:
+        assert len(journal.comments) == comment_count
+
+
+def test_updated_issues_are_rewritten(server, tmp_path):
+    issues_dir = tmp_path / "issues"
+    issues_dir.mkdir()
+    store = IssueDirectory(str(issues_dir))
+    scrape(server, tmp_path, "scrape_years", "TEST", [2015], store)
+    journal_path = os.path.join(str(tmp_path), "scrape_journal.jsonl")
+    with ScrapeJournal(journal_path) as journal:
+        journal.add_sync("2015-06-01")
+
+    server.paths.clear()
+    issuekeys = scrape(server, tmp_path, "scrape_updates", "TEST", store)
+
+    assert issuekeys == ["TEST-3", "TEST-30"]
+    assert len(server.paths) == 3
+    for issuekey in issuekeys:
+        with open(str(issues_dir / issuekey), "r") as f:
+            issue = json.load(f)
+        assert issue["fields"]["updated"]
+        assert issue["comments"] == get_comments(issuekey)[:2]
+    assert not os.path.exists(str(issues_dir / "TEST-31"))
+    with ScrapeJournal(journal_path) as journal:
+        assert journal.last_sync > "2015-06-01"
+
+
+def test_bulk_comments_are_scraped_with_search(server, tmp_path):
+    issues_dir = tmp_path / "issues"
+    issues_dir.mkdir()
+    store = IssueDirectory(str(issues_dir))
+    scrape(server, tmp_path, "scrape_years", "TEST", [2015], store,
+           bulk_comments=True)
+
+    # Issues with more than one comment need follow-up requests, and those
+    # with more than three comments need two.
+    follow_ups = sum(number % 5 // 2 for number in range(ISSUE_COUNT))
+    assert len(server.paths) == 3 + follow_ups
+    for filename in os.listdir(str(issues_dir)):
+        with open(str(issues_dir / filename), "r") as f:
+            issue = json.load(f)
+        assert issue["comments"] == get_comments(filename)
+        assert "comment" not in issue["fields"]
+
+    server.paths.clear()
+    assert scrape(server, tmp_path, "scrape_comments", store) == []
+    assert server.paths == []
+
+
+def test_issues_are_scraped_into_store(server, tmp_path):
+    with IssueStore(str(tmp_path / "issues")) as store:
+        scrape(server, tmp_path, "scrape_years", "TEST", [2015], store,
+               bulk_comments=True)
+        journal_path = os.path.join(str(tmp_path), "scrape_journal.jsonl")
+        with ScrapeJournal(journal_path) as journal:
+            journal.add_sync("2015-06-01")
+        issuekeys = scrape(server, tmp_path, "scrape_updates", "TEST", store)
+
+    assert issuekeys == ["TEST-3", "TEST-30"]
+    with IssueStore(str(tmp_path / "issues")) as store:
+        assert len(store) == ISSUE_COUNT + 1
+        for issuekey in store.keys():
+            issue = store.get(issuekey)
+            if issuekey in issuekeys:
+                assert issue["fields"]["updated"]
+                assert issue["comments"] == get_comments(issuekey)[:2]
+            else:
+                assert issue["comments"] == get_comments(issuekey)